@@ -7,17 +7,36 @@ import numpy as np
 import pandas as pd
 import scipy as scp
 from tabulate import tabulate
+from concurrent.futures import ProcessPoolExecutor
 
 # 0.2 - Módulos 
-from módulo_leitura_dados import ler_variáveis_entrada_código, ler_dados_experimentais
-from módulo_composições import normalizar_composição, fracionar_composição_global
+from módulo_leitura_dados import ler_variáveis_entrada_código, ler_dados_experimentais, ler_configuração_padrão
+from módulo_composições import normalizar_composição
 from módulo_propriedades_solvente import calcular_propriedades_solvente
 from módulo_propriedades_frações_SAR import calcular_propriedades_saturados, calcular_propriedades_aromáticos, \
     calcular_propriedades_resinas
-from módulo_distribuição_massa_molar import gerar_distribuição_massa_molar
-from módulo_propriedades_agregados import calcular_propriedades_agregados
-from módulo_equilíbrio_líquido_líquido import calcular_composições_ELL, calcular_yield_asfaltenos
+from módulo_curva_solubilidade import calcular_curva_solubilidade, determinar_n_agregados_mínimo, \
+    comparar_quadratura_gauss_discreto
+from módulo_regressão import montar_chute_inicial, obter_limites_parâmetros, desempacotar_parâmetros, \
+    montar_regressão_a_partir_dos_arquivos, comparar_algoritmos_otimização
+from módulo_checkpoint_regressão import regredir_parâmetros_com_checkpoint
+from módulo_regressão_substituta import regredir_parâmetros_modelo_substituto
+from módulo_regressão_mínimos_quadrados import regredir_parâmetros_mínimos_quadrados
+from módulo_regressão_multifidelidade import regredir_parâmetros_multifidelidade
+from módulo_regressão_incremental import regredir_parâmetros_incremental
+from módulo_regressão_tolerância_adaptativa import regredir_parâmetros_tolerância_adaptativa
+from módulo_regressão_conjunta import regredir_parâmetros_conjunta, NOMES_PARÂMETROS
+from módulo_regressão_orçamento import regredir_parâmetros_com_orçamento
+from módulo_chute_inicial import montar_grades_parâmetros, carregar_ou_gerar_tabela_chute_inicial, \
+    estimar_chute_inicial
+from módulo_derivadas_paralelas import criar_gradiente_paralelo, estimar_covariância_parâmetros
+from módulo_memória_compartilhada import RegistroMemóriaCompartilhada
+from módulo_incertezas import propagar_incertezas_monte_carlo
+from módulo_mapa_operacional import gerar_mapa_yields
+from módulo_intervalos_confiança import estimar_intervalos_confiança
 from módulo_gráficos import plotar_yield_curves, plotar_distribuição_massa_molar
+from módulo_exportação_resultados import abrir_escritor_resultados_ELL, montar_nomes_componentes
+from módulo_triagem import triar_ensaios
 
 # ======================================================================================================================
 # PARTE 1 - LEITURA DE INFORMAÇÕES BÁSICAS
@@ -33,7 +52,11 @@ diretório_do_txt = os.path.join(diretório_deste_módulo, 'variáveis_entrada_c
  Alinha_delta_agregados, c_delta_agregados, d_delta_agregados,
  tipo_cálculo_programa, tipo_regressão,
  algoritmo_otimização,
- nome_planilha) = ler_variáveis_entrada_código(diretório_do_txt)
+ nome_planilha,
+ método_discretização_agregados, intervalos_confiança_parâmetros,
+ modo_regressão, chute_inicial_automático,
+ planilhas_regressão_conjunta, parâmetros_compartilhados,
+ tempo_máximo_regressão, n_avaliações_máximo_regressão) = ler_variáveis_entrada_código(diretório_do_txt)
 
 # 1.2 - Validação dos valores das variáveis 'correlação_delta_agregados' e 'tipo_regressão'
 # Obs: só faz sentido que 'tipo_regressão' seja >=3 e <=5 se correlação_delta_agregados = 'Barrera'
@@ -67,205 +90,238 @@ MMs[2], rhos[2], deltas[2], Vs[2] = calcular_propriedades_aromáticos(
 MMs[3], rhos[3], deltas[3], Vs[3] = calcular_propriedades_resinas(
     T, correlação_densidade_resinas, correlação_delta_resinas)
 
+# 2.4 - Discretização adaptativa dos agregados: menor nº de agregados que reproduz os yields da discretização
+# uniforme com 'n_agregados' (avaliada com os valores dos parâmetros lidos na 'PARTE 1')
+correlações_agregados = (correlação_densidade_agregados, correlação_delta_agregados)
+correlações_componentes = (correlação_densidade_saturados, correlação_delta_saturados,
+                           correlação_densidade_aromáticos, correlação_delta_aromáticos,
+                           correlação_densidade_resinas, correlação_delta_resinas) + correlações_agregados
+if método_discretização_agregados == 'adaptativo':
+    n_agregados, método_discretização_agregados, desvio_máximo = determinar_n_agregados_mínimo(
+        (MWavg, alfa, c_delta_agregados, Alinha_delta_agregados, d_delta_agregados), (T, SARA, ws_simplificados),
+        (MMs, rhos, deltas, Vs),
+        (n_agregados, MWmin, MWmax, tipo_cálculo_MM_agregados, método_integração_FDP_Gamma, 'uniforme'),
+        correlações_agregados)
+    print(f"DISCRETIZACAO ADAPTATIVA: {n_agregados} agregados ({método_discretização_agregados}), "
+          f"desvio maximo nos yields = {100*desvio_máximo:.4f}%")
+
+# 2.5 - Quadratura de Gauss da FDP_Gamma: validação contra o modelo discreto ('uniforme') com nº de agregados
+# crescente (avaliada com os valores dos parâmetros lidos na 'PARTE 1')
+if método_discretização_agregados == 'quadratura_gauss':
+    _, tempo_quadratura, comparações_modelos = comparar_quadratura_gauss_discreto(
+        (MWavg, alfa, c_delta_agregados, Alinha_delta_agregados, d_delta_agregados), (T, SARA, ws_simplificados),
+        (MMs, rhos, deltas, Vs),
+        (n_agregados, MWmin, MWmax, tipo_cálculo_MM_agregados, método_integração_FDP_Gamma, 'quadratura_gauss'),
+        correlações_agregados)
+    df_quadratura = pd.DataFrame(
+        {"  n_agregados (discreto)  ": [comparação["n_agregados"] for comparação in comparações_modelos],
+         "  Desvio maximo (%)  ": [f"{100*comparação['desvio_máximo']:.2e}" for comparação in comparações_modelos],
+         "  Tempo (ms)  ": [f"{1e3*comparação['tempo']:.1f}" for comparação in comparações_modelos]}
+         )
+    print(f"QUADRATURA DE GAUSS: {n_agregados} nos, {1e3*tempo_quadratura:.1f} ms por curva de solubilidade")
+    print(f"{tabulate(df_quadratura, headers = df_quadratura.columns, tablefmt = 'pretty', showindex = False)}")
+
 # ======================================================================================================================
 # PARTE 3 - CRIAÇÃO DA FUNÇÃO OBJETIVO PARA REGRESSÃO DOS PARÂMETROS
-# Este bloco será pulado caso tipo_cálculo_programa == 'predicao'
+# Obs: a função objetivo 'F_obj' está no módulo 'módulo_regressão', de modo que possa ser avaliada também por
+#      processos de trabalho (ex: intervalos de confiança por bootstrap)
 
-if tipo_cálculo_programa == 'regressao':
+# 3.1 - Parâmetros dos agregados lidos na 'PARTE 1' deste código
+# Obs: na regressão, os parâmetros não estimados (ver 'tipo_regressão') mantêm estes valores
+parâmetros_agregados = (MWavg, alfa, c_delta_agregados, Alinha_delta_agregados, d_delta_agregados)
 
-    def F_obj(parâmetros, *args):
-
-        global MWavg, alfa, c_delta_agregados, Alinha_delta_agregados, d_delta_agregados
-
-        # 3.1 - Desempacotando os parâmetros a serem estimados
-        match tipo_regressão:
-            case 1: MWavg = parâmetros
-            # Como alfa, c_delta_agregados, Alinha_delta_agregados, d_delta_agregados não serão estimadas,
-            # usam-se os valores lidos na 'PARTE 1' deste código
-            case 2: MWavg, alfa = parâmetros
-            # Como c_delta_agregados, Alinha_delta_agregados, d_delta_agregados não serão estimadas,
-            # usam-se os valores lidos na 'PARTE 1' deste código
-            case 3: MWavg, alfa, c_delta_agregados = parâmetros
-            # Alinha_delta_agregados, d_delta_agregados não serão estimadas,
-            # usam-se os valores lidos na 'PARTE 1' deste código
-            case 4: MWavg, alfa, c_delta_agregados, Alinha_delta_agregados = parâmetros
-            # d_delta_agregados não será estimado, usa-se os valores lidos na 'PARTE 1' deste código
-            case 5: MWavg, alfa, c_delta_agregados, Alinha_delta_agregados, d_delta_agregados = parâmetros
-            case _: MWavg, alfa, c_delta_agregados = parâmetros
-            # OBS: Em caso de erro, usa-se tipo_regressão == 3 como padrão.
-
-        # 3.2 - Desempacotando os *args (outros argumentos da função 'F_obj' a serem passados pra função 'minimize')
-        T, SARA, ws_simplificados, yields_exp = args[0]
-        MMs, rhos, deltas, Vs = args[1]
-        n_agregados, MWmin, MWmax, tipo_cálculo_MM_agregados, método_integração_FDP_Gamma = args[2]
-
-        # 3.3 - Propriedades dos agregados de asfaltenos
-        MMsagregados, wsagregados, xsagregados = gerar_distribuição_massa_molar(
-            alfa, MWavg, n_agregados, MWmin, MWmax, tipo_cálculo_MM_agregados, método_integração_FDP_Gamma)
-        wsagregados = normalizar_composição(wsagregados) 
-        xsagregados = normalizar_composição(xsagregados)
-        rhosagregados, deltasagregados, Vsagregados = calcular_propriedades_agregados(
-            T, MMsagregados, correlação_densidade_agregados, correlação_delta_agregados,
-            Alinha_delta_agregados, c_delta_agregados, d_delta_agregados)
-        
-        # 3.4 - Alocação das propriedades dos agregados de asfaltenos
-        # nos arrays que contêm as propriedades de todos os componentes do sistema
-        MMs[4:4 + n_agregados] = MMsagregados[0:n_agregados]*1e-3  # kg/mol
-        rhos[4:4 + n_agregados] = rhosagregados[0:n_agregados] 
-        deltas[4:4 + n_agregados] = deltasagregados[0:n_agregados]
-        Vs[4:4 + n_agregados] = Vsagregados[0:n_agregados] 
-        
-        # 3.5 - Composição global do sistema em termos de
-        # [Solvente, S, A, R, Asf0, Asf1, ...] (base mássica e base molar)
-        ws_completo, xs_completo = fracionar_composição_global(ws_simplificados, SARA, wsagregados, MMs)
-        ws_completo = np.apply_along_axis(func1d=normalizar_composição, axis=1, arr=ws_completo)
-        xs_completo = np.apply_along_axis(func1d=normalizar_composição, axis=1, arr=xs_completo)
-
-        # 3.6 - Cálculo de equilíbrio líquido-líquido
-        n_dados_exp = yields_exp.shape[0]
-        yields_calc = np.zeros(n_dados_exp)
-        for i in range(n_dados_exp):
-            betarr, xsL, xsH, n_it = calcular_composições_ELL(T, xs_completo[i], deltas, Vs, xsagregados)
-            yields_calc[i] = calcular_yield_asfaltenos(betarr, xsL, xsH, MMs)
-
-        # 3.7 - Expressão matemática a ser minimizada
-        yields_diferenças = np.abs(yields_calc - yields_exp)  # diferenças entre os yields calculados e experimentais
-
-        return (1/n_dados_exp)*yields_diferenças.sum()
-    
 # ======================================================================================================================
 # PARTE 4 - MINIMIZAÇÃO DA FUNÇÃO OBJETIVO PARA REGRESSÃO DOS PARÂMETROS
-# Este bloco é pulado caso tipo_cálculo_programa == 'predicao'
+# Este bloco é pulado caso tipo_cálculo_programa != 'regressao'
+
+if tipo_cálculo_programa == 'regressao':
 
     # 4.1 - Chutes iniciais dos parâmetros a serem estimados
-    match tipo_regressão:
-        case 1: chute_inicial = np.array([MWavg])
-        case 2: chute_inicial = np.array([MWavg, alfa])
-        case 3: chute_inicial = np.array([MWavg, alfa, c_delta_agregados])
-        case 4: chute_inicial = np.array([MWavg, alfa, c_delta_agregados, Alinha_delta_agregados])
-        case 5: chute_inicial = np.array([MWavg, alfa, c_delta_agregados, Alinha_delta_agregados, d_delta_agregados])
-        case _: chute_inicial = np.array([MWavg, alfa, c_delta_agregados])
-        # OBS: em caso de erro, usa-se tipo_regressão == 3 como padrão.
+    chute_inicial = montar_chute_inicial(tipo_regressão, parâmetros_agregados)
 
     # 4.2 - Atribuição de valores para os *args (outros argumentos da função 'F_obj'
     # a serem passados pra função 'minimize')
     dados_experimentais = (T, SARA, ws_simplificados, yields_exp) 
     propriedades_componentes = (MMs, rhos, deltas, Vs)
     variáveis_distribuição_massa_molar = (
-        n_agregados, MWmin, MWmax, tipo_cálculo_MM_agregados, método_integração_FDP_Gamma
+        n_agregados, MWmin, MWmax, tipo_cálculo_MM_agregados, método_integração_FDP_Gamma,
+        método_discretização_agregados
     )
-    argumentos_otimização = (dados_experimentais, propriedades_componentes, variáveis_distribuição_massa_molar)
-
-    # 4.3 - Otimização
-    # 4.3.1 - Configuração do algoritmo de otimização
-    if algoritmo_otimização == 1:
-        # 4.3.1.1 - Nelder-Mead
-        sol = scp.optimize.minimize(F_obj, chute_inicial, method="Nelder-Mead", args=argumentos_otimização)
-
-    elif algoritmo_otimização == 2:
-        # 4.3.1.2 - Brute-force
-        sol = 0
-        pass  # Obs: ainda falta ser implementado
-
-    elif algoritmo_otimização == 3 or algoritmo_otimização == 4:
-        # Configuração dos limites nos valores dos parâmetros a serem estimados
-        match tipo_regressão:
-            case 1:
-                limites_parâmetros = [(1.2 * MWmin, 1e4)]
-                # MWavg
-            case 2:
-                limites_parâmetros = [(1.2 * MWmin, 1e4), (1.15, 60)]
-                # MWavg, alfa
-            case 3:
-                limites_parâmetros = [(1.2 * MWmin, 1e4), (1.15, 60), (0.634, 0.672)]
-                # MWavg, alfa, c_delta_agregados
-                # Obs: limites de c_delta_agregados com base na pg. 87 da tese de Diana Maria Barrera (2012)
-            case 4:
-                limites_parâmetros = [(1.2 * MWmin, 1e4), (1.15, 60), (0.634, 0.672), (0, 0.03)]
-                # MWavg, alfa, c_delta_agregados, Alinha_delta_agregados
-                # Obs: limites de Alinha_delta_agregados, c_delta_agregados com base nas pg. 85-87
-                #      da tese de Diana Maria Barrera (2012)
-            case 5:
-                limites_parâmetros = [(1.2 * MWmin, 1e4), (1.15, 60), (0.634, 0.672), (0, 0.03), (0.0494, 0.0496)]
-                # MWavg, alfa, c_delta_agregados, Alinha_delta_agregados, d_delta_agregados
-                # Obs: limites de Alinha_delta_agregados, c_delta_agregados, d_delta_agregados com base nas pg. 85-87
-                #      da tese de Diana Maria Barrera (2012)
-            case _:
-                limites_parâmetros = [(1.2 * MWmin, 1e4), (1.15, 60), (0.634, 0.672)]
-            # MWavg, alfa, c_delta_agregados
-            # Obs: limites de c_delta_agregados com base na pg. 87 da tese de Diana Maria Barrera (2012)
-            # OBS: em caso de erro, usar tipo_regressão == 3 como padrão.
-
-        if algoritmo_otimização == 3:
-            # 4.3.1.3 - L-BFGS-B
-            sol = scp.optimize.minimize(F_obj, chute_inicial, method="L-BFGS-B", bounds=limites_parâmetros,
-                                        args=argumentos_otimização)
+    configuração_regressão = (tipo_regressão, parâmetros_agregados, correlações_agregados)
+    argumentos_otimização = (dados_experimentais, propriedades_componentes, variáveis_distribuição_massa_molar,
+                             configuração_regressão)
+
+    # 4.2.1 - Chute inicial automático: MWavg, alfa e c_delta_agregados (os que forem estimados) partem da média dos
+    #         conjuntos de parâmetros de uma tabela de curvas do modelo cujas características (onset, inclinação e
+    #         yield máximo) mais se aproximam das da curva experimental
+    # Obs: ativado pela variável 'chute_inicial_automático' do arquivo 'variáveis_entrada_código.txt' (padrão: nao,
+    #      com os chutes lidos no próprio arquivo); a tabela é gerada uma única vez por sistema (e modelo) e salva em
+    #      'diretório_tabela_chute_inicial'
+    diretório_tabela_chute_inicial = os.path.join(diretório_deste_módulo, "Resultados", "Regressão",
+                                                  f"tabela_chute_inicial_{nome_planilha}.npz")
+    if chute_inicial_automático:
+        tabela_chute_inicial, tabela_gerada = carregar_ou_gerar_tabela_chute_inicial(
+            diretório_tabela_chute_inicial, argumentos_otimização,
+            montar_grades_parâmetros(tipo_regressão, obter_limites_parâmetros(tipo_regressão, MWmin),
+                                     correlação_delta_agregados))
+        chute_tabela = estimar_chute_inicial(ws_simplificados[:, 0], yields_exp, tabela_chute_inicial)
+        if chute_tabela is None:
+            print("ATENCAO: a curva experimental nao tem precipitacao comparavel as da tabela de chutes iniciais; "
+                  "serao usados os chutes lidos no arquivo 'variaveis_entrada_codigo.txt'.")
         else:
-            # 4.3.1.4 - Powell
-            sol = scp.optimize.minimize(F_obj, chute_inicial, method="Powell", bounds=limites_parâmetros,
-                                        args=argumentos_otimização)
+            chute_inicial[0:chute_tabela.shape[0]] = chute_tabela
+            print(f"CHUTE INICIAL DA TABELA ({'gerada' if tabela_gerada else 'carregada'}, "
+                  f"{tabela_chute_inicial['parâmetros'].shape[0]} curvas): {chute_inicial}")
 
-    else:  # Caso Erro
-        print("Problema na escolha da variável algoritmo_otimização.")
-        sol = 0
+    # 4.3 - Otimização
+    # Obs: os limites nos valores dos parâmetros (usados pelas opções 3 a 6 de 'algoritmo_otimização') estão
+    #      configurados na função 'obter_limites_parâmetros' do módulo 'módulo_regressão'
+    # Obs: o histórico de avaliações da função objetivo é salvo periodicamente em 'diretório_checkpoint'; se a
+    #      regressão for interrompida, a próxima execução (com retomar_regressão = True) continua do ponto em que parou
+    #      (desde que os dados e a configuração do modelo não tenham mudado); o arquivo é apagado ao final da regressão
+    limites_parâmetros = obter_limites_parâmetros(tipo_regressão, MWmin)
+    diretório_checkpoint = os.path.join(diretório_deste_módulo, "Resultados", "Regressão",
+                                        f"checkpoint_{nome_planilha}.npz")
+    intervalo_checkpoint = 60  # intervalo entre salvamentos do checkpoint (s)
+    retomar_regressão = True
+
+    # Obs: com comparar_algoritmos = True, a regressão é antes repetida com cada algoritmo de otimização
+    #      disponível (ver 'ALGORITMOS_OTIMIZAÇÃO' do 'módulo_regressão'), exibindo o DMA e o custo de cada um
+    comparar_algoritmos = False
+
+    # Obs: os pontos das diferenças finitas (gradientes da opção 3, regressão conjunta e hessiana da 'PARTE 4.5') são
+    #      avaliados simultaneamente em 'n_processos_derivadas' processos de trabalho, que recebem os dados
+    #      experimentais e as propriedades dos componentes uma única vez, em memória compartilhada
+    #      ('registro_derivadas'); os processos são criados apenas se algum desses cálculos for feito
+    n_processos_derivadas = os.cpu_count()
+    usar_processos_derivadas = __name__ == "__main__" and (
+        algoritmo_otimização == 3 or modo_regressão == 'conjunta' or comparar_algoritmos
+        or intervalos_confiança_parâmetros == 'covariancia')
+    executor_derivadas = ProcessPoolExecutor(max_workers=n_processos_derivadas) if usar_processos_derivadas else None
+    registro_derivadas = RegistroMemóriaCompartilhada()
+    gradiente = criar_gradiente_paralelo(executor=executor_derivadas, registro=registro_derivadas,
+                                         limites_parâmetros=limites_parâmetros) if algoritmo_otimização == 3 else None
+
+    if comparar_algoritmos:
+        comparação_algoritmos = comparar_algoritmos_otimização(
+            chute_inicial, argumentos_otimização, limites_parâmetros,
+            gradiente=criar_gradiente_paralelo(executor=executor_derivadas, registro=registro_derivadas,
+                                               limites_parâmetros=limites_parâmetros))
+        df_algoritmos = pd.DataFrame([[resultado["algoritmo"], f"{resultado['DMA']*100:.4f}",
+                                       resultado["n_avaliações"], resultado["n_cálculos_ELL"],
+                                       f"{resultado['tempo']:.1f}"] for resultado in comparação_algoritmos],
+                                     columns=["Algoritmo", "DMA (%)", "Avaliações", "Cálculos de ELL", "Tempo (s)"])
+        print("\nCOMPARACAO DOS ALGORITMOS DE OTIMIZACAO:")
+        print(f"{tabulate(df_algoritmos, headers = df_algoritmos.columns, tablefmt = 'pretty', showindex = False)}")
+
+    if modo_regressão == 'substituto':
+        sol = regredir_parâmetros_modelo_substituto(chute_inicial, argumentos_otimização, algoritmo_otimização,
+                                                    limites_parâmetros)
+        print(f"REGRESSAO COM MODELO SUBSTITUTO: {sol.nfev} avaliacoes do modelo completo ({sol.message})")
+    elif modo_regressão == 'minimos_quadrados':
+        intervalo_recálculo_jacobiana = 5  # 1: jacobiana por diferenças finitas em todas as iterações
+        sol = regredir_parâmetros_mínimos_quadrados(chute_inicial, argumentos_otimização, limites_parâmetros,
+                                                    intervalo_recálculo_jacobiana)
+        print(f"REGRESSAO POR MINIMOS QUADRADOS: {sol.nfev} avaliacoes do modelo completo, "
+              f"{sol.n_jacobianas_diferenças_finitas} jacobianas por diferencas finitas ({sol.message})")
+    elif modo_regressão == 'multifidelidade':
+        sol = regredir_parâmetros_multifidelidade(chute_inicial, argumentos_otimização, algoritmo_otimização,
+                                                  limites_parâmetros)
+        df_níveis = pd.DataFrame(
+            {"  n_agregados  ": [nível["n_agregados"] for nível in sol.níveis],
+             "  tolerancia ELL  ": [f"{nível['tolerância_ELL']:.0e}" for nível in sol.níveis],
+             "  parametros  ": [np.array2string(nível["x"], precision=4) for nível in sol.níveis],
+             "  DMA (%)  ": [f"{100*nível['DMA']:.4f}" for nível in sol.níveis],
+             "  avaliacoes  ": [nível["nfev"] for nível in sol.níveis],
+             "  tempo (s)  ": [f"{nível['tempo']:.1f}" for nível in sol.níveis],
+             "  deslocamento do otimo (%)  ": [f"{100*nível['deslocamento']:.3f}"
+                                               if np.isfinite(nível['deslocamento']) else "-" for nível in sol.níveis]}
+             )
+        print("\nREGRESSAO MULTIFIDELIDADE (deslocamento: maxima variacao relativa dos parametros em relacao ao nivel "
+              "anterior)")
+        print(f"{tabulate(df_níveis, headers = df_níveis.columns, tablefmt = 'pretty', showindex = False)}")
+    elif modo_regressão == 'incremental':
+        diretório_estado_incremental = os.path.join(diretório_deste_módulo, "Resultados", "Regressão",
+                                                    f"estado_incremental_{nome_planilha}.npz")
+        sol = regredir_parâmetros_incremental(chute_inicial, argumentos_otimização, algoritmo_otimização,
+                                              limites_parâmetros, diretório_estado_incremental)
+        print(f"REGRESSAO INCREMENTAL: {sol.n_pontos_recalculados} de {yields_exp.shape[0]} pontos novos ou "
+              f"alterados, {sol.nfev} avaliacoes "
+              f"({'a partir do otimo salvo' if sol.retomada else 'sem estado salvo: regressao completa'})")
+    elif modo_regressão == 'tolerancia_adaptativa':
+        sol = regredir_parâmetros_tolerância_adaptativa(chute_inicial, argumentos_otimização, algoritmo_otimização,
+                                                        limites_parâmetros)
+        print(f"REGRESSAO COM TOLERANCIA DE ELL ADAPTATIVA: {sol.nfev} avaliacoes ({sol.n_avaliações_polimento} no "
+              f"polimento); avaliacoes por tolerancia: "
+              + ", ".join(f"{tolerância:.0e}: {n}" for tolerância, n in sorted(sol.avaliações_por_tolerância.items(),
+                                                                                 reverse=True)))
+    elif modo_regressão == 'conjunta':
+        # Obs: planilhas ('nome_planilha' e as de 'planilhas_regressão_conjunta') e parâmetros compartilhados lidos no
+        #      arquivo 'variáveis_entrada_código.txt'; os demais parâmetros estimados ('tipo_regressão') são
+        #      individuais. As PARTES seguintes usam os parâmetros de 'nome_planilha'
+        parâmetros_inválidos = [nome for nome in parâmetros_compartilhados if nome not in NOMES_PARÂMETROS]
+        if parâmetros_inválidos:
+            mensagem = "\nATENCAO: Corrija o arquivo 'variaveis_entrada_codigo.txt'"
+            mensagem += f"\nPONTO A CORRIGIR: os parametros compartilhados {parâmetros_inválidos} nao estao entre " \
+                        f"{list(NOMES_PARÂMETROS)}."
+            raise ValueError(mensagem)
+        planilhas_regressão_conjunta = [nome_planilha] + [planilha for planilha in planilhas_regressão_conjunta
+                                                          if planilha != nome_planilha]
+        regressões_planilhas = [montar_regressão_a_partir_dos_arquivos(diretório_do_txt, diretório_do_xlsx, planilha)
+                                for planilha in planilhas_regressão_conjunta]
+        sol_conjunta = regredir_parâmetros_conjunta(
+            [regressão[0] for regressão in regressões_planilhas], [regressão[1] for regressão in regressões_planilhas],
+            limites_parâmetros, tipo_regressão, parâmetros_compartilhados, executor_derivadas)
+        sol = scp.optimize.OptimizeResult(x=sol_conjunta.parâmetros_petróleos[0], fun=sol_conjunta.DMAs[0])
+        df_conjunta = pd.DataFrame(
+            {"  Planilha  ": planilhas_regressão_conjunta,
+             **{f"  {nome}{' (comp.)' if nome in parâmetros_compartilhados else ''}  ":
+                [f"{parâmetros[j]:.6g}" for parâmetros in sol_conjunta.parâmetros_petróleos]
+                for j, nome in enumerate(NOMES_PARÂMETROS[0:chute_inicial.shape[0]])},
+             "  DMA (%)  ": [f"{100*DMA:.4f}" for DMA in sol_conjunta.DMAs]}
+             )
+        print(f"\nREGRESSAO CONJUNTA: {sol_conjunta.nfev} calculos de curvas de solubilidade, {sol_conjunta.nit} "
+              f"jacobianas ({sol_conjunta.message})")
+        print(f"{tabulate(df_conjunta, headers = df_conjunta.columns, tablefmt = 'pretty', showindex = False)}")
+    elif modo_regressão == 'orcamento':
+        # Obs: orçamento lido na 'PARTE 1' (None: sem limite)
+        sol = regredir_parâmetros_com_orçamento(chute_inicial, argumentos_otimização, algoritmo_otimização,
+                                                limites_parâmetros, tempo_máximo_regressão,
+                                                n_avaliações_máximo_regressão, gradiente)
+        print(f"REGRESSAO COM ORCAMENTO: {sol.nfev} avaliacoes em {sol.tempo:.1f} s, "
+              f"{'interrompida' if sol.estado != 'concluído' else 'concluida'} ({sol.message})")
+    else:
+        sol = regredir_parâmetros_com_checkpoint(chute_inicial, argumentos_otimização, algoritmo_otimização,
+                                                 limites_parâmetros, diretório_checkpoint, intervalo_checkpoint,
+                                                 retomar_regressão, gradiente)
 
     # 4.4 - Alocação dos parâmetros estimados
-    match tipo_regressão:
-        case 1: MWavg = sol.x[0]
-        case 2: MWavg, alfa = sol.x
-        case 3: MWavg, alfa, c_delta_agregados = sol.x
-        case 4: MWavg, alfa, c_delta_agregados, Alinha_delta_agregados = sol.x
-        case 5: MWavg, alfa, c_delta_agregados, Alinha_delta_agregados, d_delta_agregados = sol.x
-        case _: print("Problema na escolha da variavél tipo_regressão.")  # Caso Erro
+    MWavg, alfa, c_delta_agregados, Alinha_delta_agregados, d_delta_agregados = desempacotar_parâmetros(
+        sol.x, tipo_regressão, parâmetros_agregados)
+
+    # 4.5 - Covariância dos parâmetros estimados pela hessiana da soma dos quadrados dos resíduos (opcional)
+    if intervalos_confiança_parâmetros == 'covariancia':
+        covariância_parâmetros, erros_padrão_parâmetros, correlações_parâmetros, _ = estimar_covariância_parâmetros(
+            sol.x, argumentos_otimização, executor_derivadas, registro_derivadas, limites_parâmetros)
+    if executor_derivadas is not None:
+        executor_derivadas.shutdown()
+    registro_derivadas.fechar()
 
 # ======================================================================================================================
 # PARTE 5 - PREDIÇÃO DA CURVA DE SOLUBILIDADE
 
-# 5.1 - Propriedades dos agregados de asfaltenos
-# 5.1.1 - Massas molares, frações mássicas e frações molares
-MMsagregados, wsagregados, xsagregados = gerar_distribuição_massa_molar(
-    alfa, MWavg, n_agregados, MWmin, MWmax, tipo_cálculo_MM_agregados, método_integração_FDP_Gamma)
-wsagregados = normalizar_composição(wsagregados)  # normalização das frações mássicas
-xsagregados = normalizar_composição(xsagregados)  # normalização das frações molares
-
-# 5.1.2 - Densidades, parâmetros de solubilidades e volumes molares
-rhosagregados, deltasagregados, Vsagregados = calcular_propriedades_agregados(
-    T, MMsagregados, correlação_densidade_agregados, correlação_delta_agregados,
-    Alinha_delta_agregados, c_delta_agregados, d_delta_agregados)
-
-# 5.1.3 - Alocação das propriedades dos agregados de asfaltenos nos arrays das propriedades dos componentes do sistema
-MMs[4:4 + n_agregados] = MMsagregados[0:n_agregados]*1e-3  # kg/mol
-rhos[4:4 + n_agregados] = rhosagregados[0:n_agregados] 
-deltas[4:4 + n_agregados] = deltasagregados[0:n_agregados]
-Vs[4:4 + n_agregados] = Vsagregados[0:n_agregados] 
-
-# 5.2 - COMPOSIÇÃO GLOBAL DO SISTEMA EM TERMOS DE [Solvente, S, A, R, Asf0, Asf1, ...] (base mássica e base molar)
-ws_completo, xs_completo = fracionar_composição_global(ws_simplificados, SARA, wsagregados, MMs)
-ws_completo = np.apply_along_axis(func1d=normalizar_composição, axis=1, arr=ws_completo)
-# normalização das frações mássicas de cada linha
-xs_completo = np.apply_along_axis(func1d=normalizar_composição, axis=1, arr=xs_completo)
-# normalização das frações molares de cada linha
-
-# 5.3 - CÁLCULO DE EQUILÍBRIO LÍQUIDO-LÍQUIDO
-# 5.3.1 - Nº de dados experimentais
-n_dados_exp = yields_exp.shape[0]
-
-# 5.3.2 - Inicialização dos arrays que armazenarão os resultados dos cálculos de ELL
-betasrr = np.zeros(n_dados_exp)  # betas de Rachford-Rice
-xsL, xsH = [np.zeros((n_dados_exp, 4 + n_agregados)) for _ in range(2)]
-# composição da fase leve, composição da fase pesada
-somaxsL, somaxsH = [np.zeros(n_dados_exp) for _ in range(2)]
-# soma da composição da fase leve, soma da composição da fase pesada
-n_it = np.zeros(n_dados_exp)  # nº de iterações
-
-# 5.3.3 - Inicialização do array que armazenará os yields calculados
-yields_calc = np.zeros(n_dados_exp)
-
-# 5.3.4 - Cálculos das composições de ELL e yields de asfaltenos p/ cada i-ésimo dado experimental
-for i in range(n_dados_exp):
-    betasrr[i], xsL[i, :], xsH[i, :], n_it[i] = calcular_composições_ELL(T, xs_completo[i], deltas, Vs, xsagregados)
-    somaxsL[i], somaxsH[i] = np.round(xsL[i, :].sum(), decimals=8), np.round(xsH[i, :].sum(), decimals=8)
-    yields_calc[i] = calcular_yield_asfaltenos(betasrr[i], xsL[i, :], xsH[i, :], MMs)
+# 5.1 - Cálculos das propriedades dos agregados, das composições de ELL e dos yields de asfaltenos
+# p/ cada i-ésimo dado experimental
+(yields_calc, betasrr, xsL, xsH, n_it, MMs, MMsagregados, xsagregados) = calcular_curva_solubilidade(
+    (MWavg, alfa, c_delta_agregados, Alinha_delta_agregados, d_delta_agregados), (T, SARA, ws_simplificados),
+    (MMs, rhos, deltas, Vs),
+    (n_agregados, MWmin, MWmax, tipo_cálculo_MM_agregados, método_integração_FDP_Gamma,
+     método_discretização_agregados),
+    correlações_agregados)
+
+# 5.2 - Soma das composições das fases leve e pesada de cada ponto
+somaxsL = np.round(xsL.sum(axis=1), decimals=8)
+somaxsH = np.round(xsH.sum(axis=1), decimals=8)
 
 # ======================================================================================================================
 # PARTE 6 - EXIBIÇÃO DOS RESULTADOS
@@ -309,9 +365,160 @@ df_resultados = pd.DataFrame(
 print(f"\n| DESVIO MEDIO ABSOLUTO NOS YIELDS (%): {DMA_formatado}")
 if tipo_cálculo_programa == 'regressao':
     print(f"PARAMETROS ESTIMADOS: {sol.x}")
+    if intervalos_confiança_parâmetros == 'covariancia':
+        print(f"ERROS-PADRAO (HESSIANA): {erros_padrão_parâmetros}")
     print(f"{tabulate(df_resultados, headers = df_resultados.columns, tablefmt = 'pretty', showindex = False)}")
 
 # 6.4 - Criação dos gráficos: yield curves e distribuição de massa molar
-informações_auxiliares = [DMA_formatado, tipo_cálculo_programa, tipo_regressão, algoritmo_otimização, nome_planilha]
+# Obs: no modo 'incerteza', os gráficos são salvos como os do modo 'predicao'
+tipo_cálculo_gráficos = 'regressao' if tipo_cálculo_programa == 'regressao' else 'predicao'
+informações_auxiliares = [DMA_formatado, tipo_cálculo_gráficos, tipo_regressão, algoritmo_otimização, nome_planilha]
 plotar_yield_curves(ws_simplificados[:, 0], yields_exp, yields_calc, informações_auxiliares)
 plotar_distribuição_massa_molar(MMsagregados, xsagregados, alfa, MWavg, informações_auxiliares)
+
+# 6.5 - Exportação dos resultados de ELL de cada ponto (betas, composições das fases e nº de iterações) em Parquet
+# Obs: requer o pacote 'pyarrow'; sem ele, apenas um aviso é exibido
+diretório_resultados_ELL = os.path.join(diretório_deste_módulo, "Resultados",
+                                        "Regressão" if tipo_cálculo_gráficos == 'regressao' else "Predição",
+                                        f"resultados_ELL_{nome_planilha}.parquet")
+metadados_resultados_ELL = {
+    "planilha": nome_planilha, "solvente": solvente,
+    "parametros_agregados": [MWavg, alfa, c_delta_agregados, Alinha_delta_agregados, d_delta_agregados],
+    "massas_molares_kg_mol": MMs}
+escritor_resultados_ELL = abrir_escritor_resultados_ELL(diretório_resultados_ELL,
+                                                        montar_nomes_componentes(MMsagregados.shape[0]),
+                                                        metadados=metadados_resultados_ELL)
+if escritor_resultados_ELL is not None:
+    escritor_resultados_ELL.escrever(0, T, ws_simplificados[:, 0], betasrr, yields_calc, xsL, xsH, n_it)
+    escritor_resultados_ELL.fechar()
+
+# ======================================================================================================================
+# PARTE 7 - PROPAGAÇÃO DAS INCERTEZAS DE MEDIÇÃO (MONTE CARLO)
+# Este bloco é executado apenas se tipo_cálculo_programa == 'incerteza'
+# Obs: a proteção '__name__ == "__main__"' evita que processos de trabalho iniciados por 'spawn' repitam este bloco
+
+if tipo_cálculo_programa == 'incerteza' and __name__ == "__main__":
+
+    # 7.1 - Configuração da propagação (a ser editada diretamente neste módulo)
+    n_amostras_monte_carlo = 5000
+    desvio_SARA = 0.015  # desvio-padrão absoluto de cada fração SARA (fração mássica, ±1.5 wt%)
+    desvio_T = 1.0  # desvio-padrão da temperatura (K)
+    desvio_yields = 0.0  # desvio-padrão dos yields medidos (fração mássica); 0 para desconsiderar
+    semente_monte_carlo = 0
+    n_processos_monte_carlo = os.cpu_count()
+
+    # 7.2 - Amostragem e avaliação das curvas de solubilidade perturbadas
+    argumentos_modelo = (
+        (MWavg, alfa, c_delta_agregados, Alinha_delta_agregados, d_delta_agregados), correlações_componentes,
+        (n_agregados, MWmin, MWmax, tipo_cálculo_MM_agregados, método_integração_FDP_Gamma,
+         método_discretização_agregados))
+    percentis_yields = propagar_incertezas_monte_carlo(
+        (T, SARA, ws_simplificados, solvente), (desvio_SARA, desvio_T, desvio_yields), argumentos_modelo,
+        n_amostras=n_amostras_monte_carlo, n_processos=n_processos_monte_carlo, semente=semente_monte_carlo)[0]
+
+    # 7.3 - Impressão das faixas de percentis (2.5%, 50% e 97.5%)
+    df_incertezas = pd.DataFrame(
+        {"  Fracao Solvente  ": ws_simplificados[:, 0],
+         "  yield (exp.)  ": yields_exp_formatado,
+         "  yield (calc.)  ": yields_calc_formatado,
+         "  P2.5  ": [f"{100*yield_percentil:.2f}%" for yield_percentil in percentis_yields[0]],
+         "  P50  ": [f"{100*yield_percentil:.2f}%" for yield_percentil in percentis_yields[1]],
+         "  P97.5  ": [f"{100*yield_percentil:.2f}%" for yield_percentil in percentis_yields[2]]}
+         )
+    print(f"\n| INCERTEZAS (MONTE CARLO, {n_amostras_monte_carlo} AMOSTRAS): desvio SARA = {100*desvio_SARA:.2f} wt%, "
+          f"desvio T = {desvio_T:.2f} K")
+    print(f"{tabulate(df_incertezas, headers = df_incertezas.columns, tablefmt = 'pretty', showindex = False)}")
+
+# ======================================================================================================================
+# PARTE 8 - INTERVALOS DE CONFIANÇA DOS PARÂMETROS ESTIMADOS (BOOTSTRAP E LEAVE-ONE-OUT)
+# Este bloco é executado apenas se tipo_cálculo_programa == 'regressao' e intervalos_confiança_parâmetros == 'bootstrap'
+
+if tipo_cálculo_programa == 'regressao' and intervalos_confiança_parâmetros == 'bootstrap' \
+        and __name__ == "__main__":
+
+    # 8.1 - Configuração (a ser editada diretamente neste módulo)
+    n_bootstrap = 200
+    nível_confiança = 0.95
+    semente_bootstrap = 0
+    n_processos_bootstrap = os.cpu_count()
+
+    # 8.2 - Regressões com as reamostragens, partindo do ótimo obtido com todos os pontos
+    ic_bootstrap, ic_leave_one_out, correlações_parâmetros = estimar_intervalos_confiança(
+        sol.x, argumentos_otimização, algoritmo_otimização, limites_parâmetros, n_bootstrap=n_bootstrap,
+        nível_confiança=nível_confiança, n_processos=n_processos_bootstrap, semente=semente_bootstrap)[0:3]
+
+    # 8.3 - Impressão dos intervalos de confiança e das correlações
+    nomes_parâmetros = ["MWavg", "alfa", "c_delta_agregados", "Alinha_delta_agregados",
+                        "d_delta_agregados"][0:sol.x.shape[0]]
+    df_intervalos = pd.DataFrame(
+        {"  Parametro  ": nomes_parâmetros,
+         "  Estimado  ": [f"{parâmetro:.6g}" for parâmetro in sol.x],
+         "  IC bootstrap  ": [f"[{inferior:.6g}, {superior:.6g}]" for inferior, superior in ic_bootstrap],
+         "  IC leave-one-out  ": [f"[{inferior:.6g}, {superior:.6g}]" for inferior, superior in ic_leave_one_out]}
+         )
+    df_correlações = pd.DataFrame(np.round(correlações_parâmetros, 4), columns=nomes_parâmetros)
+    df_correlações.insert(0, "", nomes_parâmetros)
+    print(f"\n| INTERVALOS DE CONFIANCA ({100*nível_confiança:.0f}%), {n_bootstrap} REAMOSTRAGENS BOOTSTRAP")
+    print(f"{tabulate(df_intervalos, headers = df_intervalos.columns, tablefmt = 'pretty', showindex = False)}")
+    print("| CORRELACOES ENTRE OS PARAMETROS (BOOTSTRAP)")
+    print(f"{tabulate(df_correlações, headers = df_correlações.columns, tablefmt = 'pretty', showindex = False)}")
+
+# ======================================================================================================================
+# PARTE 9 - MAPA DE YIELDS SOBRE FRAÇÕES DE SOLVENTE X TEMPERATURAS
+# Este bloco é executado apenas se tipo_cálculo_programa == 'mapa'
+
+if tipo_cálculo_programa == 'mapa':
+
+    # 9.1 - Configuração da malha (a ser editada diretamente neste módulo)
+    frações_solvente_mapa = np.linspace(0.40, 0.99, 60)
+    temperaturas_mapa = np.linspace(T - 30, T + 30, 13)  # K
+    diretório_mapa = os.path.join(diretório_deste_módulo, "Resultados", "Predição", f"mapa_{nome_planilha}.npz")
+
+    # 9.2 - Cálculo do mapa com os parâmetros dos agregados (lidos na 'PARTE 1'), com os resultados de ELL de cada
+    # ponto exportados em Parquet (índice da temperatura como configuração), ver 6.5
+    escritor_mapa = abrir_escritor_resultados_ELL(diretório_mapa.replace(".npz", "_ELL.parquet"),
+                                                  montar_nomes_componentes(MMsagregados.shape[0]),
+                                                  metadados=metadados_resultados_ELL)
+    yields_mapa, betas_mapa, onsets_mapa, _ = gerar_mapa_yields(
+        (MWavg, alfa, c_delta_agregados, Alinha_delta_agregados, d_delta_agregados), SARA, solvente,
+        correlações_componentes,
+        (n_agregados, MWmin, MWmax, tipo_cálculo_MM_agregados, método_integração_FDP_Gamma,
+         método_discretização_agregados),
+        frações_solvente_mapa, temperaturas_mapa, diretório_mapa, escritor_resultados=escritor_mapa)
+    if escritor_mapa is not None:
+        escritor_mapa.fechar()
+
+    # 9.3 - Impressão dos onsets e do yield máximo em cada temperatura
+    df_mapa = pd.DataFrame(
+        {"  T (K)  ": [f"{temperatura:.2f}" for temperatura in temperaturas_mapa],
+         "  Onset (fracao solvente)  ": [f"{onset:.4f}" for onset in onsets_mapa],
+         f"  yield em w = {frações_solvente_mapa[-1]:.2f}  ": [f"{100*yields_temperatura[-1]:.2f}%"
+                                                                for yields_temperatura in yields_mapa]}
+         )
+    print(f"\n| MAPA DE YIELDS ({temperaturas_mapa.shape[0]} temperaturas x {frações_solvente_mapa.shape[0]} "
+          f"fracoes de solvente) salvo em '{diretório_mapa}'")
+    print(f"{tabulate(df_mapa, headers = df_mapa.columns, tablefmt = 'pretty', showindex = False)}")
+
+# ======================================================================================================================
+# PARTE 10 - TRIAGEM DE UMA BIBLIOTECA DE ENSAIOS SARA (ONSET E YIELDS NAS DILUIÇÕES PADRÃO)
+# Este bloco é executado apenas se tipo_cálculo_programa == 'triagem'
+# Obs: a proteção '__name__ == "__main__"' evita que processos de trabalho iniciados por 'spawn' repitam este bloco
+
+if tipo_cálculo_programa == 'triagem' and __name__ == "__main__":
+
+    # 10.1 - Configuração da triagem (a ser editada diretamente neste módulo)
+    # Obs: ensaios em .csv ou .parquet, com as colunas 'S', 'A', 'R', 'Asf' e 'T' (K) e, opcionalmente,
+    #      'identificador', 'solvente' e os parâmetros dos agregados (ver 'preparar_bloco_ensaios')
+    diretório_ensaios = os.path.join(diretório_deste_módulo, "ensaios_triagem.csv")
+    diretório_triagem = os.path.join(diretório_deste_módulo, "Resultados", "Predição", "triagem_ensaios.csv")
+    n_processos_triagem = os.cpu_count()
+
+    # 10.2 - Triagem com os parâmetros dos agregados lidos na 'PARTE 1' (nos ensaios que não os informam)
+    if not os.path.isfile(diretório_ensaios):
+        print(f"\nATENCAO: o arquivo de ensaios '{diretório_ensaios}' nao existe. A triagem nao sera executada.")
+    else:
+        resumo_triagem = triar_ensaios(diretório_ensaios, diretório_triagem, ler_configuração_padrão(diretório_do_txt),
+                                       solvente_padrão=solvente, n_processos=n_processos_triagem)
+        print(f"\n| TRIAGEM: {resumo_triagem['n_ensaios']} ensaios ({resumo_triagem['n_ensaios_inválidos']} invalidos) "
+              f"em {resumo_triagem['tempo']:.1f} s ({resumo_triagem['ensaios_por_minuto']:.0f} ensaios/min), "
+              f"resultados salvos em '{diretório_triagem}'")
@@ -0,0 +1,258 @@
+# Importação de bibliotecas do python
+import numpy as np
+
+# Importação de outros módulos deste projeto
+from módulo_leitura_dados import ler_dados_experimentais
+from módulo_composições import normalizar_composição
+from módulo_curva_solubilidade import calcular_propriedades_solvente_SAR, gerar_distribuição_agregados_normalizada, \
+    montar_sistemas_lote
+from módulo_equilíbrio_líquido_líquido import calcular_composições_ELL_lote, calcular_yields_asfaltenos_lote
+from módulo_regressão import desempacotar_parâmetros, montar_chute_inicial, obter_limites_parâmetros, \
+    regredir_parâmetros
+
+
+# Função
+def carregar_conjunto_dados(diretório_do_xlsx, nomes_planilhas):
+    """ Lê os dados experimentais de um ou mais petróleos do arquivo 'dados_experimentais.xlsx'.
+
+    Inputs:
+        diretório_do_xlsx (string)    : diretório do arquivo 'dados_experimentais.xlsx'
+        nomes_planilhas (string/list) : nome da planilha (ou lista de nomes) de cada petróleo
+
+    Outputs:
+        dados (dict) : dicionário com as chaves
+                       'SARAs' (array)            : composições SARA normalizadas, dimensões (nº de petróleos, 4)
+                       'Ts' (array)               : temperaturas (K), uma por petróleo
+                       'solventes' (list)         : solvente de cada petróleo ("n-heptano" ou "n-pentano")
+                       'frações_solvente' (list)  : frações mássicas de solvente (array) de cada petróleo
+                       'yields_exp' (list)        : yields fracionais experimentais (array) de cada petróleo
+    """
+
+    if isinstance(nomes_planilhas, str):
+        nomes_planilhas = [nomes_planilhas]
+
+    dados = {"SARAs": [], "Ts": [], "solventes": [], "frações_solvente": [], "yields_exp": []}
+    for nome_planilha in nomes_planilhas:
+        SARA, T, solvente, ws_simplificados, yields_exp = ler_dados_experimentais(diretório_do_xlsx, nome_planilha)
+        dados["SARAs"].append(normalizar_composição(np.asarray(SARA, dtype=float)))
+        dados["Ts"].append(float(T))
+        dados["solventes"].append(solvente)
+        dados["frações_solvente"].append(np.asarray(ws_simplificados[:, 0], dtype=float))
+        dados["yields_exp"].append(np.asarray(yields_exp, dtype=float))
+    dados["SARAs"], dados["Ts"] = np.array(dados["SARAs"]), np.array(dados["Ts"])
+
+    return dados
+
+
+# Função
+def construir_modelo(SARAs, Ts, solvente, configuração):
+    """ Monta o modelo de um ou mais petróleos, pré-calculando as propriedades que independem dos parâmetros dos
+        agregados e das frações de solvente (propriedades do solvente, saturados, aromáticos e resinas em cada
+        temperatura), de modo que sejam reaproveitadas em todas as predições e regressões.
+
+    Inputs:
+        SARAs (array)        : composição SARA (base mássica) de cada petróleo, dimensões (nº de petróleos, 4)
+                               ou (4,)
+        Ts (array)           : temperatura (K) de cada petróleo (ou uma temperatura comum a todos)
+        solvente (string)    : nome do solvente ("n-heptano" ou "n-pentano"), comum a todos os petróleos
+        configuração (tuple) : (parâmetros_agregados, correlações_componentes,
+                               variáveis_distribuição_massa_molar), ver 'ler_configuração_padrão';
+                               'parâmetros_agregados' são os valores padrão dos parâmetros não informados/estimados
+
+    Outputs:
+        modelo (dict) : dicionário com as chaves 'SARAs', 'Ts', 'solvente', 'parâmetros_agregados',
+                        'correlações_componentes', 'variáveis_distribuição_massa_molar' e
+                        'propriedades_solvente_SAR' (ver 'calcular_propriedades_solvente_SAR')
+    """
+
+    parâmetros_agregados, correlações_componentes, variáveis_distribuição_massa_molar = configuração
+    if variáveis_distribuição_massa_molar[5] == "adaptativo":
+        raise ValueError("A discretizacao 'adaptativo' depende dos dados de cada sistema; informe uma "
+                         "discretizacao fixa ('uniforme', 'equiprobabilidade' ou 'quadratura_gauss').")
+
+    SARAs = np.atleast_2d(np.asarray(SARAs, dtype=float))
+    SARAs = SARAs/SARAs.sum(axis=1, keepdims=True)
+    Ts = np.broadcast_to(np.asarray(Ts, dtype=float), (SARAs.shape[0],)).copy()
+
+    return {"SARAs": SARAs, "Ts": Ts, "solvente": solvente,
+            "parâmetros_agregados": tuple(float(parâmetro) for parâmetro in parâmetros_agregados),
+            "correlações_componentes": tuple(correlações_componentes),
+            "variáveis_distribuição_massa_molar": tuple(variáveis_distribuição_massa_molar),
+            "propriedades_solvente_SAR": calcular_propriedades_solvente_SAR(Ts, solvente,
+                                                                            correlações_componentes[0:6])}
+
+
+# Função
+def selecionar_petróleos(modelo, índices):
+    """ Retorna o modelo restrito aos petróleos indicados (sem recalcular as propriedades).
+
+    Inputs:
+        modelo (dict)         : ver 'construir_modelo'
+        índices (int/array)   : índice(s) dos petróleos
+
+    Outputs:
+        modelo_selecionado (dict) : modelo com os petróleos indicados, na ordem de 'índices'
+    """
+
+    índices = np.atleast_1d(índices)
+    return {**modelo, "SARAs": modelo["SARAs"][índices], "Ts": modelo["Ts"][índices],
+            "propriedades_solvente_SAR": tuple(propriedades[índices]
+                                               for propriedades in modelo["propriedades_solvente_SAR"])}
+
+
+# Função
+def prever_yields(modelo, parâmetros, frações_solvente):
+    """ Calcula os yields de asfaltenos de todos os petróleos do modelo, para um ou vários conjuntos de parâmetros
+        dos agregados, com um único cálculo de ELL vetorizado sobre todos os conjuntos, petróleos e frações de
+        solvente.
+
+    Inputs:
+        modelo (dict)            : ver 'construir_modelo'
+        parâmetros (array)       : parâmetros dos agregados (MWavg, alfa, c_delta_agregados, Alinha_delta_agregados,
+                                   d_delta_agregados), dimensões (5,) ou (nº de conjuntos, 5); conjuntos com menos
+                                   de 5 colunas completam-se com os valores padrão do modelo
+        frações_solvente (array) : frações mássicas de solvente, comuns a todos os petróleos
+
+    Outputs:
+        yields (array) : yields fracionais, dimensões (nº de petróleos, nº de frações de solvente) ou, com vários
+                         conjuntos de parâmetros, (nº de conjuntos, nº de petróleos, nº de frações de solvente)
+
+    Observações:
+        Conjuntos de parâmetros cuja distribuição de massa molar não pode ser calculada (ex: alfa muito grande)
+        recebem yields NaN, sem interromper os demais.
+    """
+
+    parâmetros = np.asarray(parâmetros, dtype=float)
+    vários_conjuntos = parâmetros.ndim == 2
+    conjuntos_parâmetros = np.atleast_2d(parâmetros)
+    frações_solvente = np.atleast_1d(np.asarray(frações_solvente, dtype=float))
+    ws_simplificados = np.column_stack((frações_solvente, 1 - frações_solvente))
+    n_petróleos, n_frações = modelo["SARAs"].shape[0], frações_solvente.shape[0]
+    n_pontos = n_petróleos*n_frações
+
+    # Composições globais e propriedades de todos os pontos de todos os conjuntos de parâmetros
+    n_agregados = modelo["variáveis_distribuição_massa_molar"][0]
+    sistemas = []
+    for parâmetros_conjunto in conjuntos_parâmetros:
+        parâmetros_agregados = desempacotar_parâmetros(parâmetros_conjunto, parâmetros_conjunto.shape[0],
+                                                       modelo["parâmetros_agregados"])
+        try:
+            with np.errstate(all="ignore"):
+                distribuição_agregados = gerar_distribuição_agregados_normalizada(
+                    parâmetros_agregados, modelo["variáveis_distribuição_massa_molar"])
+                xs_completo, MMs, deltas, Vs = montar_sistemas_lote(
+                    parâmetros_agregados, (modelo["Ts"], modelo["SARAs"], ws_simplificados),
+                    modelo["propriedades_solvente_SAR"], modelo["correlações_componentes"][6:8],
+                    distribuição_agregados)
+            xsagregados = np.broadcast_to(distribuição_agregados[2], (n_pontos, n_agregados))
+        except (ValueError, ArithmeticError):
+            xs_completo, MMs, deltas, Vs = (np.full((n_pontos, 4 + n_agregados), np.nan) for _ in range(4))
+            xsagregados = np.full((n_pontos, n_agregados), np.nan)
+        sistemas.append((xs_completo, MMs, deltas, Vs, xsagregados))
+    xs_completo, MMs, deltas, Vs, xsagregados = (np.concatenate(arrays) for arrays in zip(*sistemas))
+
+    # Cálculo de ELL vetorizado apenas nos pontos válidos
+    yields = np.full(xs_completo.shape[0], np.nan)
+    válidos = np.isfinite(xs_completo).all(axis=1) & np.isfinite(deltas).all(axis=1) & np.isfinite(Vs).all(axis=1)
+    if válidos.any():
+        Ts = np.tile(np.repeat(modelo["Ts"], n_frações), conjuntos_parâmetros.shape[0])
+        betasrr, xsL, xsH, _ = calcular_composições_ELL_lote(Ts[válidos], xs_completo[válidos], deltas[válidos],
+                                                             Vs[válidos], xsagregados[válidos])
+        yields[válidos] = calcular_yields_asfaltenos_lote(betasrr, xsL, xsH, MMs[válidos])
+
+    yields = yields.reshape(conjuntos_parâmetros.shape[0], n_petróleos, n_frações)
+    return yields if vários_conjuntos else yields[0]
+
+
+# Função
+def calcular_DMA_modelo(parâmetros, modelo, frações_solvente, yields_exp, tipo_regressão):
+    """ Função objetivo de 'ajustar_modelo': média dos desvios absolutos entre os yields calculados (ELL vetorizado)
+        e experimentais de um petróleo (como em 'F_obj').
+
+    Inputs:
+        parâmetros (array)       : valores dos parâmetros estimados
+        modelo (dict)            : modelo de um único petróleo, ver 'construir_modelo'
+        frações_solvente (array) : frações mássicas de solvente dos pontos experimentais
+        yields_exp (array)       : yields fracionais experimentais
+        tipo_regressão (int)     : define quais parâmetros são regredidos, ver 'obter_número_parâmetros'
+
+    Outputs:
+        DMA (float) : média dos desvios absolutos fracionais nos yields (infinito se o cálculo falhar)
+    """
+
+    parâmetros_agregados = desempacotar_parâmetros(parâmetros, tipo_regressão, modelo["parâmetros_agregados"])
+    yields_calc = prever_yields(modelo, parâmetros_agregados, frações_solvente)[0]
+    DMA = np.abs(yields_calc - yields_exp).mean()
+
+    return DMA if np.isfinite(DMA) else np.inf
+
+
+# Função
+def ajustar_modelo(modelo, frações_solvente, yields_exp, tipo_regressão=2, algoritmo_otimização=4,
+                   chutes_iniciais=None):
+    """ Regride os parâmetros dos agregados de cada petróleo do modelo (uma regressão por petróleo).
+
+    Inputs:
+        modelo (dict)               : ver 'construir_modelo'
+        frações_solvente (list)     : frações mássicas de solvente (array) dos pontos experimentais de cada
+                                      petróleo
+        yields_exp (list)           : yields fracionais experimentais (array) de cada petróleo
+        tipo_regressão (int)        : define quais parâmetros são regredidos, ver 'obter_número_parâmetros'
+        algoritmo_otimização (int)  : algoritmo de otimização, ver 'regredir_parâmetros' (padrão: Powell, que
+                                      respeita os limites de 'obter_limites_parâmetros')
+        chutes_iniciais (array)     : chutes iniciais, uma linha por petróleo (padrão: valores padrão do modelo)
+
+    Outputs:
+        Uma tupla contendo os seguintes elementos:
+            parâmetros_ajustados (array) : parâmetros dos agregados (MWavg, alfa, c_delta_agregados,
+                                           Alinha_delta_agregados, d_delta_agregados), uma linha por petróleo
+            DMAs (array)                 : DMA final de cada petróleo
+            soluções (list)              : resultado da otimização (OptimizeResult) de cada petróleo
+    """
+
+    n_petróleos = modelo["SARAs"].shape[0]
+    if len(frações_solvente) != n_petróleos or len(yields_exp) != n_petróleos:
+        raise ValueError(f"Informe as fracoes de solvente e os yields experimentais de cada um dos {n_petróleos} "
+                         f"petroleo(s) do modelo.")
+    limites_parâmetros = obter_limites_parâmetros(tipo_regressão, modelo["variáveis_distribuição_massa_molar"][1])
+
+    parâmetros_ajustados, DMAs, soluções = np.zeros((n_petróleos, 5)), np.zeros(n_petróleos), []
+    for i in range(n_petróleos):
+        chute_inicial = montar_chute_inicial(tipo_regressão, modelo["parâmetros_agregados"]) \
+            if chutes_iniciais is None else np.asarray(chutes_iniciais[i], dtype=float)
+        argumentos_otimização = (selecionar_petróleos(modelo, i), np.asarray(frações_solvente[i], dtype=float),
+                                 np.asarray(yields_exp[i], dtype=float), tipo_regressão)
+        sol = regredir_parâmetros(chute_inicial, argumentos_otimização, algoritmo_otimização, limites_parâmetros,
+                                  função_objetivo=calcular_DMA_modelo)
+        parâmetros_ajustados[i] = desempacotar_parâmetros(sol.x, tipo_regressão, modelo["parâmetros_agregados"])
+        DMAs[i] = sol.fun
+        soluções.append(sol)
+
+    return parâmetros_ajustados, DMAs, soluções
+
+
+# ******************************************************************************************************************** #
+#  ATENÇÃO: O CÓDIGO A SEGUIR SERÁ EXECUTADO APENAS QUANDO ESTE MÓDULO FOR RODADO COMO SCRIPT PRINCIPAL.               #
+#           O CÓDIGO A SEGUIR SERVE PARA CONFERIR SE AS FUNÇÕES DESTE MÓDULO FUNCIONAM CORRETAMENTE.                   #
+# ******************************************************************************************************************** #
+# INÍCIO DO TESTE
+if __name__ == "__main__":
+
+    from módulo_leitura_dados import ler_configuração_padrão
+
+    # Modelo dos petróleos P1 e P2 de Yanes (2018), com a configuração do arquivo txt
+    configuração = ler_configuração_padrão("variáveis_entrada_código.txt")
+    dados = carregar_conjunto_dados("dados_experimentais.xlsx", ["Yanes_P1", "Yanes_P2"])
+    modelo = construir_modelo(dados["SARAs"], dados["Ts"], dados["solventes"][0], configuração)
+
+    # Regressão de MWavg e alfa de cada petróleo e predição com os parâmetros regredidos
+    parâmetros_ajustados, DMAs, _ = ajustar_modelo(modelo, dados["frações_solvente"], dados["yields_exp"])
+    yields = prever_yields(modelo, parâmetros_ajustados, dados["frações_solvente"][0])
+
+    print("\n|", 118*"-")
+    print("| TESTE DAS FUNCOES 'carregar_conjunto_dados', 'construir_modelo', 'ajustar_modelo' e 'prever_yields'")
+    for i in range(modelo["SARAs"].shape[0]):
+        print(f"| Petroleo {i}: MWavg = {parâmetros_ajustados[i, 0]:.1f} g/mol, "
+              f"alfa = {parâmetros_ajustados[i, 1]:.3f}, DMA = {100*DMAs[i]:.4f}%")
+        print(f"|     yields (%) com os parametros do petroleo {i}: {np.round(100*yields[i, i], 2)}")
+    print("|", 118*"-")
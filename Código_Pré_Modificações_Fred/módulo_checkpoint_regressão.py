@@ -0,0 +1,313 @@
+# Importação de bibliotecas do python
+import hashlib
+import os
+import time
+import numpy as np
+
+# Importação de outros módulos deste projeto
+from módulo_regressão import F_obj, regredir_parâmetros
+
+
+# Função
+def calcular_assinatura_argumentos(argumentos):
+    """ Calcula uma assinatura (hash SHA-256) de todas as entradas do modelo, de modo que qualquer alteração nelas
+        (dados experimentais, propriedades do solvente e das frações SAR, discretização e correlações dos agregados,
+        parâmetros fixos, etc.) invalide os resultados salvos.
+
+    Inputs:
+        argumentos (object) : estrutura de tuplas, listas, dicionários, arrays, números e textos (ex: os *args da
+                              função 'F_obj')
+
+    Outputs:
+        assinatura (string) : hash hexadecimal da estrutura
+    """
+
+    assinatura = hashlib.sha256()
+
+    def acrescentar(objeto):
+        if isinstance(objeto, (np.ndarray, np.generic)) and not np.asarray(objeto).dtype.hasobject:
+            array = np.ascontiguousarray(objeto)
+            assinatura.update(f"array:{array.dtype.str}:{array.shape}:".encode())
+            assinatura.update(array.tobytes())
+        elif isinstance(objeto, np.ndarray):
+            acrescentar(objeto.tolist())
+        elif isinstance(objeto, (tuple, list)):
+            assinatura.update(f"sequencia:{len(objeto)}:".encode())
+            for elemento in objeto:
+                acrescentar(elemento)
+        elif isinstance(objeto, dict):
+            assinatura.update(f"dicionario:{len(objeto)}:".encode())
+            for chave in sorted(objeto, key=repr):
+                acrescentar(chave)
+                acrescentar(objeto[chave])
+        else:
+            assinatura.update(f"{type(objeto).__name__}:{objeto!r};".encode())
+
+    acrescentar(argumentos)
+
+    return assinatura.hexdigest()
+
+
+# Função
+def salvar_checkpoint_regressão(diretório_checkpoint, estado_regressão):
+    """ Salva o estado de uma regressão em um arquivo .npz, de forma atômica (arquivo temporário + renomeação), de
+        modo que uma interrupção durante a escrita não corrompa o checkpoint anterior.
+
+    Inputs:
+        diretório_checkpoint (string) : diretório do arquivo de checkpoint (.npz)
+        estado_regressão (dict)       : estado da regressão, ver 'regredir_parâmetros_com_checkpoint'
+    """
+
+    os.makedirs(os.path.dirname(diretório_checkpoint) or ".", exist_ok=True)
+    diretório_temporário = diretório_checkpoint + ".tmp.npz"
+    np.savez(diretório_temporário, **{chave: np.asarray(valor) for chave, valor in estado_regressão.items()})
+    os.replace(diretório_temporário, diretório_checkpoint)
+
+
+# Função
+def carregar_checkpoint_regressão(diretório_checkpoint, estado_esperado):
+    """ Carrega o estado de uma regressão salvo por 'salvar_checkpoint_regressão', caso exista e corresponda à mesma
+        regressão (mesmo chute inicial, algoritmo e entradas do modelo).
+
+    Inputs:
+        diretório_checkpoint (string) : diretório do arquivo de checkpoint (.npz)
+        estado_esperado (dict)        : identificação da regressão atual (chaves 'chute_inicial',
+                                        'algoritmo_otimização' e 'assinatura_argumentos', ver
+                                        'calcular_assinatura_argumentos')
+
+    Outputs:
+        Uma tupla contendo os seguintes elementos (todos vazios se não houver checkpoint compatível):
+            parâmetros_avaliados (array)  : parâmetros já avaliados, uma linha por avaliação
+            DMAs_avaliados (array)        : valores da função objetivo correspondentes
+            parâmetros_gradientes (array) : parâmetros em que o gradiente foi calculado, uma linha por cálculo
+            gradientes (array)            : gradientes correspondentes, uma linha por cálculo
+            passos_gradiente (array)      : passos das diferenças finitas do gradiente no momento do salvamento
+                                            (vazio se o gradiente não tiver passos adaptativos)
+    """
+
+    n_parâmetros = np.size(estado_esperado["chute_inicial"])
+    vazio = (np.empty((0, n_parâmetros)), np.empty(0), np.empty((0, n_parâmetros)), np.empty((0, n_parâmetros)),
+             np.empty(0))
+    if not os.path.isfile(diretório_checkpoint):
+        return vazio
+
+    with np.load(diretório_checkpoint) as checkpoint:
+        for chave, valor in estado_esperado.items():
+            if chave not in checkpoint or np.shape(checkpoint[chave]) != np.shape(valor) \
+                    or not np.array_equal(checkpoint[chave], valor):
+                print(f"ATENCAO: o checkpoint '{diretório_checkpoint}' corresponde a outra regressao "
+                      f"('{chave}' diferente) e sera ignorado.")
+                return vazio
+        return (checkpoint["parâmetros_avaliados"].reshape(-1, n_parâmetros), checkpoint["DMAs_avaliados"],
+                checkpoint["parâmetros_gradientes"].reshape(-1, n_parâmetros),
+                checkpoint["gradientes"].reshape(-1, n_parâmetros), checkpoint["passos_gradiente"])
+
+
+# Função
+def regredir_parâmetros_com_checkpoint(chute_inicial, argumentos_otimização, algoritmo_otimização,
+                                       limites_parâmetros, diretório_checkpoint, intervalo_checkpoint=60,
+                                       retomar=True, gradiente=None, função_objetivo=F_obj):
+    """ Executa 'regredir_parâmetros' salvando periodicamente em disco o histórico de avaliações da função objetivo,
+        e permite retomar uma regressão interrompida a partir desse histórico.
+
+    Inputs:
+        chute_inicial (array)         : chutes iniciais dos parâmetros a serem estimados
+        argumentos_otimização (tuple) : *args da função 'F_obj'
+        algoritmo_otimização (int)    : algoritmo de otimização, ver 'regredir_parâmetros'
+        limites_parâmetros (list)     : limites dos parâmetros
+        diretório_checkpoint (string) : diretório do arquivo de checkpoint (.npz)
+        intervalo_checkpoint (float)  : intervalo mínimo entre dois salvamentos do checkpoint (s)
+        retomar (bool)                : se True, retoma a partir do checkpoint existente (se compatível); se False,
+                                        recomeça a regressão e sobrescreve o checkpoint
+        gradiente (function)          : gradiente da função objetivo (opção 3), ver 'regredir_parâmetros'; os
+                                        gradientes calculados também são salvos e reaproveitados na retomada
+        função_objetivo (function)    : função a ser minimizada (padrão: 'F_obj')
+
+    Outputs:
+        sol (OptimizeResult) : resultado da otimização (ver 'regredir_parâmetros')
+
+    Observações:
+        Os algoritmos disponíveis (Nelder-Mead, L-BFGS-B e Powell) são determinísticos: partindo do mesmo chute
+        inicial, percorrem exatamente a mesma sequência de pontos. Por isso a retomada refaz a otimização desde o
+        início, mas respondendo com o histórico salvo às avaliações (e aos gradientes) já realizados, o que
+        reconstrói exatamente o simplex (Nelder-Mead), o conjunto de direções (Powell) ou a memória quasi-Newton
+        (L-BFGS-B) do momento da interrupção sem nenhum cálculo de ELL, e o resultado final é idêntico ao de uma
+        regressão sem interrupção (os passos adaptativos de um gradiente de 'criar_gradiente_paralelo' são
+        restaurados ao fim do histórico).
+        O checkpoint é identificado pelo chute inicial, pelo algoritmo e por uma assinatura de todos os
+        'argumentos_otimização' (ver 'calcular_assinatura_argumentos'): qualquer alteração dos dados ou da
+        configuração do modelo faz com que ele seja ignorado. O checkpoint guarda ainda os melhores parâmetros e o
+        melhor DMA encontrados até o momento, e é apagado quando a regressão termina sem interrupção.
+    """
+
+    # Identificação da regressão (para não retomar a partir do checkpoint de outra regressão)
+    estado_esperado = {"chute_inicial": np.asarray(chute_inicial, dtype=float),
+                       "algoritmo_otimização": algoritmo_otimização,
+                       "assinatura_argumentos": calcular_assinatura_argumentos(argumentos_otimização)}
+
+    # Histórico de avaliações e de gradientes já realizados
+    n_parâmetros = np.size(chute_inicial)
+    if retomar:
+        parâmetros_avaliados, DMAs_avaliados, parâmetros_gradientes, gradientes, passos_gradiente = \
+            carregar_checkpoint_regressão(diretório_checkpoint, estado_esperado)
+    else:
+        parâmetros_avaliados, DMAs_avaliados, parâmetros_gradientes, gradientes, passos_gradiente = \
+            np.empty((0, n_parâmetros)), np.empty(0), np.empty((0, n_parâmetros)), np.empty((0, n_parâmetros)), \
+            np.empty(0)
+    histórico_parâmetros, histórico_DMAs = list(parâmetros_avaliados), list(DMAs_avaliados)
+    histórico_parâmetros_gradientes, histórico_gradientes = list(parâmetros_gradientes), list(gradientes)
+    avaliações_salvas = {np.asarray(parâmetros, dtype=float).tobytes(): DMA
+                         for parâmetros, DMA in zip(parâmetros_avaliados, DMAs_avaliados)}
+    gradientes_salvos = {np.asarray(parâmetros, dtype=float).tobytes(): np.array(derivadas, dtype=float)
+                         for parâmetros, derivadas in zip(parâmetros_gradientes, gradientes)}
+    if avaliações_salvas:
+        print(f"RETOMANDO A REGRESSAO: {len(histórico_DMAs)} avaliacoes e {len(histórico_gradientes)} gradientes "
+              f"recuperados de '{diretório_checkpoint}'")
+
+    # Passos adaptativos do gradiente (ver 'criar_gradiente_paralelo'), restaurados quando o histórico acabar
+    estado_gradiente = getattr(gradiente, "estado", None)
+    passos_a_restaurar = [passos_gradiente if estado_gradiente is not None and np.size(passos_gradiente) > 0
+                          else None]
+
+    def salvar():
+        i_melhor = int(np.argmin(histórico_DMAs)) if histórico_DMAs else None
+        passos = estado_gradiente.get("passos") if estado_gradiente is not None else None
+        salvar_checkpoint_regressão(diretório_checkpoint, {
+            **estado_esperado,
+            "parâmetros_avaliados": np.array(histórico_parâmetros, dtype=float).reshape(-1, n_parâmetros),
+            "DMAs_avaliados": np.array(histórico_DMAs, dtype=float),
+            "parâmetros_gradientes": np.array(histórico_parâmetros_gradientes, dtype=float).reshape(-1, n_parâmetros),
+            "gradientes": np.array(histórico_gradientes, dtype=float).reshape(-1, n_parâmetros),
+            "passos_gradiente": np.asarray(passos if passos is not None else [], dtype=float),
+            "melhores_parâmetros": histórico_parâmetros[i_melhor] if i_melhor is not None else chute_inicial,
+            "melhor_DMA": histórico_DMAs[i_melhor] if i_melhor is not None else np.inf})
+
+    instante_último_salvamento = [time.monotonic()]
+
+    def salvar_periodicamente():
+        if time.monotonic() - instante_último_salvamento[0] >= intervalo_checkpoint:
+            salvar()
+            instante_último_salvamento[0] = time.monotonic()
+
+    # Função objetivo que reutiliza as avaliações salvas e registra as novas
+    def F_obj_com_checkpoint(parâmetros, *args):
+        chave = np.asarray(parâmetros, dtype=float).tobytes()
+        if chave in avaliações_salvas:
+            return avaliações_salvas[chave]
+        DMA = função_objetivo(parâmetros, *args)
+        avaliações_salvas[chave] = DMA
+        histórico_parâmetros.append(np.array(parâmetros, dtype=float))
+        histórico_DMAs.append(DMA)
+        salvar_periodicamente()
+        return DMA
+
+    # Gradiente que reutiliza os gradientes salvos e registra os novos
+    def gradiente_com_checkpoint(parâmetros, *args):
+        chave = np.asarray(parâmetros, dtype=float).tobytes()
+        if chave in gradientes_salvos:
+            return gradientes_salvos[chave].copy()
+        if passos_a_restaurar[0] is not None:
+            estado_gradiente["passos"] = np.array(passos_a_restaurar[0], dtype=float)
+            passos_a_restaurar[0] = None
+        derivadas = np.asarray(gradiente(parâmetros, *args), dtype=float)
+        gradientes_salvos[chave] = derivadas.copy()
+        histórico_parâmetros_gradientes.append(np.array(parâmetros, dtype=float))
+        histórico_gradientes.append(derivadas.copy())
+        salvar_periodicamente()
+        return derivadas
+
+    if estado_gradiente is not None:
+        gradiente_com_checkpoint.estado = estado_gradiente  # contabilização das avaliações, ver 'regredir_parâmetros'
+
+    # Otimização (o checkpoint é salvo em caso de interrupção e apagado ao final de uma regressão completa)
+    try:
+        sol = regredir_parâmetros(chute_inicial, argumentos_otimização, algoritmo_otimização, limites_parâmetros,
+                                  função_objetivo=F_obj_com_checkpoint,
+                                  gradiente=gradiente_com_checkpoint if gradiente is not None else None)
+    except BaseException:
+        salvar()
+        raise
+    if os.path.isfile(diretório_checkpoint):
+        os.remove(diretório_checkpoint)
+
+    return sol
+
+
+# ******************************************************************************************************************** #
+#  ATENÇÃO: O CÓDIGO A SEGUIR SERÁ EXECUTADO APENAS QUANDO ESTE MÓDULO FOR RODADO COMO SCRIPT PRINCIPAL.               #
+#           O CÓDIGO A SEGUIR SERVE PARA CONFERIR SE AS FUNÇÕES DESTE MÓDULO FUNCIONAM CORRETAMENTE.                   #
+# ******************************************************************************************************************** #
+# INÍCIO DO TESTE
+# OBS: REGRESSÃO DO MWavg E DO alfa (TIPO 2) DA PLANILHA PADRÃO, INTERROMPIDA NA METADE DAS AVALIAÇÕES; A RETOMADA
+#      DEVE FAZER APENAS AS AVALIAÇÕES (E GRADIENTES) RESTANTES E CHEGAR AO MESMO RESULTADO
+if __name__ == "__main__":
+    import tempfile
+    from módulo_regressão import montar_regressão_a_partir_dos_arquivos
+    from módulo_derivadas_paralelas import criar_gradiente_paralelo
+
+    diretório_deste_módulo = os.path.dirname(os.path.abspath(__file__))
+    chute, argumentos, _, limites = montar_regressão_a_partir_dos_arquivos(
+        os.path.join(diretório_deste_módulo, 'variáveis_entrada_código.txt'),
+        os.path.join(diretório_deste_módulo, 'dados_experimentais.xlsx'), tipo_regressão=2)
+
+    class InterrupçãoTeste(Exception):
+        pass
+
+    def criar_F_obj_contada(interromper_após=None):
+        contagem = {"n": 0}
+
+        def F_obj_contada(parâmetros, *args):
+            if interromper_após is not None and contagem["n"] >= interromper_após:
+                raise InterrupçãoTeste
+            contagem["n"] += 1
+            return F_obj(parâmetros, *args)
+
+        return F_obj_contada, contagem
+
+    def regredir(diretório, argumentos_teste, algoritmo, interromper_após=None, com_gradiente=False):
+        função, contagem = criar_F_obj_contada(interromper_após)
+        gradiente_teste = criar_gradiente_paralelo(função_objetivo=F_obj, limites_parâmetros=limites) \
+            if com_gradiente else None
+        try:
+            sol_teste = regredir_parâmetros_com_checkpoint(chute, argumentos_teste, algoritmo, limites, diretório,
+                                                           intervalo_checkpoint=0, gradiente=gradiente_teste,
+                                                           função_objetivo=função)
+        except InterrupçãoTeste:
+            sol_teste = None
+        n_avaliações_gradiente = gradiente_teste.estado["n_avaliações"] if com_gradiente else 0
+        return sol_teste, contagem["n"], n_avaliações_gradiente
+
+    with tempfile.TemporaryDirectory() as diretório_temporário:
+        diretório_teste = os.path.join(diretório_temporário, "checkpoint_teste.npz")
+        print("\n|", 119*"-")
+        print("| TESTE DA FUNCAO 'regredir_parâmetros_com_checkpoint'")
+        for algoritmo_teste, com_gradiente_teste in ((1, False), (3, True)):
+            # Regressão sem interrupção (o checkpoint é apagado ao final)
+            sol_completa, n_completa, n_gradiente_completa = regredir(diretório_teste, argumentos, algoritmo_teste,
+                                                                      com_gradiente=com_gradiente_teste)
+            print(f"| Algoritmo {algoritmo_teste}: regressao completa com {n_completa} avaliacoes (e "
+                  f"{n_gradiente_completa} nos gradientes), x = {sol_completa.x}; checkpoint apagado: "
+                  f"{not os.path.isfile(diretório_teste)}")
+
+            # Regressão interrompida e retomada
+            n_interrupção = n_completa//2
+            _, _, n_gradiente_interrompida = regredir(diretório_teste, argumentos, algoritmo_teste, n_interrupção,
+                                                      com_gradiente_teste)
+            sol_retomada, n_retomada, n_gradiente_retomada = regredir(diretório_teste, argumentos, algoritmo_teste,
+                                                                      com_gradiente=com_gradiente_teste)
+            print(f"| Algoritmo {algoritmo_teste}: retomada com {n_retomada} avaliacoes novas (gabarito: "
+                  f"{n_completa - n_interrupção}) e {n_gradiente_retomada} nos gradientes (gabarito: "
+                  f"{n_gradiente_completa - n_gradiente_interrompida}); mesmo resultado: "
+                  f"{np.array_equal(sol_retomada.x, sol_completa.x)}")
+
+        # Regressão interrompida e repetida com outra configuração do modelo (nº de agregados): não retoma
+        regredir(diretório_teste, argumentos, 1, 50)
+        variáveis_distribuição_alterada = (5,) + tuple(argumentos[2][1:])
+        argumentos_alterados = (argumentos[0], argumentos[1], variáveis_distribuição_alterada, argumentos[3])
+        sol_alterada, n_alterada, _ = regredir(diretório_teste, argumentos_alterados, 1)
+        sol_gabarito, n_gabarito, _ = regredir(diretório_teste, argumentos_alterados, 1)
+        print(f"| Configuracao alterada: {n_alterada} avaliacoes (gabarito, sem checkpoint: {n_gabarito}); mesmo "
+              f"resultado que sem checkpoint: {np.array_equal(sol_alterada.x, sol_gabarito.x)}")
+        print("|", 119*"-")
+# FIM DO TESTE
+# ******************************************************************************************************************** #
@@ -0,0 +1,283 @@
+# Importação de bibliotecas do python
+import os
+import numpy as np
+
+# Importação de outros módulos deste projeto
+from módulo_composições import fracionar_composição_global
+from módulo_curva_solubilidade import gerar_distribuição_agregados_normalizada
+from módulo_propriedades_agregados import calcular_propriedades_agregados
+from módulo_equilíbrio_líquido_líquido import calcular_composições_ELL_lote, calcular_yields_asfaltenos_lote
+from módulo_regressão import obter_número_parâmetros
+
+# Características da curva de yields usadas na busca da tabela, ver 'extrair_características_curva'
+NOMES_CARACTERÍSTICAS = ("onset", "inclinação", "yield_máximo")
+
+
+# Função
+def extrair_características_curva(ws_solvente, yields):
+    """ Extrai características baratas de uma ou várias curvas de yields: o onset (fração de solvente em que o yield
+        atinge 10% do yield máximo), a inclinação média entre 10% e 50% do yield máximo e o yield máximo.
+
+    Inputs:
+        ws_solvente (array) : frações mássicas de solvente dos pontos (crescentes)
+        yields (array)      : yields fracionais, uma linha por curva (ou 1D, uma única curva)
+
+    Outputs:
+        características (array) : (onset, inclinação, yield_máximo) de cada curva, uma linha por curva; NaN nas
+                                  curvas sem precipitação (yield máximo <= 1e-6) ou que não atingem 50% do yield
+                                  máximo na malha
+
+    Observações:
+        Os limiares são relativos ao yield máximo, de modo que as características dependem pouco dos pontos
+        experimentais próximos do onset (em geral os de maior erro relativo). Os cruzamentos são interpolados
+        linearmente entre os pontos, como em 'calcular_onsets'.
+    """
+
+    ws_solvente = np.asarray(ws_solvente, dtype=float)
+    yields = np.atleast_2d(np.asarray(yields, dtype=float))
+    yields_máximos = yields.max(axis=1)
+
+    def interpolar_cruzamento(fração_yield_máximo):
+        limiares = fração_yield_máximo*yields_máximos
+        acima = yields >= limiares[:, None]
+        j = np.argmax(acima, axis=1)
+        j_anterior = np.maximum(j - 1, 0)
+        linhas = np.arange(yields.shape[0])
+        y0, y1 = yields[linhas, j_anterior], yields[linhas, j]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            t = np.where(j > 0, (limiares - y0)/(y1 - y0), 0.0)
+        return ws_solvente[j_anterior] + t*(ws_solvente[j] - ws_solvente[j_anterior])
+
+    onsets, ws_meio = interpolar_cruzamento(0.1), interpolar_cruzamento(0.5)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        inclinações = 0.4*yields_máximos/(ws_meio - onsets)
+    características = np.column_stack((onsets, inclinações, yields_máximos))
+    características[~(yields_máximos > 1e-6) | ~np.isfinite(características).all(axis=1)] = np.nan
+
+    return características
+
+
+# Função
+def calcular_curvas_conjuntos_parâmetros(conjuntos_parâmetros, dados_sistema, propriedades_componentes,
+                                         variáveis_distribuição_massa_molar, correlações_agregados):
+    """ Calcula as curvas de solubilidade de um sistema com vários conjuntos de parâmetros dos agregados em um único
+        cálculo de ELL vetorizado (cada conjunto tem a sua própria distribuição de massa molar).
+
+    Inputs:
+        conjuntos_parâmetros (array)               : parâmetros dos agregados (MWavg, alfa, c_delta_agregados,
+                                                     Alinha_delta_agregados, d_delta_agregados), uma linha por
+                                                     conjunto
+        dados_sistema (tuple)                      : (T, SARA, ws_simplificados), ver 'calcular_curva_solubilidade'
+        propriedades_componentes (tuple)           : ver 'calcular_curva_solubilidade'
+        variáveis_distribuição_massa_molar (tuple) : ver 'calcular_curva_solubilidade'
+        correlações_agregados (tuple)              : ver 'calcular_curva_solubilidade'
+
+    Outputs:
+        yields (array) : yields fracionais, dimensões (nº de conjuntos, nº de pontos); NaN nos conjuntos cuja
+                         distribuição ou propriedades não são finitas
+    """
+
+    T, SARA, ws_simplificados = dados_sistema
+    MMs_base, rhos_base, deltas_base, Vs_base = propriedades_componentes
+    n_conjuntos, n_pontos = conjuntos_parâmetros.shape[0], ws_simplificados.shape[0]
+
+    # Distribuição de massa molar e propriedades dos agregados de cada conjunto (None se o cálculo falhar)
+    propriedades_conjuntos = []
+    for parâmetros_agregados in conjuntos_parâmetros:
+        MWavg, alfa, c_delta_agregados, Alinha_delta_agregados, d_delta_agregados = parâmetros_agregados
+        try:
+            MMsagregados, wsagregados, xsagregados = gerar_distribuição_agregados_normalizada(
+                parâmetros_agregados, variáveis_distribuição_massa_molar)
+            _, deltasagregados, Vsagregados = calcular_propriedades_agregados(
+                T, MMsagregados, *correlações_agregados, Alinha_delta_agregados, c_delta_agregados,
+                d_delta_agregados)
+        except (ValueError, ArithmeticError):
+            propriedades_conjuntos.append(None)
+            continue
+        propriedades = (np.concatenate((MMs_base[0:4], MMsagregados*1e-3)),
+                        np.concatenate((deltas_base[0:4], deltasagregados)),
+                        np.concatenate((Vs_base[0:4], Vsagregados)), wsagregados, xsagregados)
+        válido = all(np.isfinite(array).all() for array in propriedades)
+        propriedades_conjuntos.append(propriedades if válido else None)
+
+    # Composições globais de todos os pontos dos conjuntos válidos e cálculo de ELL vetorizado
+    yields = np.full((n_conjuntos, n_pontos), np.nan)
+    válidos = np.array([propriedades is not None for propriedades in propriedades_conjuntos])
+    if not válidos.any():
+        return yields
+    MMs, deltas, Vs, wsagregados, xsagregados = (
+        np.array([propriedades[k] for propriedades in propriedades_conjuntos if propriedades is not None])
+        for k in range(5))
+    n_componentes = MMs.shape[1]
+    xs_completo = fracionar_composição_global(ws_simplificados, np.tile(SARA, (MMs.shape[0], 1)),
+                                              wsagregados[:, None, :], MMs)[1]
+
+    def repetir_por_ponto(propriedades):
+        return np.repeat(propriedades, n_pontos, axis=0)
+
+    betasrr, xsL, xsH, _ = calcular_composições_ELL_lote(
+        T, xs_completo.reshape(-1, n_componentes), repetir_por_ponto(deltas), repetir_por_ponto(Vs),
+        repetir_por_ponto(xsagregados))
+    yields[válidos] = calcular_yields_asfaltenos_lote(betasrr, xsL, xsH, repetir_por_ponto(MMs)).reshape(-1, n_pontos)
+
+    return yields
+
+
+# Função
+def montar_grades_parâmetros(tipo_regressão, limites_parâmetros, correlação_delta_agregados,
+                             n_pontos_grade=(14, 10, 7)):
+    """ Monta as grades de valores dos parâmetros da tabela de chutes iniciais (MWavg e alfa em escala logarítmica,
+        c_delta_agregados em escala linear), dentro dos limites da regressão.
+
+    Inputs:
+        tipo_regressão (int)                : define quais parâmetros são estimados
+        limites_parâmetros (list)           : limites dos parâmetros, ver 'obter_limites_parâmetros'
+        correlação_delta_agregados (string) : correlação dos parâmetros de solubilidade dos agregados
+        n_pontos_grade (tuple)              : nº de valores de MWavg, alfa e c_delta_agregados
+
+    Outputs:
+        grades (list) : valores de cada parâmetro tabelado (no máximo MWavg, alfa e c_delta_agregados; os demais
+                        parâmetros estimados não são tabelados e partem dos valores lidos)
+
+    Observações:
+        Com correlação_delta_agregados = 'Tharanivasan', c_delta_agregados não afeta o modelo e não é tabelado
+    """
+
+    n_parâmetros_tabelados = min(obter_número_parâmetros(tipo_regressão), 3)
+    if correlação_delta_agregados == "Tharanivasan":
+        n_parâmetros_tabelados = min(n_parâmetros_tabelados, 2)
+    grades = []
+    for j in range(n_parâmetros_tabelados):
+        mínimo, máximo = limites_parâmetros[j]
+        if j < 2:
+            grades.append(np.geomspace(mínimo, máximo, n_pontos_grade[j]))
+        else:
+            grades.append(np.linspace(mínimo, máximo, n_pontos_grade[j]))
+
+    return grades
+
+
+# Função
+def gerar_tabela_chute_inicial(argumentos_otimização, grades, ws_solvente_tabela=np.linspace(0.30, 0.99, 70)):
+    """ Gera a tabela de curvas de yields do modelo sobre as grades de parâmetros (executada uma vez por sistema; ver
+        'carregar_ou_gerar_tabela_chute_inicial').
+
+    Inputs:
+        argumentos_otimização (tuple) : *args da função 'F_obj' (apenas o sistema, as propriedades, a discretização,
+                                        o tipo de regressão, os parâmetros não tabelados e as correlações são usados)
+        grades (list)                 : valores de cada parâmetro tabelado, ver 'montar_grades_parâmetros'
+        ws_solvente_tabela (array)    : frações mássicas de solvente das curvas tabeladas (crescentes)
+
+    Outputs:
+        tabela (dict) : 'parâmetros' (um conjunto de parâmetros tabelados por linha), 'ws_solvente' e 'yields'
+                        (dimensões (nº de conjuntos, nº de frações de solvente))
+    """
+
+    (T, SARA, _, _), propriedades_componentes, variáveis_distribuição_massa_molar, configuração_regressão = \
+        argumentos_otimização[0:4]
+    _, parâmetros_agregados, correlações_agregados = configuração_regressão
+    parâmetros_tabelados = np.stack([grade.ravel() for grade in np.meshgrid(*grades, indexing="ij")], axis=1)
+    conjuntos_parâmetros = np.tile(np.asarray(parâmetros_agregados, dtype=float), (parâmetros_tabelados.shape[0], 1))
+    conjuntos_parâmetros[:, 0:parâmetros_tabelados.shape[1]] = parâmetros_tabelados
+    ws_simplificados = np.column_stack((ws_solvente_tabela, 1 - ws_solvente_tabela))
+
+    with np.errstate(all="ignore"):
+        yields = calcular_curvas_conjuntos_parâmetros(conjuntos_parâmetros, (T, SARA, ws_simplificados),
+                                                      propriedades_componentes, variáveis_distribuição_massa_molar,
+                                                      correlações_agregados)
+
+    return {"parâmetros": parâmetros_tabelados, "ws_solvente": ws_solvente_tabela, "yields": yields}
+
+
+# Função
+def carregar_ou_gerar_tabela_chute_inicial(diretório_tabela, argumentos_otimização, grades):
+    """ Carrega a tabela de chutes iniciais salva em 'diretório_tabela', caso corresponda ao mesmo sistema, modelo e
+        grades; caso contrário, gera a tabela e a salva.
+
+    Inputs:
+        diretório_tabela (string)     : arquivo .npz da tabela (None para não salvar)
+        argumentos_otimização (tuple) : ver 'gerar_tabela_chute_inicial'
+        grades (list)                 : ver 'montar_grades_parâmetros'
+
+    Outputs:
+        Uma tupla contendo os seguintes elementos:
+            tabela (dict)  : ver 'gerar_tabela_chute_inicial'
+            gerada (bool)  : True se a tabela foi gerada nesta chamada
+    """
+
+    (T, SARA, _, _), propriedades_componentes, variáveis_distribuição_massa_molar, configuração_regressão = \
+        argumentos_otimização[0:4]
+    _, parâmetros_agregados, correlações_agregados = configuração_regressão
+    identificação = {"T": np.asarray(T, dtype=float), "SARA": np.asarray(SARA, dtype=float),
+                     "propriedades_SAR": np.array([np.asarray(propriedades, dtype=float)[0:4]
+                                                   for propriedades in propriedades_componentes]),
+                     "variáveis_distribuição": np.array([str(variável) for variável in
+                                                         variáveis_distribuição_massa_molar]),
+                     "parâmetros_agregados": np.asarray(parâmetros_agregados, dtype=float),
+                     "correlações_agregados": np.array(correlações_agregados),
+                     **{f"grade_{j}": grade for j, grade in enumerate(grades)}}
+
+    if diretório_tabela is not None and os.path.isfile(diretório_tabela):
+        with np.load(diretório_tabela) as arquivo:
+            if all(chave in arquivo and np.shape(arquivo[chave]) == np.shape(valor)
+                   and np.array_equal(arquivo[chave], valor) for chave, valor in identificação.items()):
+                return {chave: arquivo[chave] for chave in ("parâmetros", "ws_solvente", "yields")}, False
+
+    tabela = gerar_tabela_chute_inicial(argumentos_otimização, grades)
+    if diretório_tabela is not None:
+        os.makedirs(os.path.dirname(diretório_tabela) or ".", exist_ok=True)
+        diretório_temporário = diretório_tabela + ".tmp.npz"
+        np.savez(diretório_temporário, **identificação, **tabela)
+        os.replace(diretório_temporário, diretório_tabela)
+
+    return tabela, True
+
+
+# Função
+def estimar_chute_inicial(ws_solvente, yields_exp, tabela, n_vizinhos=4):
+    """ Estima os parâmetros tabelados a partir das características da curva experimental, pela média ponderada (pelo
+        inverso da distância no espaço das características) dos conjuntos de parâmetros da tabela mais próximos.
+
+    Inputs:
+        ws_solvente (array) : frações mássicas de solvente dos pontos experimentais
+        yields_exp (array)  : yields experimentais
+        tabela (dict)       : ver 'gerar_tabela_chute_inicial'
+        n_vizinhos (int)    : nº de conjuntos da tabela usados na média
+
+    Outputs:
+        chute (array) : valores estimados dos parâmetros tabelados (None se a curva experimental não tiver
+                        precipitação ou se nenhuma curva da tabela for comparável)
+
+    Observações:
+        As curvas tabeladas são interpoladas nas frações de solvente experimentais antes da extração das
+        características, de modo que as características experimentais e tabeladas são calculadas sobre os mesmos
+        pontos (e a tabela independe da malha experimental). A média é feita em escala logarítmica para MWavg e alfa.
+    """
+
+    ordem = np.argsort(ws_solvente)
+    ws_solvente = np.asarray(ws_solvente, dtype=float)[ordem]
+    características_exp = extrair_características_curva(ws_solvente, np.asarray(yields_exp, dtype=float)[ordem])[0]
+    if not np.isfinite(características_exp).all():
+        return None
+
+    # Curvas tabeladas nas frações de solvente experimentais
+    ws_tabela, yields_tabela = tabela["ws_solvente"], tabela["yields"]
+    j = np.clip(np.searchsorted(ws_tabela, ws_solvente), 1, ws_tabela.shape[0] - 1)
+    t = (ws_solvente - ws_tabela[j - 1])/(ws_tabela[j] - ws_tabela[j - 1])
+    características_tabela = extrair_características_curva(
+        ws_solvente, yields_tabela[:, j - 1]*(1 - t) + yields_tabela[:, j]*t)
+    comparáveis = np.isfinite(características_tabela).all(axis=1)
+    if not comparáveis.any():
+        return None
+
+    # Vizinhos mais próximos (características adimensionalizadas pelos valores experimentais)
+    distâncias = np.linalg.norm((características_tabela[comparáveis] - características_exp)/características_exp,
+                                axis=1)
+    vizinhos = np.argsort(distâncias)[0:n_vizinhos]
+    pesos = 1/np.maximum(distâncias[vizinhos], 1e-12)
+    parâmetros_vizinhos = tabela["parâmetros"][comparáveis][vizinhos]
+    escala_log = np.arange(parâmetros_vizinhos.shape[1]) < 2
+    parâmetros_vizinhos = np.where(escala_log, np.log(parâmetros_vizinhos), parâmetros_vizinhos)
+    chute = (pesos[:, None]*parâmetros_vizinhos).sum(axis=0)/pesos.sum()
+
+    return np.where(escala_log, np.exp(chute), chute)
@@ -25,9 +25,11 @@ def fracionar_composição_global(ws_simplificados, SARA, wsagregados, MMs):
     
     Inputs:
         ws_simplificados (array) : composição global do sistema em termos de [Solvente, Petróleo] (base mássica)
-        SARA (array)             : composição SARA do petróleo (base mássica)
+        SARA (array)             : composição SARA do petróleo (base mássica); uma linha por petróleo (2D) para
+                                   fracionar vários petróleos de uma vez
         wsagregados (array)      : frações mássicas dos agregados de asfaltenos
-        MMs (array)              : massas molares dos componentes do sistema (kg/mol)
+        MMs (array)              : massas molares dos componentes do sistema (kg/mol); comuns (1D) ou uma linha
+                                   por petróleo (2D)
 
     Outputs:
         Uma tupla contendo os seguintes elementos:
@@ -35,25 +37,25 @@ def fracionar_composição_global(ws_simplificados, SARA, wsagregados, MMs):
                                   [Solvente, S, A, R, Asf0, Asf1, ...] (base mássica)
             xs_completo (array) : composição global do sistema em termos de
                                   [Solvente, S, A, R, Asf0, Asf1, ...] (base molar)
+            Com SARA 2D, ambos têm dimensões (nº de petróleos, nº de pontos, nº de componentes)
     """
 
     # Inicialização de arrays importantes
+    # Obs: se SARA tiver uma linha por petróleo (2D), os arrays ganham uma dimensão inicial de petróleos
+    SARA, MMs = np.asarray(SARA), np.asarray(MMs)
+    dimensões_lote = SARA.shape[:-1]
     n_dados_exp = ws_simplificados.shape[0]
-    n_agregados = wsagregados.shape[0]
-    ws_semicompleto = np.zeros((n_dados_exp, 5))
-    ws_completo, xs_completo = [np.zeros((n_dados_exp, 4 + n_agregados)) for _ in range(2)]
-
-    # Composição dos sistemas em termos de [Solvente, S, A, R, A] (base mássica)
-    ws_semicompleto[:, 0] = ws_simplificados[:, 0]
-    ws_semicompleto[:, 1:5] = ws_simplificados[:, [1]]*SARA
+    n_agregados = wsagregados.shape[-1]
+    ws_completo = np.zeros(dimensões_lote + (n_dados_exp, 4 + n_agregados))
 
     # Composição dos sistemas em termos de [Solvente, S, A, R, Asf0, Asf1, ...] (base mássica)
-    ws_completo[:, 0:4] = ws_semicompleto[:, 0:4]
-    ws_completo[:, 4:] = ws_semicompleto[:, [4]]*wsagregados
+    ws_completo[..., 0] = ws_simplificados[:, 0]
+    ws_completo[..., 1:4] = ws_simplificados[:, [1]]*SARA[..., None, 0:3]
+    ws_completo[..., 4:] = (ws_simplificados[:, [1]]*SARA[..., None, 3:4])*wsagregados
 
     # Composição dos sistemas em termos de [Solvente, S, A, R, Asf0, Asf1, ...] (base molar)
-    xs_completo = ws_completo/MMs  
-    xs_completo = xs_completo/xs_completo.sum(axis=1, keepdims=True)
+    xs_completo = ws_completo/MMs[..., None, :]
+    xs_completo = xs_completo/xs_completo.sum(axis=-1, keepdims=True)
 
     return ws_completo, xs_completo
 
@@ -0,0 +1,389 @@
+# Importação de bibliotecas do python
+import time
+import numpy as np
+
+# Importação de outros módulos deste projeto
+from módulo_composições import normalizar_composição, fracionar_composição_global
+from módulo_distribuição_massa_molar import gerar_distribuição_massa_molar
+from módulo_propriedades_agregados import calcular_propriedades_agregados
+from módulo_equilíbrio_líquido_líquido import calcular_composições_ELL, calcular_yield_asfaltenos, \
+    calcular_composições_ELL_lote, calcular_yields_asfaltenos_lote
+from módulo_propriedades_solvente import calcular_propriedades_solvente
+from módulo_propriedades_frações_SAR import calcular_propriedades_saturados, calcular_propriedades_aromáticos, \
+    calcular_propriedades_resinas
+
+
+# Função
+def calcular_curva_solubilidade(parâmetros_agregados, dados_sistema, propriedades_componentes,
+                                variáveis_distribuição_massa_molar, correlações_agregados, tolerância_ELL=1e-12,
+                                n_it_máx_ELL=150):
+    """ Calcula a curva de solubilidade (yields de asfaltenos) e as composições de ELL de cada ponto do sistema.
+
+    Inputs:
+        parâmetros_agregados (tuple)               : (MWavg, alfa, c_delta_agregados, Alinha_delta_agregados,
+                                                     d_delta_agregados)
+        dados_sistema (tuple)                      : (T, SARA, ws_simplificados)
+        propriedades_componentes (tuple)           : (MMs, rhos, deltas, Vs); apenas as posições
+                                                     [Solvente, S, A, R] são utilizadas
+        variáveis_distribuição_massa_molar (tuple) : (n_agregados, MWmin, MWmax, tipo_cálculo_MM_agregados,
+                                                     método_integração_FDP_Gamma, método_discretização_agregados)
+        correlações_agregados (tuple)              : (correlação_densidade_agregados, correlação_delta_agregados)
+        tolerância_ELL (float)                     : tolerância de convergência do cálculo de ELL, ver
+                                                     'calcular_composições_ELL'
+        n_it_máx_ELL (int)                         : nº máximo de iterações do cálculo de ELL
+
+    Outputs:
+        Uma tupla contendo os seguintes elementos:
+            yields_calc (array)  : yields fracionais de asfaltenos (calculados)
+            betasrr (array)      : betas de Rachford-Rice
+            xsL (array)          : composições da fase leve (base molar), uma linha por ponto
+            xsH (array)          : composições da fase pesada (base molar), uma linha por ponto
+            n_it (array)         : nº de iterações de cada cálculo de ELL
+            MMs (array)          : massas molares de todos os componentes [Solvente, S, A, R, Asf0, Asf1, ...] (kg/mol)
+            MMsagregados (array) : massas molares dos agregados de asfaltenos (g/mol)
+            xsagregados (array)  : frações molares dos agregados de asfaltenos
+
+    Observações:
+        Com método_discretização_agregados = 'quadratura_gauss', o ELL de todos os pontos é calculado de uma vez por
+        'calcular_composições_ELL_lote', com convergência verificada sobre os momentos das fases
+        (critério_convergência = "momentos")
+    """
+
+    # Desempacotando as entradas
+    MWavg, alfa, c_delta_agregados, Alinha_delta_agregados, d_delta_agregados = parâmetros_agregados
+    T, SARA, ws_simplificados = dados_sistema
+    MMs_base, rhos_base, deltas_base, Vs_base = propriedades_componentes
+    (n_agregados, MWmin, MWmax, tipo_cálculo_MM_agregados, método_integração_FDP_Gamma,
+     método_discretização_agregados) = variáveis_distribuição_massa_molar
+    correlação_densidade_agregados, correlação_delta_agregados = correlações_agregados
+
+    # Propriedades dos agregados de asfaltenos
+    MMsagregados, wsagregados, xsagregados = gerar_distribuição_massa_molar(
+        alfa, MWavg, n_agregados, MWmin, MWmax, tipo_cálculo_MM_agregados, método_integração_FDP_Gamma,
+        método_discretização_agregados)
+    wsagregados = normalizar_composição(wsagregados)
+    xsagregados = normalizar_composição(xsagregados)
+    rhosagregados, deltasagregados, Vsagregados = calcular_propriedades_agregados(
+        T, MMsagregados, correlação_densidade_agregados, correlação_delta_agregados,
+        Alinha_delta_agregados, c_delta_agregados, d_delta_agregados)
+
+    # Arrays com as propriedades de todos os componentes do sistema: [Solvente, S, A, R, Asf0, Asf1, ...]
+    MMs = np.concatenate((MMs_base[0:4], MMsagregados*1e-3))  # kg/mol
+    deltas = np.concatenate((deltas_base[0:4], deltasagregados))
+    Vs = np.concatenate((Vs_base[0:4], Vsagregados))
+
+    # Composição global do sistema (base mássica e base molar)
+    ws_completo, xs_completo = fracionar_composição_global(ws_simplificados, SARA, wsagregados, MMs)
+    xs_completo = np.apply_along_axis(func1d=normalizar_composição, axis=1, arr=xs_completo)
+
+    # FDP_Gamma nos nós de Gauss: cálculo de ELL de todos os pontos de uma vez, com convergência sobre os momentos
+    # das fases
+    if método_discretização_agregados == "quadratura_gauss":
+        betasrr, xsL, xsH, n_it = calcular_composições_ELL_lote(T, xs_completo, deltas, Vs, xsagregados,
+                                                                tol=tolerância_ELL, n_it_máx=n_it_máx_ELL,
+                                                                critério_convergência="momentos")
+        yields_calc = calcular_yields_asfaltenos_lote(betasrr, xsL, xsH, MMs)
+        return yields_calc, betasrr, xsL, xsH, n_it, MMs, MMsagregados, xsagregados
+
+    # Cálculo de equilíbrio líquido-líquido para cada ponto
+    n_pontos = ws_simplificados.shape[0]
+    n_componentes = MMs.shape[0]
+    yields_calc, betasrr, n_it = [np.zeros(n_pontos) for _ in range(3)]
+    xsL, xsH = [np.zeros((n_pontos, n_componentes)) for _ in range(2)]
+    for i in range(n_pontos):
+        betasrr[i], xsL[i, :], xsH[i, :], n_it[i] = calcular_composições_ELL(T, xs_completo[i], deltas, Vs,
+                                                                              xsagregados, tolerância_ELL,
+                                                                              n_it_máx_ELL)
+        yields_calc[i] = calcular_yield_asfaltenos(betasrr[i], xsL[i, :], xsH[i, :], MMs)
+
+    return yields_calc, betasrr, xsL, xsH, n_it, MMs, MMsagregados, xsagregados
+
+
+# Função
+def gerar_distribuição_agregados_normalizada(parâmetros_agregados, variáveis_distribuição_massa_molar):
+    """ Gera a distribuição de massa molar dos agregados com frações mássicas e molares normalizadas.
+
+    Inputs:
+        parâmetros_agregados (tuple)               : ver 'calcular_curva_solubilidade'
+        variáveis_distribuição_massa_molar (tuple) : ver 'calcular_curva_solubilidade'
+
+    Outputs:
+        Uma tupla contendo os seguintes elementos:
+           MMsagregados (array) : massas molares dos agregados de asfaltenos (g/mol)
+           wsagregados (array)  : frações mássicas dos agregados de asfaltenos (normalizadas)
+           xsagregados (array)  : frações molares dos agregados de asfaltenos (normalizadas)
+    """
+
+    MWavg, alfa = parâmetros_agregados[0:2]
+    (n_agregados, MWmin, MWmax, tipo_cálculo_MM_agregados, método_integração_FDP_Gamma,
+     método_discretização_agregados) = variáveis_distribuição_massa_molar
+    MMsagregados, wsagregados, xsagregados = gerar_distribuição_massa_molar(
+        alfa, MWavg, n_agregados, MWmin, MWmax, tipo_cálculo_MM_agregados, método_integração_FDP_Gamma,
+        método_discretização_agregados)
+
+    return MMsagregados, normalizar_composição(wsagregados), normalizar_composição(xsagregados)
+
+
+# Função
+def calcular_propriedades_solvente_SAR(T, solvente, correlações_SAR):
+    """ Calcula as propriedades do solvente, saturados, aromáticos e resinas em uma ou várias temperaturas.
+
+    Inputs:
+        T (float ou array)      : temperatura(s) (K)
+        solvente (string)       : nome do solvente ("n-heptano" ou "n-pentano")
+        correlações_SAR (tuple) : (correlação_densidade_saturados, correlação_delta_saturados,
+                                  correlação_densidade_aromáticos, correlação_delta_aromáticos,
+                                  correlação_densidade_resinas, correlação_delta_resinas)
+
+    Outputs:
+        Uma tupla contendo os seguintes elementos, com a última dimensão na ordem [Solvente, S, A, R]:
+           MMs (array)    : massas molares (kg/mol)
+           rhos (array)   : densidades (kg/m³)
+           deltas (array) : parâmetros de solubilidade (Pa**0.5)
+           Vs (array)     : volumes molares (m³/mol)
+    """
+
+    (correlação_densidade_saturados, correlação_delta_saturados,
+     correlação_densidade_aromáticos, correlação_delta_aromáticos,
+     correlação_densidade_resinas, correlação_delta_resinas) = correlações_SAR
+
+    # Propriedades de cada componente (cada uma é escalar ou array, conforme T)
+    propriedades = [
+        calcular_propriedades_solvente(T, solvente),
+        calcular_propriedades_saturados(T, correlação_densidade_saturados, correlação_delta_saturados),
+        calcular_propriedades_aromáticos(T, correlação_densidade_aromáticos, correlação_delta_aromáticos),
+        calcular_propriedades_resinas(T, correlação_densidade_resinas, correlação_delta_resinas)]
+
+    # Empilhamento na última dimensão: [Solvente, S, A, R]
+    dimensões = np.shape(T)
+    MMs, rhos, deltas, Vs = [np.stack([np.broadcast_to(propriedades_componente[j], dimensões)
+                                       for propriedades_componente in propriedades], axis=-1) for j in range(4)]
+
+    return MMs, rhos, deltas, Vs
+
+
+# Função
+def calcular_curvas_solubilidade_lote(parâmetros_agregados, dados_sistemas, solvente, correlações_componentes,
+                                      variáveis_distribuição_massa_molar, distribuição_agregados=None,
+                                      chutes_iniciais=None):
+    """ Calcula as curvas de solubilidade de vários sistemas (petróleos e/ou temperaturas) com um único cálculo de
+        ELL vetorizado sobre todos os pontos.
+
+    Inputs:
+        parâmetros_agregados (tuple)               : (MWavg, alfa, c_delta_agregados, Alinha_delta_agregados,
+                                                     d_delta_agregados)
+        dados_sistemas (tuple)                     : (Ts, SARAs, ws_simplificados), com Ts (array) uma temperatura
+                                                     por sistema, SARAs (array) uma composição SARA normalizada por
+                                                     sistema e ws_simplificados (array) os pontos [Solvente, Petróleo]
+                                                     comuns a todos os sistemas
+        solvente (string)                          : nome do solvente ("n-heptano" ou "n-pentano")
+        correlações_componentes (tuple)            : correlações_SAR (ver 'calcular_propriedades_solvente_SAR')
+                                                     seguidas de (correlação_densidade_agregados,
+                                                     correlação_delta_agregados)
+        variáveis_distribuição_massa_molar (tuple) : ver 'calcular_curva_solubilidade'
+        distribuição_agregados (tuple)             : (MMsagregados, wsagregados, xsagregados) já calculados para
+                                                     'parâmetros_agregados' (opcional; evita recalcular a
+                                                     distribuição quando ela é reaproveitada entre chamadas)
+        chutes_iniciais (tuple)                    : (xsL, xsH) iniciais do cálculo de ELL, dimensões (nº de sistemas,
+                                                     nº de pontos, nº de componentes) (opcional; ver
+                                                     'calcular_composições_ELL_lote')
+
+    Outputs:
+        Uma tupla contendo os seguintes elementos:
+            yields_calc (array) : yields fracionais de asfaltenos, dimensões (nº de sistemas, nº de pontos)
+            betasrr (array)     : betas de Rachford-Rice, dimensões (nº de sistemas, nº de pontos)
+            xsL (array)         : composições da fase leve, dimensões (nº de sistemas, nº de pontos, nº de componentes)
+            xsH (array)         : composições da fase pesada, dimensões (nº de sistemas, nº de pontos,
+                                  nº de componentes)
+            n_it (array)        : nº de iterações, dimensões (nº de sistemas, nº de pontos)
+    """
+
+    # Desempacotando as entradas
+    Ts, SARAs, ws_simplificados = dados_sistemas
+    Ts = np.asarray(Ts, dtype=float)
+    n_sistemas, n_pontos = Ts.shape[0], np.shape(ws_simplificados)[0]
+
+    # Distribuição de massa molar (independe da temperatura e da composição SARA)
+    if distribuição_agregados is None:
+        distribuição_agregados = gerar_distribuição_agregados_normalizada(parâmetros_agregados,
+                                                                          variáveis_distribuição_massa_molar)
+    xsagregados = distribuição_agregados[2]
+    n_componentes = 4 + xsagregados.shape[0]
+
+    # Composições globais e propriedades de todos os pontos de todos os sistemas
+    propriedades_solvente_SAR = calcular_propriedades_solvente_SAR(Ts, solvente, correlações_componentes[0:6])
+    xs_completo, MMs, deltas, Vs = montar_sistemas_lote(parâmetros_agregados, dados_sistemas,
+                                                        propriedades_solvente_SAR, correlações_componentes[6:8],
+                                                        distribuição_agregados)
+
+    # Cálculo de ELL vetorizado: cada linha é um ponto (sistema, fração de solvente)
+    betasrr, xsL, xsH, n_it = calcular_composições_ELL_lote(np.repeat(Ts, n_pontos), xs_completo, deltas, Vs,
+                                                            xsagregados, chutes_iniciais)
+    yields_calc = calcular_yields_asfaltenos_lote(betasrr, xsL, xsH, MMs)
+
+    return (yields_calc.reshape(n_sistemas, n_pontos), betasrr.reshape(n_sistemas, n_pontos),
+            xsL.reshape(n_sistemas, n_pontos, n_componentes), xsH.reshape(n_sistemas, n_pontos, n_componentes),
+            n_it.reshape(n_sistemas, n_pontos))
+
+
+# Função
+def montar_sistemas_lote(parâmetros_agregados, dados_sistemas, propriedades_solvente_SAR, correlações_agregados,
+                         distribuição_agregados):
+    """ Monta as composições globais e as propriedades de todos os componentes de cada ponto (sistema, fração de
+        solvente), na forma usada pelo cálculo de ELL vetorizado.
+
+    Inputs:
+        parâmetros_agregados (tuple)      : ver 'calcular_curvas_solubilidade_lote'
+        dados_sistemas (tuple)            : ver 'calcular_curvas_solubilidade_lote'
+        propriedades_solvente_SAR (tuple) : (MMs, rhos, deltas, Vs) de [Solvente, S, A, R] em cada temperatura,
+                                            dimensões (nº de sistemas, 4), ver 'calcular_propriedades_solvente_SAR'
+        correlações_agregados (tuple)     : (correlação_densidade_agregados, correlação_delta_agregados)
+        distribuição_agregados (tuple)    : (MMsagregados, wsagregados, xsagregados), ver
+                                            'gerar_distribuição_agregados_normalizada'
+
+    Outputs:
+        Uma tupla contendo os seguintes elementos, com uma linha por ponto (os pontos de cada sistema em sequência)
+        e colunas na ordem [Solvente, S, A, R, Asf0, Asf1, ...]:
+            xs_completo (array) : composições globais (base molar)
+            MMs (array)         : massas molares (kg/mol)
+            deltas (array)      : parâmetros de solubilidade (Pa**0.5)
+            Vs (array)          : volumes molares (m³/mol)
+    """
+
+    # Desempacotando as entradas
+    MWavg, alfa, c_delta_agregados, Alinha_delta_agregados, d_delta_agregados = parâmetros_agregados
+    Ts, SARAs, ws_simplificados = dados_sistemas
+    Ts = np.asarray(Ts, dtype=float)
+    SARAs = np.asarray(SARAs, dtype=float)
+    ws_simplificados = np.asarray(ws_simplificados, dtype=float)
+    MMs_base, rhos_base, deltas_base, Vs_base = propriedades_solvente_SAR
+    correlação_densidade_agregados, correlação_delta_agregados = correlações_agregados
+    MMsagregados, wsagregados, xsagregados = distribuição_agregados
+    n_sistemas, n_pontos, n_agregados = Ts.shape[0], ws_simplificados.shape[0], MMsagregados.shape[0]
+
+    # Propriedades de todos os componentes em cada temperatura: dimensões (nº de sistemas, nº de componentes)
+    rhosagregados, deltasagregados, Vsagregados = calcular_propriedades_agregados(
+        Ts[:, None], MMsagregados, correlação_densidade_agregados, correlação_delta_agregados,
+        Alinha_delta_agregados, c_delta_agregados, d_delta_agregados)
+    dimensões_agregados = (n_sistemas, n_agregados)
+    MMs = np.concatenate((MMs_base, np.broadcast_to(MMsagregados*1e-3, dimensões_agregados)), axis=1)
+    deltas = np.concatenate((deltas_base, np.broadcast_to(deltasagregados, dimensões_agregados)), axis=1)
+    Vs = np.concatenate((Vs_base, np.broadcast_to(Vsagregados, dimensões_agregados)), axis=1)
+
+    # Composições globais de todos os pontos de todos os sistemas
+    xs_completo = fracionar_composição_global(ws_simplificados, SARAs, wsagregados, MMs)[1]
+
+    def repetir_por_ponto(propriedades):
+        return np.repeat(propriedades, n_pontos, axis=0)
+
+    return (xs_completo.reshape(n_sistemas*n_pontos, 4 + n_agregados), repetir_por_ponto(MMs),
+            repetir_por_ponto(deltas), repetir_por_ponto(Vs))
+
+
+# Função
+def determinar_n_agregados_mínimo(parâmetros_agregados, dados_sistema, propriedades_componentes,
+                                  variáveis_distribuição_massa_molar, correlações_agregados,
+                                  tolerância_yields=1e-4, métodos_candidatos=("quadratura_gauss", "equiprobabilidade")):
+    """ Determina o menor nº de agregados (e a discretização correspondente) cujos yields reproduzem, dentro de uma
+        tolerância, os yields da discretização 'uniforme' com o nº de agregados de referência.
+
+    Inputs:
+        parâmetros_agregados (tuple)               : ver 'calcular_curva_solubilidade'
+        dados_sistema (tuple)                      : ver 'calcular_curva_solubilidade'
+        propriedades_componentes (tuple)           : ver 'calcular_curva_solubilidade'
+        variáveis_distribuição_massa_molar (tuple) : ver 'calcular_curva_solubilidade'; o nº de agregados
+                                                     informado é usado como referência
+        correlações_agregados (tuple)              : ver 'calcular_curva_solubilidade'
+        tolerância_yields (float)                  : máximo desvio absoluto admitido nos yields fracionais
+        métodos_candidatos (tuple)                 : discretizações testadas, em ordem de preferência
+
+    Outputs:
+        Uma tupla contendo os seguintes elementos:
+            n_agregados (int)                       : menor nº de agregados que atende à tolerância
+            método_discretização_agregados (string) : discretização correspondente
+            desvio_máximo (float)                   : máximo desvio absoluto nos yields em relação à referência
+
+    Observações:
+        Caso nenhuma discretização reduzida atenda à tolerância, retorna-se a própria referência
+    """
+
+    # Yields de referência: discretização uniforme com o nº de agregados informado
+    n_agregados_referência, MWmin, MWmax, tipo_cálculo_MM_agregados, método_integração_FDP_Gamma, _ = \
+        variáveis_distribuição_massa_molar
+    variáveis_referência = (n_agregados_referência, MWmin, MWmax, tipo_cálculo_MM_agregados,
+                            método_integração_FDP_Gamma, "uniforme")
+    yields_referência = calcular_curva_solubilidade(parâmetros_agregados, dados_sistema, propriedades_componentes,
+                                                    variáveis_referência, correlações_agregados)[0]
+
+    # Busca crescente no nº de agregados
+    for n_agregados in range(2, n_agregados_referência):
+        for método_discretização_agregados in métodos_candidatos:
+            variáveis_candidatas = (n_agregados, MWmin, MWmax, tipo_cálculo_MM_agregados,
+                                    método_integração_FDP_Gamma, método_discretização_agregados)
+            yields_candidatos = calcular_curva_solubilidade(parâmetros_agregados, dados_sistema,
+                                                            propriedades_componentes, variáveis_candidatas,
+                                                            correlações_agregados)[0]
+            desvio_máximo = np.abs(yields_candidatos - yields_referência).max()
+            if desvio_máximo <= tolerância_yields:
+                return n_agregados, método_discretização_agregados, desvio_máximo
+
+    return n_agregados_referência, "uniforme", 0.0
+
+
+# Função
+def comparar_quadratura_gauss_discreto(parâmetros_agregados, dados_sistema, propriedades_componentes,
+                                       variáveis_distribuição_massa_molar, correlações_agregados,
+                                       ns_agregados=(10, 30, 100, 300, 1000)):
+    """ Valida a discretização 'quadratura_gauss' (com 'n_agregados' nós) contra o modelo discreto 'uniforme' com nº
+        de agregados crescente.
+
+    Inputs:
+        parâmetros_agregados (tuple)               : ver 'calcular_curva_solubilidade'
+        dados_sistema (tuple)                      : ver 'calcular_curva_solubilidade'
+        propriedades_componentes (tuple)           : ver 'calcular_curva_solubilidade'
+        variáveis_distribuição_massa_molar (tuple) : ver 'calcular_curva_solubilidade'; a discretização informada
+                                                     não é utilizada
+        correlações_agregados (tuple)              : ver 'calcular_curva_solubilidade'
+        ns_agregados (tuple)                       : nºs de agregados do modelo discreto
+
+    Outputs:
+        Uma tupla contendo os seguintes elementos:
+            yields_quadratura (array) : yields fracionais com a quadratura de Gauss
+            tempo_quadratura (float)  : tempo de cálculo da curva com a quadratura de Gauss (s)
+            comparações (list)        : lista de dicionários (um por nº de agregados) com as chaves 'n_agregados',
+                                        'desvio_máximo' (máximo desvio absoluto entre os yields dos dois modelos) e
+                                        'tempo' (tempo de cálculo da curva com o modelo discreto, s)
+
+    Observações:
+        O desvio máximo deve diminuir à medida que o nº de agregados cresce (o modelo discreto tende à FDP_Gamma
+        contínua, que a quadratura integra com poucos nós),
+        enquanto o tempo do modelo discreto cresce com o nº de agregados. Os tempos são os menores de 2 cálculos
+        (o 1º cálculo inclui inicializações, ex: 'obter_pontos_gauss_legendre')
+    """
+
+    def calcular_yields_cronometrados(variáveis):
+        tempos = []
+        for _ in range(2):
+            instante_início = time.perf_counter()
+            yields_calc = calcular_curva_solubilidade(parâmetros_agregados, dados_sistema, propriedades_componentes,
+                                                      variáveis, correlações_agregados)[0]
+            tempos.append(time.perf_counter() - instante_início)
+        return yields_calc, min(tempos)
+
+    n_nós, MWmin, MWmax, tipo_cálculo_MM_agregados, método_integração_FDP_Gamma, _ = \
+        variáveis_distribuição_massa_molar
+
+    # Quadratura de Gauss
+    yields_quadratura, tempo_quadratura = calcular_yields_cronometrados(
+        (n_nós, MWmin, MWmax, tipo_cálculo_MM_agregados, método_integração_FDP_Gamma, "quadratura_gauss"))
+
+    # Modelo discreto com nº de agregados crescente
+    comparações = []
+    for n_agregados in ns_agregados:
+        yields_discreto, tempo_discreto = calcular_yields_cronometrados(
+            (n_agregados, MWmin, MWmax, tipo_cálculo_MM_agregados, método_integração_FDP_Gamma, "uniforme"))
+        comparações.append({"n_agregados": n_agregados,
+                            "desvio_máximo": float(np.abs(yields_discreto - yields_quadratura).max()),
+                            "tempo": tempo_discreto})
+
+    return yields_quadratura, tempo_quadratura, comparações
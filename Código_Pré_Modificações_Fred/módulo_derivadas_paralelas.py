@@ -0,0 +1,263 @@
+# Importação de bibliotecas do python
+import numpy as np
+
+# Importação de outros módulos deste projeto
+from módulo_regressão import F_obj, calcular_resíduos_yields
+from módulo_memória_compartilhada import restaurar_compartilhados
+
+
+# Função
+def calcular_soma_quadrados_resíduos(parâmetros, *args):
+    """ Soma dos quadrados dos resíduos dos yields (ver 'calcular_resíduos_yields'), usada na estimativa da
+        covariância dos parâmetros.
+
+    Inputs:
+        parâmetros (array) : valores dos parâmetros estimados
+        args (tuple)       : *args da função 'F_obj'
+
+    Outputs:
+        SQR (float) : soma dos quadrados dos resíduos
+    """
+
+    return float(np.sum(np.asarray(calcular_resíduos_yields(parâmetros, *args), dtype=float)**2))
+
+
+# Função
+def avaliar_função_ponto(argumentos_avaliação):
+    """ Avalia uma função escalar em um ponto (executado em um processo de trabalho).
+
+    Inputs:
+        argumentos_avaliação (tuple) : (função, parâmetros, args), com 'função' definida no nível de um módulo e
+                                       'args' possivelmente com arrays em memória compartilhada (ver
+                                       'RegistroMemóriaCompartilhada')
+
+    Outputs:
+        valor (float) : função(parâmetros, *args)
+    """
+
+    função, parâmetros, args = argumentos_avaliação
+    return função(parâmetros, *restaurar_compartilhados(args))
+
+
+# Função
+def avaliar_pontos(função, pontos, args, executor=None, registro=None):
+    """ Avalia uma função em vários pontos, em série ('executor' = None) ou simultaneamente nos processos de
+        trabalho de 'executor' (ProcessPoolExecutor), preservando a ordem dos pontos. Com um 'registro'
+        ('RegistroMemóriaCompartilhada'), os arrays de 'args' são publicados em memória compartilhada (uma única vez
+        por registro) e cada tarefa leva apenas as suas referências. """
+
+    if executor is None:
+        argumentos_avaliações = [(função, ponto, args) for ponto in pontos]
+        return np.array(list(map(avaliar_função_ponto, argumentos_avaliações)), dtype=float)
+    if registro is not None:
+        args = registro.compartilhar(args)
+    argumentos_avaliações = [(função, ponto, args) for ponto in pontos]
+    return np.array(list(executor.map(avaliar_função_ponto, argumentos_avaliações)), dtype=float)
+
+
+# Função
+def calcular_escalas_parâmetros(parâmetros, limites_parâmetros=None):
+    """ Escala de cada parâmetro para os passos das diferenças finitas: max(|x_i|, 1), limitada à largura do
+        intervalo entre os limites do parâmetro (ex: d_delta_agregados, com limites 0.0494 e 0.0496, tem escala 2e-4,
+        e não 1).
+
+    Inputs:
+        parâmetros (array)        : ponto de cálculo
+        limites_parâmetros (list) : limites dos parâmetros, ver 'obter_limites_parâmetros' (opcional)
+
+    Outputs:
+        escalas (array) : escala de cada parâmetro
+    """
+
+    escalas = np.maximum(np.abs(parâmetros), 1)
+    if limites_parâmetros is not None:
+        limites = np.array(limites_parâmetros, dtype=float)
+        escalas = np.minimum(escalas, limites[:, 1] - limites[:, 0])
+    return escalas
+
+
+# Função
+def criar_gradiente_paralelo(função_objetivo=F_obj, executor=None, tipo_diferença="central", ruído_relativo=1e-10,
+                             registro=None, limites_parâmetros=None):
+    """ Cria uma função que calcula o gradiente da função objetivo por diferenças finitas, avaliando todos os pontos
+        perturbados simultaneamente nos processos de trabalho de 'executor'. Pode ser passada como 'jac' ao
+        'scipy.optimize.minimize' (ex: opção 3 de 'algoritmo_otimização', L-BFGS-B), de modo que cada gradiente custe
+        o tempo de uma única avaliação da função objetivo.
+
+    Inputs:
+        função_objetivo (function) : função objetivo, definida no nível de um módulo (padrão: 'F_obj')
+        executor (Executor)        : ProcessPoolExecutor com os processos de trabalho (None para execução serial)
+        tipo_diferença (string)    : "progressiva" (n+1 pontos) ou "central" (2n+1 pontos, com passos adaptativos)
+        ruído_relativo (float)     : ruído relativo estimado nos valores da função objetivo (ex: devido às
+                                     tolerâncias do cálculo de ELL), usado na escolha dos passos
+        registro (object)          : 'RegistroMemóriaCompartilhada' em que os *args são publicados, de modo que
+                                     não sejam serializados a cada ponto avaliado (opcional)
+        limites_parâmetros (list)  : limites dos parâmetros, ver 'obter_limites_parâmetros' (opcional); limitam os
+                                     passos e a posição dos pontos perturbados
+
+    Outputs:
+        gradiente (function) : função gradiente(parâmetros, *args) que retorna o array das derivadas; o nº total de
+                               avaliações da função objetivo feitas pelo gradiente fica em
+                               gradiente.estado["n_avaliações"] (e gradiente.estado["paralelo"] indica se elas são
+                               feitas nos processos de trabalho)
+
+    Observações:
+        Os passos iniciais são h_i = ruído**(1/2)*escala_i (progressivas) e h_i = ruído**(1/3)*escala_i (centrais), com
+        as escalas de 'calcular_escalas_parâmetros'. Nas diferenças centrais, o ponto central fornece também a curvatura
+        f''_i, e o passo é adaptado a cada chamada para h_i = ruído**(1/3)*sqrt(|f|/|f''_i|) (escala de comprimento da
+        função na direção i), limitado a variar no máximo 10x por chamada (e a 1/10 da largura do intervalo entre os
+        limites, se houver). Com 'limites_parâmetros', nenhum ponto perturbado sai dos limites: nos parâmetros em que
+        x_i + h_i (ou x_i - h_i) os ultrapassaria, são usadas diferenças regressivas (ou progressivas), de 2ª ordem nas
+        centrais (pontos x_i - h_i e x_i - 2h_i, ou x_i + h_i e x_i + 2h_i).
+    """
+
+    estado = {"passos": None, "n_avaliações": 0, "paralelo": executor is not None}
+    expoente = 1/2 if tipo_diferença == "progressiva" else 1/3
+    limites = np.array(limites_parâmetros, dtype=float) if limites_parâmetros is not None else None
+
+    def gradiente(parâmetros, *args):
+        x = np.ravel(parâmetros).astype(float)
+        n = x.shape[0]
+        if estado["passos"] is None or estado["passos"].shape[0] != n:
+            estado["passos"] = ruído_relativo**expoente*calcular_escalas_parâmetros(x, limites_parâmetros)
+        passos = estado["passos"]
+
+        # Sentido das perturbações: +1 (centrais ou progressivas), -1 (regressivas, no limite superior) ou +1 com
+        # 'unilateral' (progressivas de 2ª ordem, no limite inferior)
+        sentidos, unilateral = np.ones(n), np.zeros(n, dtype=bool)
+        if limites is not None:
+            acima, abaixo = x + passos > limites[:, 1], x - passos < limites[:, 0]
+            sentidos[acima] = -1
+            unilateral = acima | abaixo if tipo_diferença != "progressiva" else unilateral
+        perturbações = np.diag(sentidos*passos)
+
+        estado["n_avaliações"] += n + 1 if tipo_diferença == "progressiva" else 2*n + 1
+        if tipo_diferença == "progressiva":
+            valores = avaliar_pontos(função_objetivo, np.vstack((x, x + perturbações)), args, executor, registro)
+            return sentidos*(valores[1:] - valores[0])/passos
+
+        segundos_pontos = np.where(unilateral[:, None], x + 2*perturbações, x - perturbações)
+        valores = avaliar_pontos(função_objetivo, np.vstack((x, x + perturbações, segundos_pontos)), args, executor,
+                                 registro)
+        f, f_1, f_2 = valores[0], valores[1:n + 1], valores[n + 1:]
+
+        # Derivadas e curvaturas: centrais (f_1 = f(x + h), f_2 = f(x - h)) ou unilaterais de 2ª ordem
+        # (f_1 = f(x + s*h), f_2 = f(x + 2*s*h))
+        derivadas = np.where(unilateral, sentidos*(-3*f + 4*f_1 - f_2)/(2*passos), (f_1 - f_2)/(2*passos))
+        curvaturas = np.abs(np.where(unilateral, f - 2*f_1 + f_2, f_1 - 2*f + f_2))/passos**2
+
+        # Adaptação dos passos pela curvatura em cada direção
+        com_curvatura = curvaturas > 0
+        passos_novos = passos.copy()
+        passos_novos[com_curvatura] = ruído_relativo**(1/3)*np.sqrt(max(abs(f), 1e-300)/curvaturas[com_curvatura])
+        estado["passos"] = np.clip(passos_novos, passos/10, passos*10)
+        if limites is not None:
+            estado["passos"] = np.minimum(estado["passos"], (limites[:, 1] - limites[:, 0])/10)
+
+        return derivadas
+
+    gradiente.estado = estado
+    return gradiente
+
+
+# Função
+def calcular_hessiana_paralela(função, parâmetros, args=(), executor=None, ruído_relativo=1e-10, registro=None,
+                               limites_parâmetros=None):
+    """ Calcula a hessiana de uma função escalar por diferenças finitas centrais, avaliando todos os pontos
+        (1 + 2n + 2n(n-1)) simultaneamente nos processos de trabalho de 'executor'.
+
+    Inputs:
+        função (function)         : função escalar função(parâmetros, *args), definida no nível de um módulo
+        parâmetros (array)        : ponto de cálculo
+        args (tuple)              : demais argumentos da função
+        executor (Executor)       : ProcessPoolExecutor com os processos de trabalho (None para execução serial)
+        ruído_relativo (float)    : ruído relativo estimado nos valores da função; passos
+                                    h_i = ruído**(1/4)*escala_i, ver 'calcular_escalas_parâmetros'
+        registro (object)         : 'RegistroMemóriaCompartilhada' em que os arrays de 'args' são publicados
+                                    (opcional)
+        limites_parâmetros (list) : limites dos parâmetros, ver 'obter_limites_parâmetros' (opcional)
+
+    Outputs:
+        hessiana (array) : matriz das derivadas segundas, dimensões (n, n)
+
+    Observações:
+        Com 'limites_parâmetros', nenhum ponto perturbado sai dos limites: nos parâmetros a menos de h_i de um
+        limite (ex: no ótimo de uma regressão com limites), o centro do estêncil é deslocado para dentro, e a hessiana
+        é a desse ponto, a h_i do ponto de cálculo.
+    """
+
+    x = np.ravel(parâmetros).astype(float)
+    n = x.shape[0]
+    passos = ruído_relativo**(1/4)*calcular_escalas_parâmetros(x, limites_parâmetros)
+    if limites_parâmetros is not None:
+        limites = np.array(limites_parâmetros, dtype=float)
+        x = np.clip(x, limites[:, 0] + passos, limites[:, 1] - passos)
+    perturbações = np.diag(passos)
+
+    # Pontos: central, ±h_i e ±h_i±h_j (i < j)
+    pares = [(i, j) for i in range(n) for j in range(i + 1, n)]
+    pontos = [x] + [x + perturbações[i] for i in range(n)] + [x - perturbações[i] for i in range(n)]
+    for i, j in pares:
+        pontos += [x + perturbações[i] + perturbações[j], x + perturbações[i] - perturbações[j],
+                   x - perturbações[i] + perturbações[j], x - perturbações[i] - perturbações[j]]
+    valores = avaliar_pontos(função, pontos, args, executor, registro)
+
+    # Derivadas segundas
+    f, f_mais, f_menos = valores[0], valores[1:n + 1], valores[n + 1:2*n + 1]
+    hessiana = np.diag((f_mais - 2*f + f_menos)/passos**2)
+    for k, (i, j) in enumerate(pares):
+        f_pp, f_pm, f_mp, f_mm = valores[2*n + 1 + 4*k:2*n + 5 + 4*k]
+        hessiana[i, j] = hessiana[j, i] = (f_pp - f_pm - f_mp + f_mm)/(4*passos[i]*passos[j])
+
+    return hessiana
+
+
+# Função
+def estimar_covariância_parâmetros(parâmetros_ótimos, argumentos_otimização, executor=None, registro=None,
+                                   limites_parâmetros=None):
+    """ Estima a covariância dos parâmetros regredidos pela hessiana da soma dos quadrados dos resíduos (SQR) no
+        ótimo: cov = 2*s²*H^-1, com s² = SQR/(nº de pontos - nº de parâmetros).
+
+    Inputs:
+        parâmetros_ótimos (array)     : parâmetros estimados
+        argumentos_otimização (tuple) : *args da função 'F_obj'
+        executor (Executor)           : ProcessPoolExecutor com os processos de trabalho (None para execução serial)
+        registro (object)             : 'RegistroMemóriaCompartilhada' em que os *args são publicados (opcional)
+        limites_parâmetros (list)     : limites dos parâmetros, que limitam os passos e os pontos perturbados da
+                                        hessiana (opcional, ver 'calcular_hessiana_paralela')
+
+    Outputs:
+        Uma tupla contendo os seguintes elementos:
+            covariância (array)  : matriz de covariância dos parâmetros
+            erros_padrão (array) : erros-padrão dos parâmetros (raiz da diagonal da covariância)
+            correlações (array)  : matriz de correlação dos parâmetros
+            hessiana (array)     : hessiana da SQR no ótimo
+
+    Observações:
+        A aproximação pressupõe resíduos independentes e de mesma variância e um ótimo de mínimos quadrados; para
+        parâmetros estimados pelo DMA (ou no limite dos parâmetros), é uma estimativa local aproximada. Se a
+        hessiana for singular (parâmetro sem influência nos yields), é usada a pseudo-inversa; se não for finita
+        (cálculo falhou em algum ponto perturbado, ex: alfa muito grande), a covariância é retornada com NaN. Se a
+        hessiana não for positiva definida, os erros-padrão (e correlações) das variâncias negativas são NaN.
+    """
+
+    x = np.ravel(parâmetros_ótimos).astype(float)
+    n_dados_exp, n_parâmetros = np.shape(argumentos_otimização[0][3])[0], x.shape[0]
+
+    hessiana = calcular_hessiana_paralela(calcular_soma_quadrados_resíduos, x, argumentos_otimização, executor,
+                                          registro=registro, limites_parâmetros=limites_parâmetros)
+    if not np.isfinite(hessiana).all():
+        print("ATENCAO: a hessiana nao e finita nos parametros estimados; a covariancia nao foi estimada.")
+        return np.full((n_parâmetros, n_parâmetros), np.nan), np.full(n_parâmetros, np.nan), \
+            np.full((n_parâmetros, n_parâmetros), np.nan), hessiana
+    s2 = calcular_soma_quadrados_resíduos(x, *argumentos_otimização)/max(n_dados_exp - n_parâmetros, 1)
+    covariância = 2*s2*np.linalg.pinv(hessiana)
+    variâncias = np.diag(covariância)
+    if (variâncias < 0).any():
+        print("ATENCAO: a hessiana nao e positiva definida nos parametros estimados (ponto de sela ou parametro no "
+              "limite); os erros-padrao com variancia negativa sao retornados como NaN.")
+    erros_padrão = np.sqrt(np.where(variâncias >= 0, variâncias, np.nan))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        correlações = covariância/np.outer(erros_padrão, erros_padrão)
+
+    return covariância, erros_padrão, correlações, hessiana
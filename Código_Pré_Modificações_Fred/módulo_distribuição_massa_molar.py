@@ -1,11 +1,12 @@
 # Importação de bibliotecas do python
+import functools
 import numpy as np
 import scipy as scp
 
 
 # Função
 def gerar_distribuição_massa_molar(alfa, MWavg, n_agregados, MWmin, MWmax, tipo_cálculo_MM_agregados,
-                                   método_integração_FDP_Gamma):
+                                   método_integração_FDP_Gamma, método_discretização_agregados="uniforme"):
     """ Calcula as massas molares, frações mássicas e frações molares dos agregados de asfaltenos.
        
     Inputs:
@@ -18,24 +19,50 @@ def gerar_distribuição_massa_molar(alfa, MWavg, n_agregados, MWmin, MWmax, tip
         tipo_cálculo_MM_agregados (string)   : tipo de cálculo para a determinação das massas molares dos
                                                agregados de asfaltenos
         método_integração_FDP_Gamma (string) : método numérico para as integrações numéricas envolvendo a FDP_Gamma
+        método_discretização_agregados (string) : forma de discretização da FDP_Gamma em agregados
+                                                  opções: (uniforme) faixas de massa molar de mesma largura
+                                                          (equiprobabilidade) faixas de mesma probabilidade
+                                                          (quadratura_gauss) nós e pesos da quadratura de Gauss
+                                                                             da FDP_Gamma truncada em [MWmin, MWmax]
 
     Outputs:
         Uma tupla contendo os seguintes elementos:
            MMsagregados (array) : massas molares dos agregados de asfaltenos (g/mol)  
            wsagregados (array)  : frações mássicas dos agregados de asfaltenos
            xsagregados (array)  : frações molares dos agregados de asfaltenos
+
+    Observações:
+        Na opção 'quadratura_gauss', as massas molares são os nós da quadratura e as frações molares são os seus pesos,
+        de modo que 'tipo_cálculo_MM_agregados' e 'método_integração_FDP_Gamma' não são utilizados
     """
 
     # Função FDP_Gamma
+    # Obs: calculada em escala logarítmica, pois (MWi - MWmon)**(alfa - 1) e beta**alfa estouram o limite de ponto
+    # flutuante com alfa alto (ex: alfa = 83 com MWmax = 6000 g/mol), ainda que a FDP_Gamma seja finita
     MWmon = MWmin
     beta = (MWavg - MWmon) / alfa
 
     def f(MWi):
-        return (MWi - MWmon) ** (alfa - 1) / (beta ** alfa * scp.special.gamma(alfa)) * np.exp(-(MWi - MWmon) / beta)
+        return np.exp(scp.special.xlogy(alfa - 1, MWi - MWmon) - alfa * np.log(beta) - scp.special.gammaln(alfa)
+                      - (MWi - MWmon) / beta)
+
+    # Discretização por quadratura de Gauss: nós -> massas molares, pesos -> frações molares
+    if método_discretização_agregados == "quadratura_gauss":
+        MMsagregados, xsagregados = calcular_quadratura_gauss_FDP_Gamma(f, n_agregados, MWmin, MWmax)
+        wsagregados = xsagregados * MMsagregados / ((xsagregados * MMsagregados).sum())
+        return MMsagregados, wsagregados, xsagregados
 
     # Limites das faixas de massa molar
     n_pontos = n_agregados + 1
-    MM_limites_faixas = np.linspace(MWmin, MWmax, n_pontos)
+    match método_discretização_agregados:
+        case "equiprobabilidade":
+            # Faixas com a mesma probabilidade acumulada da FDP_Gamma truncada em [MWmin, MWmax]
+            probabilidade_MWmax = scp.special.gammainc(alfa, (MWmax - MWmon) / beta)
+            probabilidades = np.linspace(0, probabilidade_MWmax, n_pontos)
+            MM_limites_faixas = MWmon + beta * scp.special.gammaincinv(alfa, probabilidades)
+            MM_limites_faixas[0], MM_limites_faixas[-1] = MWmin, MWmax
+        case _:  # "uniforme" (em caso de erro, usa-se 'uniforme' como padrão)
+            MM_limites_faixas = np.linspace(MWmin, MWmax, n_pontos)
 
     # Massas molares dos agregados
     MMsagregados = np.zeros(n_agregados)
@@ -45,39 +72,45 @@ def gerar_distribuição_massa_molar(alfa, MWavg, n_agregados, MWmin, MWmax, tip
             for i in range(n_agregados):
                 numerador = scp.integrate.quad(MWf, MM_limites_faixas[i], MM_limites_faixas[i + 1])[0]
                 denominador = scp.integrate.quad(f, MM_limites_faixas[i], MM_limites_faixas[i + 1])[0]
-                MMsagregados[i] = numerador / denominador  # g/mol
+                # Obs: divisão do numpy, de modo que uma faixa sem probabilidade (ex: alfa muito alto) resulte em NaN,
+                # como nas demais discretizações, e não em ZeroDivisionError
+                MMsagregados[i] = np.divide(numerador, denominador)  # g/mol
         case "superior":
             for i in range(n_agregados):
                 MMsagregados[i] = MM_limites_faixas[i + 1]  # g/mol
 
     # Frações molares dos agregados
-    match método_integração_FDP_Gamma:
-        case "quadratura":
-            xsagregados = np.zeros(n_agregados)
-            denominador = scp.integrate.quad(f, MM_limites_faixas[0], MM_limites_faixas[-1])[0]
-            for i in range(n_agregados):
-                numerador = scp.integrate.quad(f, MM_limites_faixas[i], MM_limites_faixas[i + 1])[0]
-                xsagregados[i] = numerador / denominador
-        case "trapezios":
-            xsagregados = np.zeros(n_agregados)
-            MWs_denominador = MM_limites_faixas.copy()
-            fMWs_denominador = f(MWs_denominador)
-            denominador = np.trapezoid(fMWs_denominador, MWs_denominador)
-            for i in range(n_agregados):
-                MWs_numerador = MM_limites_faixas[i:i + 2]
-                fMWs_numerador = f(MWs_numerador)
-                numerador = np.trapezoid(fMWs_numerador, MWs_numerador)
-                xsagregados[i] = numerador / denominador
-        case _:  # Em caso de erro, usa-se 'trapezios' como padrão
-            xsagregados = np.zeros(n_agregados)
-            MWs_denominador = MM_limites_faixas.copy()
-            fMWs_denominador = f(MWs_denominador)
-            denominador = np.trapezoid(fMWs_denominador, MWs_denominador)
-            for i in range(n_agregados):
-                MWs_numerador = MM_limites_faixas[i:i + 2]
-                fMWs_numerador = f(MWs_numerador)
-                numerador = np.trapezoid(fMWs_numerador, MWs_numerador)
-                xsagregados[i] = numerador / denominador
+    # Obs: na opção 'equiprobabilidade', as frações molares são iguais por construção e dispensam integração numérica
+    if método_discretização_agregados == "equiprobabilidade":
+        xsagregados = np.full(n_agregados, 1 / n_agregados)
+    else:
+        match método_integração_FDP_Gamma:
+            case "quadratura":
+                xsagregados = np.zeros(n_agregados)
+                denominador = scp.integrate.quad(f, MM_limites_faixas[0], MM_limites_faixas[-1])[0]
+                for i in range(n_agregados):
+                    numerador = scp.integrate.quad(f, MM_limites_faixas[i], MM_limites_faixas[i + 1])[0]
+                    xsagregados[i] = np.divide(numerador, denominador)
+            case "trapezios":
+                xsagregados = np.zeros(n_agregados)
+                MWs_denominador = MM_limites_faixas.copy()
+                fMWs_denominador = f(MWs_denominador)
+                denominador = np.trapezoid(fMWs_denominador, MWs_denominador)
+                for i in range(n_agregados):
+                    MWs_numerador = MM_limites_faixas[i:i + 2]
+                    fMWs_numerador = f(MWs_numerador)
+                    numerador = np.trapezoid(fMWs_numerador, MWs_numerador)
+                    xsagregados[i] = numerador / denominador
+            case _:  # Em caso de erro, usa-se 'trapezios' como padrão
+                xsagregados = np.zeros(n_agregados)
+                MWs_denominador = MM_limites_faixas.copy()
+                fMWs_denominador = f(MWs_denominador)
+                denominador = np.trapezoid(fMWs_denominador, MWs_denominador)
+                for i in range(n_agregados):
+                    MWs_numerador = MM_limites_faixas[i:i + 2]
+                    fMWs_numerador = f(MWs_numerador)
+                    numerador = np.trapezoid(fMWs_numerador, MWs_numerador)
+                    xsagregados[i] = numerador / denominador
 
     # Frações mássicas dos agregados
     wsagregados = xsagregados * MMsagregados / ((xsagregados * MMsagregados).sum())
@@ -85,6 +118,85 @@ def gerar_distribuição_massa_molar(alfa, MWavg, n_agregados, MWmin, MWmax, tip
     return MMsagregados, wsagregados, xsagregados
 
 
+# Função
+def calcular_quadratura_gauss_FDP_Gamma(f, n_nós, MWmin, MWmax, n_pontos_discretização=None):
+    """ Calcula os nós e pesos da quadratura de Gauss associada à FDP_Gamma truncada em [MWmin, MWmax].
+
+    Inputs:
+        f (function)                 : FDP_Gamma, f(MW)
+        n_nós (int)                  : nº de nós da quadratura (nº de agregados de asfaltenos)
+        MWmin (float)                : limite inferior da faixa de massa molar (g/mol)
+        MWmax (float)                : limite superior da faixa de massa molar (g/mol)
+        n_pontos_discretização (int) : nº de pontos de Gauss-Legendre usados para discretizar a FDP_Gamma
+                                       (padrão: max(400, 20*n_nós))
+
+    Outputs:
+        Uma tupla contendo os seguintes elementos:
+            MWs_nós (array) : nós da quadratura (g/mol)
+            pesos (array)   : pesos da quadratura normalizados (soma igual a 1)
+
+    Observações:
+        Os coeficientes de recorrência dos polinômios ortogonais são obtidos pelo procedimento de Stieltjes
+        (discretizado) e os nós/pesos pelo algoritmo de Golub-Welsch. A regra de n nós integra exatamente os
+        momentos de ordem 0 a 2n-1 da FDP_Gamma truncada.
+    """
+
+    # Discretização fina da medida f(MW)dMW em variável adimensional s = (MW - MWmin)/(MWmax - MWmin)
+    if n_pontos_discretização is None:
+        n_pontos_discretização = max(400, 20 * n_nós)
+    s, ws_legendre = obter_pontos_gauss_legendre(n_pontos_discretização)
+    ws_medida = ws_legendre * f(MWmin + s * (MWmax - MWmin))
+    if not (np.isfinite(ws_medida).all() and ws_medida.sum() > 0):
+        # FDP_Gamma indefinida (ex: alfa ou MWavg fora do domínio durante uma regressão): os NaN se propagam até a
+        # função objetivo, como nas demais discretizações
+        return np.full(n_nós, np.nan), np.full(n_nós, np.nan)
+    ws_medida = ws_medida / ws_medida.sum()
+
+    # Procedimento de Stieltjes (versão ortonormal)
+    a, b = np.zeros(n_nós), np.zeros(n_nós)
+    q_anterior, q = np.zeros_like(s), np.ones_like(s)
+    for k in range(n_nós):
+        a[k] = (ws_medida * s * q ** 2).sum()
+        r = (s - a[k]) * q - np.sqrt(b[k]) * q_anterior
+        if k + 1 < n_nós:
+            b[k + 1] = (ws_medida * r ** 2).sum()
+            q_anterior, q = q, r / np.sqrt(b[k + 1])
+
+    # Golub-Welsch
+    nós, vetores = scp.linalg.eigh_tridiagonal(a, np.sqrt(b[1:]))
+    pesos = vetores[0, :] ** 2
+
+    MWs_nós = MWmin + nós * (MWmax - MWmin)
+    pesos = pesos / pesos.sum()
+
+    return MWs_nós, pesos
+
+
+# Função
+@functools.lru_cache(maxsize=8)
+def obter_pontos_gauss_legendre(n_pontos):
+    """ Calcula (uma única vez para cada nº de pontos) os pontos e pesos de Gauss-Legendre no intervalo [0, 1].
+
+    Inputs:
+        n_pontos (int) : nº de pontos
+
+    Outputs:
+        Uma tupla contendo os seguintes elementos (somente leitura):
+            s (array)           : pontos em [0, 1]
+            ws_legendre (array) : pesos (soma igual a 1)
+
+    Observações:
+        O cálculo dos pontos é um problema de autovalores de ordem 'n_pontos', mais caro que a própria quadratura da
+        FDP_Gamma, e não depende dos parâmetros da distribuição
+    """
+
+    s, ws_legendre = np.polynomial.legendre.leggauss(n_pontos)
+    s, ws_legendre = 0.5 * (s + 1), 0.5 * ws_legendre
+    s.flags.writeable, ws_legendre.flags.writeable = False, False
+
+    return s, ws_legendre
+
+
 # ******************************************************************************************************************** #
 #  ATENÇÃO: O CÓDIGO A SEGUIR SERÁ EXECUTADO APENAS QUANDO ESTE MÓDULO FOR RODADO COMO SCRIPT PRINCIPAL.               #
 #           O CÓDIGO A SEGUIR SERVE PARA CONFERIR SE AS FUNÇÕES DESTE MÓDULO FUNCIONAM CORRETAMENTE.                   #
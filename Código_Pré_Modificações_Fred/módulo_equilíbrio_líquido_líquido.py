@@ -6,9 +6,53 @@ from scipy.constants import R  # m3*Pa/mol*K
 # Importação de outros módulos deste projeto
 from módulo_composições import normalizar_composição
 
+# Nº de cálculos de ELL (sistemas) feitos neste processo, por qualquer das funções de cálculo de ELL; usado na
+# contabilização do custo das regressões (ver 'regredir_parâmetros')
+contagem_cálculos_ELL = {"n": 0}
+
+
+# Função
+def agrupar_componentes_excluídos(xs_completo, deltas, Vs):
+    """ Agrupa os componentes excluídos da fase pesada (Solvente, S e A, com Ks = 0) em um único pseudocomponente,
+        cujas frações molares na fase leve mantêm sempre as proporções da composição global.
+
+    Inputs:
+        xs_completo (array) : composição(ões) global(is) em termos de [Solvente, S, A, R, Asf0, Asf1, ...]
+                              (base molar), 1D ou uma linha por sistema (2D)
+        deltas (array)      : parâmetros de solubilidade (Pa**0.5), mesmas dimensões de 'xs_completo'
+        Vs (array)          : volumes molares (m³/mol), mesmas dimensões de 'xs_completo'
+
+    Outputs:
+        Uma tupla contendo os seguintes elementos, com a última dimensão na ordem [Excluídos, R, Asf0, Asf1, ...]:
+            zs (array)                  : composição global reduzida (base molar)
+            deltas (array)              : parâmetros de solubilidade, com o do pseudocomponente tal que
+                                          V*delta = média de V_i*delta_i dos excluídos
+            Vs (array)                  : volumes molares, com o do pseudocomponente igual à média molar dos
+                                          excluídos
+            frações_excluídos (array)   : frações molares de Solvente, S e A dentro do pseudocomponente
+
+    Observações:
+        Como Ks = 0 para os excluídos, x_i = z_i/(1 - beta)/soma em todas as iterações, isto é, os excluídos entram
+        na fase leve sempre nas proporções de z; as somas de Rachford-Rice, de x*V e de x*V*delta sobre eles dependem
+        apenas da fração total do pseudocomponente.
+    """
+
+    zs_excluídos = xs_completo[..., 0:3]
+    z_excluídos = zs_excluídos.sum(axis=-1, keepdims=True)
+    frações_excluídos = np.divide(zs_excluídos, z_excluídos, out=np.zeros_like(zs_excluídos),
+                                  where=z_excluídos > 0)
+    V_excluídos = (frações_excluídos*Vs[..., 0:3]).sum(axis=-1, keepdims=True)
+    delta_excluídos = np.divide((frações_excluídos*Vs[..., 0:3]*deltas[..., 0:3]).sum(axis=-1, keepdims=True),
+                                V_excluídos, out=np.zeros_like(V_excluídos), where=V_excluídos > 0)
+    V_excluídos = np.where(V_excluídos > 0, V_excluídos, 1.0)  # pseudocomponente ausente: valor arbitrário
+
+    return (np.concatenate((z_excluídos, xs_completo[..., 3:]), axis=-1),
+            np.concatenate((delta_excluídos, deltas[..., 3:]), axis=-1),
+            np.concatenate((V_excluídos, Vs[..., 3:]), axis=-1), frações_excluídos)
+
 
 # Função
-def calcular_composições_ELL(T, xs_completo, deltas, Vs, xsagregados):
+def calcular_composições_ELL(T, xs_completo, deltas, Vs, xsagregados, tol=1e-12, n_it_máx=150):
     """ Calcula os betas de Rachford-Rice e as composições das fases leve e pesada (base molar).
     
     Inputs:
@@ -18,6 +62,9 @@ def calcular_composições_ELL(T, xs_completo, deltas, Vs, xsagregados):
         deltas(array)       : parâmetros de solubilidade (Pa**0.5)
         Vs(array)           : volumes molares (m³/mol)
         xsagregados (array) : frações molares dos agregados de asfaltenos
+        tol (float)         : tolerância de convergência das composições (máxima variação de uma fração molar
+                              entre duas iterações)
+        n_it_máx (int)      : nº máximo de iterações
 
     Outputs:
         Uma tupla contendo os seguintes elementos:
@@ -25,23 +72,32 @@ def calcular_composições_ELL(T, xs_completo, deltas, Vs, xsagregados):
             xsL (array)    : composição da fase leve (base molar)
             xsH (array)    : composição da fase pesada (base molar) 
             n_int (int)    : nº de iterações para convergência das composições de equilíbrio 
+
+    Observações:
+        Solvente, S e A não entram na fase pesada (Ks = 0) e são tratados analiticamente como um único
+        pseudocomponente (ver 'agrupar_componentes_excluídos'): as iterações envolvem apenas
+        [Excluídos, R, Asf0, Asf1, ...], e as composições completas são reconstruídas ao final. O critério de
+        convergência é o mesmo da formulação com todos os componentes.
     """
 
-    # Leitura da composição global
-    zs = xs_completo.copy()  # útil p/ RachfordRice
+    contagem_cálculos_ELL["n"] += 1
+
+    # Leitura da composição global, reduzida a [Excluídos, R, Asf0, Asf1, ...]
+    zs, deltas, Vs, frações_excluídos = agrupar_componentes_excluídos(xs_completo, deltas, Vs)
+    fração_excluídos_máxima = frações_excluídos.max()  # converte o erro do pseudocomponente no dos excluídos
 
     # Chute inicial: composição da fase leve
     xsL = zs.copy()  # composição global do sistema
 
     # Chute inicial: composição da fase pesada
     n_agregados = xsagregados.shape[0]
-    xsH = np.zeros(4 + n_agregados)
-    xsH[4:] = xsagregados  # pura em asfaltenos
+    xsH = np.zeros(2 + n_agregados)
+    xsH[2:] = xsagregados  # pura em asfaltenos
 
     # Iterações
     erro = 1
-    tol = 1e-12
-    n_it, n_itmax = 0, 150
+    n_it = 0
+    Ks = np.zeros(2 + n_agregados)  # Ks[0] = 0: pseudocomponente dos excluídos retirado da fase pesada
     while erro > tol:
         
         # VmL e VmH
@@ -49,17 +105,22 @@ def calcular_composições_ELL(T, xs_completo, deltas, Vs, xsagregados):
         VmH = (xsH*Vs).sum()
 
         # deltamL e deltamH
-        phisL = (xsL*Vs)/((xsL*Vs).sum())
-        phisH = (xsH*Vs)/((xsH*Vs).sum())
+        phisL = (xsL*Vs)/VmL
+        phisH = (xsH*Vs)/VmH
         deltamL = (phisL*deltas).sum()
         deltamH = (phisH*deltas).sum()
 
-        Ks = np.exp(Vs/VmH - Vs/VmL + np.log(Vs/VmL) - np.log(Vs/VmH) + (Vs/(R*T))*(deltas - deltamL)**2
-                    - (Vs/(R*T))*(deltas - deltamH)**2)
-        Ks[0:3] = [0, 0, 0]  # retirando os componentes Solvente, S e A da fase pesada
+        # Ks apenas de R e dos agregados
+        Vs_R_agregados, deltas_R_agregados = Vs[1:], deltas[1:]
+        Ks[1:] = np.exp(Vs_R_agregados/VmH - Vs_R_agregados/VmL + np.log(Vs_R_agregados/VmL)
+                        - np.log(Vs_R_agregados/VmH) + (Vs_R_agregados/(R*T))*(deltas_R_agregados - deltamL)**2
+                        - (Vs_R_agregados/(R*T))*(deltas_R_agregados - deltamH)**2)
 
         # Função de Rachford-Rice
-        RachfordRice = lambda betarr: (zs*(Ks - 1)/(1 + betarr*(Ks - 1))).sum()
+        # Obs: os termos independentes de betarr são calculados uma única vez por iteração
+        Ks_menos_1 = Ks - 1
+        numeradores_RachfordRice = zs*Ks_menos_1
+        RachfordRice = lambda betarr: (numeradores_RachfordRice/(1 + betarr*Ks_menos_1)).sum()
         
         # Resolução da equação de Rachford-Rice
         try:
@@ -81,13 +142,14 @@ def calcular_composições_ELL(T, xs_completo, deltas, Vs, xsagregados):
         betarr = float(np.clip(betarr, 0.0, 1.0))
 
         # Composições pós-RachfordRice
-        xsL_post = zs/(1 + betarr*(Ks - 1))
+        xsL_post = zs/(1 + betarr*Ks_menos_1)
         xsL_post = normalizar_composição(xsL_post)
         xsH_post = xsL_post*Ks  # não é necessário normalizar esta composição, pois a da fase leve já foi normalizada
         xsH_post = normalizar_composição(xsH_post)
 
-        # Erro para verificação de convergência
+        # Erro para verificação de convergência (o do pseudocomponente é distribuído entre Solvente, S e A)
         errosL = np.abs(xsL - xsL_post)
+        errosL[0] *= fração_excluídos_máxima
         errosH = np.abs(xsH - xsH_post)
         maxerroL = errosL.max()
         maxerroH = errosH.max()
@@ -99,13 +161,212 @@ def calcular_composições_ELL(T, xs_completo, deltas, Vs, xsagregados):
         
         # Incremento no número de iterações
         n_it = n_it + 1
-        if n_it == n_itmax:
-            print(f"A composicao nao convergiu com {n_itmax} iteracoes.")
+        if n_it == n_it_máx:
+            print(f"A composicao nao convergiu com {n_it_máx} iteracoes.")
             break
 
+    # Composições completas: [Solvente, S, A, R, Asf0, Asf1, ...]
+    xsL = np.concatenate((xsL[0]*frações_excluídos, xsL[1:]))
+    xsH = np.concatenate((np.zeros(3), xsH[1:]))
+
     return betarr, xsL, xsH, n_it
 
 
+# Função
+def calcular_composições_ELL_lote(T, xs_completo, deltas, Vs, xsagregados, chutes_iniciais=None, tol=1e-12,
+                                  n_it_máx=150, critério_convergência="composições"):
+    """ Calcula os betas de Rachford-Rice e as composições das fases leve e pesada (base molar) de vários sistemas
+        simultaneamente (versão vetorizada de 'calcular_composições_ELL').
+
+    Inputs:
+        T (float ou array)             : temperatura(s) (K), escalar ou uma por sistema
+        xs_completo (array)            : composições globais dos sistemas em termos de
+                                         [Solvente, S, A, R, Asf0, Asf1, ...] (base molar), uma linha por sistema
+        deltas (array)                 : parâmetros de solubilidade (Pa**0.5), comuns (1D) ou um por sistema (2D)
+        Vs (array)                     : volumes molares (m³/mol), comuns (1D) ou um por sistema (2D)
+        xsagregados (array)            : frações molares dos agregados de asfaltenos, comuns (1D) ou por sistema (2D)
+        chutes_iniciais (tuple)        : (xsL, xsH) iniciais, uma linha por sistema (opcional; ex: soluções de sistemas
+                                         vizinhos); linhas com NaN usam os chutes padrão
+        tol (float)                    : tolerância de convergência, ver 'critério_convergência'
+        n_it_máx (int)                 : nº máximo de iterações de cada sistema
+        critério_convergência (string) : "composições" (máxima variação das frações molares entre duas iterações, ver
+                                         'calcular_composições_ELL', padrão) ou "momentos" (máxima variação relativa de
+                                         VmL, VmH, deltamL e deltamH entre duas iterações)
+
+    Outputs:
+        Uma tupla contendo os seguintes elementos:
+            betasrr (array) : parâmetros beta de Rachford-Rice, um por sistema
+            xsL (array)     : composições da fase leve (base molar), uma linha por sistema
+            xsH (array)     : composições da fase pesada (base molar), uma linha por sistema
+            n_it (array)    : nº de iterações para convergência de cada sistema
+
+    Observações:
+        Cada sistema é iterado até a sua própria convergência; os sistemas já convergidos deixam de ser calculados.
+        Assim como em 'calcular_composições_ELL', Solvente, S e A são tratados como um único pseudocomponente.
+        As fases dependem uma da outra apenas pelos momentos VmL, VmH, deltamL e deltamH, de modo que o critério
+        "momentos" não depende do nº de agregados (ao contrário do critério sobre cada fração molar); é o critério
+        usado com a discretização 'quadratura_gauss' (ver 'calcular_curva_solubilidade')
+    """
+
+    # Leitura e compatibilização das dimensões das entradas
+    xs_completo = np.atleast_2d(np.asarray(xs_completo, dtype=float))
+    n_sistemas, n_componentes = xs_completo.shape
+    contagem_cálculos_ELL["n"] += n_sistemas
+    n_agregados = n_componentes - 4
+    T = np.broadcast_to(np.asarray(T, dtype=float), (n_sistemas,))
+    deltas = np.broadcast_to(deltas, (n_sistemas, n_componentes))
+    Vs = np.broadcast_to(Vs, (n_sistemas, n_componentes))
+
+    # Composições globais reduzidas a [Excluídos, R, Asf0, Asf1, ...]
+    zs, deltas, Vs, frações_excluídos = agrupar_componentes_excluídos(xs_completo, deltas, Vs)
+    frações_excluídos_máximas = frações_excluídos.max(axis=1)
+
+    # Chutes iniciais: fase leve com a composição global, fase pesada pura em asfaltenos
+    xsL = zs.copy()
+    xsH = np.zeros((n_sistemas, 2 + n_agregados))
+    xsH[:, 2:] = np.broadcast_to(xsagregados, (n_sistemas, n_agregados))
+    if chutes_iniciais is not None:
+        xsL_chute, xsH_chute = (np.reshape(chute, (n_sistemas, n_componentes)) for chute in chutes_iniciais)
+        com_chute = np.isfinite(xsL_chute).all(axis=1) & np.isfinite(xsH_chute).all(axis=1)
+        for xs, xs_chute in ((xsL, xsL_chute), (xsH, xsH_chute)):
+            xs[com_chute, 0] = xs_chute[com_chute, 0:3].sum(axis=1)
+            xs[com_chute, 1:] = xs_chute[com_chute, 3:]
+
+    # Iterações (apenas sobre os sistemas ainda não convergidos)
+    betasrr = np.zeros(n_sistemas)
+    n_it = np.zeros(n_sistemas, dtype=int)
+    ativos = np.arange(n_sistemas)
+    while ativos.size > 0:
+        zs_a, Vs_a, deltas_a, RT_a = zs[ativos], Vs[ativos], deltas[ativos], R*T[ativos, None]
+        xsL_a, xsH_a = xsL[ativos], xsH[ativos]
+
+        # VmL, VmH, deltamL e deltamH
+        VmL = (xsL_a*Vs_a).sum(axis=1, keepdims=True)
+        VmH = (xsH_a*Vs_a).sum(axis=1, keepdims=True)
+        deltamL = (xsL_a*Vs_a*deltas_a).sum(axis=1, keepdims=True)/VmL
+        deltamH = (xsH_a*Vs_a*deltas_a).sum(axis=1, keepdims=True)/VmH
+
+        # Ks apenas de R e dos agregados (Ks[:, 0] = 0: pseudocomponente dos excluídos retirado da fase pesada)
+        Ks = calcular_Ks_lote(Vs_a, deltas_a, VmL, VmH, deltamL, deltamH, RT_a)
+
+        # Resolução da equação de Rachford-Rice
+        betas_a = resolver_rachford_rice_lote(zs_a, Ks)
+
+        # Composições pós-RachfordRice
+        xsL_post = zs_a/(1 + betas_a[:, None]*(Ks - 1))
+        xsL_post = xsL_post/xsL_post.sum(axis=1, keepdims=True)
+        xsH_post = xsL_post*Ks
+        xsH_post = xsH_post/xsH_post.sum(axis=1, keepdims=True)
+
+        # Erro para verificação de convergência
+        if critério_convergência == "momentos":
+            VmL_post = (xsL_post*Vs_a).sum(axis=1, keepdims=True)
+            VmH_post = (xsH_post*Vs_a).sum(axis=1, keepdims=True)
+            momentos = np.concatenate((VmL, VmH, deltamL, deltamH), axis=1)
+            momentos_post = np.concatenate((VmL_post, VmH_post,
+                                            (xsL_post*Vs_a*deltas_a).sum(axis=1, keepdims=True)/VmL_post,
+                                            (xsH_post*Vs_a*deltas_a).sum(axis=1, keepdims=True)/VmH_post), axis=1)
+            erro = np.abs(momentos_post/momentos - 1).max(axis=1)
+        else:  # o erro do pseudocomponente é distribuído entre Solvente, S e A
+            errosL = np.abs(xsL_a - xsL_post)
+            errosL[:, 0] *= frações_excluídos_máximas[ativos]
+            erro = np.maximum(errosL.max(axis=1), np.abs(xsH_a - xsH_post).max(axis=1))
+
+        # Atualização dos sistemas ativos
+        xsL[ativos], xsH[ativos], betasrr[ativos] = xsL_post, xsH_post, betas_a
+        n_it[ativos] += 1
+        ativos = ativos[(erro > tol) & (n_it[ativos] < n_it_máx)]
+
+    if (n_it == n_it_máx).any():
+        print(f"A composicao de {(n_it == n_it_máx).sum()} sistema(s) nao convergiu com {n_it_máx} iteracoes.")
+
+    # Composições completas: [Solvente, S, A, R, Asf0, Asf1, ...]
+    xsL = np.concatenate((xsL[:, 0:1]*frações_excluídos, xsL[:, 1:]), axis=1)
+    xsH = np.concatenate((np.zeros((n_sistemas, 3)), xsH[:, 1:]), axis=1)
+
+    return betasrr, xsL, xsH, n_it
+
+
+# Função
+def calcular_Ks_lote(Vs, deltas, VmL, VmH, deltamL, deltamH, RT):
+    """ Calcula as constantes de equilíbrio (teoria de soluções regulares) de vários sistemas.
+
+    Inputs:
+        Vs (array)      : volumes molares (m³/mol) de [Excluídos, R, Asf0, Asf1, ...], uma linha por sistema
+        deltas (array)  : parâmetros de solubilidade (Pa**0.5), mesmas dimensões de 'Vs'
+        VmL (array)     : volumes molares das fases leves (m³/mol), dimensões (nº de sistemas, 1)
+        VmH (array)     : volumes molares das fases pesadas (m³/mol), dimensões (nº de sistemas, 1)
+        deltamL (array) : parâmetros de solubilidade das fases leves (Pa**0.5), dimensões (nº de sistemas, 1)
+        deltamH (array) : parâmetros de solubilidade das fases pesadas (Pa**0.5), dimensões (nº de sistemas, 1)
+        RT (array)      : R*T (J/mol), dimensões (nº de sistemas, 1)
+
+    Outputs:
+        Ks (array) : constantes de equilíbrio, mesmas dimensões de 'Vs', com Ks[:, 0] = 0 (pseudocomponente dos
+                     excluídos retirado da fase pesada)
+    """
+
+    Vs_R_agregados, deltas_R_agregados = Vs[:, 1:], deltas[:, 1:]
+    Ks = np.zeros(Vs.shape)
+    Ks[:, 1:] = np.exp(Vs_R_agregados/VmH - Vs_R_agregados/VmL + np.log(Vs_R_agregados/VmL)
+                       - np.log(Vs_R_agregados/VmH) + (Vs_R_agregados/RT)*(deltas_R_agregados - deltamL)**2
+                       - (Vs_R_agregados/RT)*(deltas_R_agregados - deltamH)**2)
+
+    return Ks
+
+
+# Função
+def resolver_rachford_rice_lote(zs, Ks):
+    """ Resolve a equação de Rachford-Rice de vários sistemas simultaneamente (Newton com salvaguarda de bisseção).
+
+    Inputs:
+        zs (array) : composições globais (base molar), uma linha por sistema
+        Ks (array) : constantes de equilíbrio, uma linha por sistema
+
+    Outputs:
+        betasrr (array) : parâmetros beta de Rachford-Rice, limitados fisicamente ao intervalo [0, 1]
+
+    Observações:
+        Assim como em 'calcular_composições_ELL', procura-se a raiz em [1e-8, 1 - 1e-8]. Quando a função não muda de
+        sinal nesse intervalo, beta é levado ao limite físico correspondente (0 se a raiz é menor, 1 se é maior)
+    """
+
+    # Função de Rachford-Rice e sua derivada (decrescente em beta)
+    def RachfordRice(betas):
+        return (zs*(Ks - 1)/(1 + betas[:, None]*(Ks - 1))).sum(axis=1)
+
+    def derivada_RachfordRice(betas):
+        return -(zs*(Ks - 1)**2/(1 + betas[:, None]*(Ks - 1))**2).sum(axis=1)
+
+    # Intervalo de busca
+    n_sistemas = zs.shape[0]
+    limite_inferior, limite_superior = np.full(n_sistemas, 1e-8), np.full(n_sistemas, 1 - 1e-8)
+    RR_inferior, RR_superior = RachfordRice(limite_inferior), RachfordRice(limite_superior)
+
+    # Sistemas sem mudança de sinal: limite físico
+    betasrr = np.where(RR_inferior <= 0, 0.0, 1.0)
+    com_raiz = (RR_inferior > 0) & (RR_superior < 0)
+
+    # Newton com salvaguarda de bisseção nos sistemas com raiz no intervalo
+    índices = np.flatnonzero(com_raiz)
+    a, c = limite_inferior[índices], limite_superior[índices]
+    zs, Ks = zs[índices], Ks[índices]
+    betas = a.copy()
+    for _ in range(100):
+        RR = RachfordRice(betas)
+        a = np.where(RR > 0, betas, a)
+        c = np.where(RR <= 0, betas, c)
+        betas_newton = betas - RR/derivada_RachfordRice(betas)
+        fora_do_intervalo = ~((betas_newton > a) & (betas_newton < c))
+        betas_novos = np.where(fora_do_intervalo, 0.5*(a + c), betas_newton)
+        convergido = np.abs(betas_novos - betas) <= 1e-15 + 4e-16*np.abs(betas_novos)
+        betas = betas_novos
+        if convergido.all():
+            break
+    betasrr[índices] = betas
+
+    return betasrr
+
+
 # Função 
 def calcular_yield_asfaltenos(betarr, xsL, xsH, MMs):
     """ Calcula o yield fracional de asfalteno após o cálculo de equilíbrio.
@@ -141,3 +402,31 @@ def calcular_yield_asfaltenos(betarr, xsL, xsH, MMs):
     yield_calc = m_asfaltenosH/m_petróleo
     
     return yield_calc
+
+
+# Função
+def calcular_yields_asfaltenos_lote(betasrr, xsL, xsH, MMs):
+    """ Calcula os yields fracionais de asfaltenos de vários sistemas (versão vetorizada de
+        'calcular_yield_asfaltenos').
+
+    Inputs:
+        betasrr (array) : parâmetros beta de Rachford-Rice, um por sistema
+        xsL (array)     : composições molares da fase leve, uma linha por sistema
+        xsH (array)     : composições molares da fase pesada, uma linha por sistema
+        MMs (array)     : massas molares (kg/mol), comuns (1D) ou uma linha por sistema (2D)
+
+    Outputs:
+        yields_calc (array): yields fracionais de asfaltenos (calculados), um por sistema
+    """
+
+    # Massas dos componentes nas duas fases (base de cálculo: 1 mol de alimentação)
+    msL = xsL*(1 - betasrr)[:, None]*MMs  # kg
+    msH = xsH*betasrr[:, None]*MMs  # kg
+
+    # Massa de petróleo (sem o solvente) e de asfaltenos na fase pesada
+    m_petróleo = msL[:, 1:].sum(axis=1) + msH.sum(axis=1)
+    m_asfaltenosH = msH[:, 4:].sum(axis=1)
+
+    yields_calc = m_asfaltenosH/m_petróleo
+
+    return yields_calc
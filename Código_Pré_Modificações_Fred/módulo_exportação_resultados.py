@@ -0,0 +1,208 @@
+# Importação de bibliotecas do python
+import json
+import os
+import numpy as np
+
+
+# Função
+def importar_pyarrow():
+    """ Importa o 'pyarrow' (dependência opcional, usada apenas na exportação em Parquet).
+
+    Outputs:
+        Uma tupla contendo os seguintes elementos:
+            pa (module) : módulo 'pyarrow'
+            pq (module) : módulo 'pyarrow.parquet'
+    """
+
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as erro:
+        raise ImportError("A exportacao dos resultados de ELL em Parquet requer o pacote 'pyarrow' "
+                          "(pip install pyarrow).") from erro
+
+    return pa, pq
+
+
+# Função
+def montar_nomes_componentes(n_agregados):
+    """ Monta os nomes dos componentes na ordem dos arrays de composição: [Solvente, S, A, R, Asf0, Asf1, ...].
+
+    Inputs:
+        n_agregados (int) : nº de agregados de asfaltenos (ou de nós da quadratura, na opção 'quadratura_gauss')
+
+    Outputs:
+        nomes_componentes (list) : nomes dos componentes
+    """
+
+    return ["Solvente", "S", "A", "R"] + [f"Asf{i}" for i in range(n_agregados)]
+
+
+# Classe
+class EscritorResultadosELL:
+    """ Escritor dos resultados de ELL de cada ponto (configuração, temperatura, fração de solvente, beta, yield,
+        composições das fases leve e pesada e nº de iterações) em um arquivo Parquet. Os pontos recebidos são
+        acumulados e gravados em grupos de 'linhas_por_grupo' linhas à medida que são produzidos, de modo que a
+        memória usada é limitada pelo tamanho de um grupo (e não pelo nº total de pontos).
+
+    Exemplo de uso:
+        with EscritorResultadosELL(diretório_arquivo, montar_nomes_componentes(n_agregados)) as escritor:
+            for identificador, (T, frações_solvente) in enumerate(configurações):
+                yields_calc, betasrr, xsL, xsH, n_it = ...
+                escritor.escrever(identificador, T, frações_solvente, betasrr, yields_calc, xsL, xsH, n_it)
+        tabela = ler_resultados_ELL(diretório_arquivo, colunas=["configuracao", "fracao_solvente", "yield"])
+
+    Observações:
+        Cada fração molar é uma coluna ('xL_<componente>' e 'xH_<componente>'), de modo que os leitores podem ler
+        apenas as colunas de interesse. O arquivo é escrito com o sufixo '.parcial' e renomeado apenas ao ser
+        fechado sem erros; se a escrita for interrompida por uma exceção, o arquivo '.parcial' é fechado (legível,
+        com os grupos já gravados) e mantido.
+    """
+
+    def __init__(self, diretório_arquivo, nomes_componentes, linhas_por_grupo=65536, metadados=None,
+                 compressão="zstd"):
+        """
+        Inputs:
+            diretório_arquivo (string) : arquivo .parquet de destino
+            nomes_componentes (list)   : nomes dos componentes, ver 'montar_nomes_componentes'
+            linhas_por_grupo (int)     : nº de pontos por grupo de linhas do Parquet
+            metadados (dict)           : informações gravadas nos metadados do arquivo (ex: planilha, parâmetros dos
+                                         agregados, massas molares); textos são gravados como estão e os demais
+                                         valores em JSON (opcional)
+            compressão (string)        : compressão das colunas ('zstd', 'snappy', 'gzip' ou 'none')
+        """
+
+        pa, pq = importar_pyarrow()
+        self._pa = pa
+        self.diretório_arquivo = diretório_arquivo
+        self.linhas_por_grupo = int(linhas_por_grupo)
+        self.n_componentes = len(nomes_componentes)
+        self.n_pontos_escritos = 0
+        self._buffer = []
+        self._n_pontos_buffer = 0
+
+        campos = [pa.field("configuracao", pa.int64()), pa.field("temperatura", pa.float64()),
+                  pa.field("fracao_solvente", pa.float64()), pa.field("beta", pa.float64()),
+                  pa.field("yield", pa.float64()), pa.field("n_iteracoes", pa.int32())]
+        campos += [pa.field(f"{fase}_{nome}", pa.float64()) for fase in ("xL", "xH") for nome in nomes_componentes]
+        self.esquema = pa.schema(campos, metadata={
+            str(chave): valor if isinstance(valor, str) else json.dumps(np.asarray(valor).tolist())
+            for chave, valor in (metadados or {}).items()})
+
+        os.makedirs(os.path.dirname(diretório_arquivo) or ".", exist_ok=True)
+        self._diretório_parcial = diretório_arquivo + ".parcial"
+        self._escritor = pq.ParquetWriter(self._diretório_parcial, self.esquema, compression=compressão)
+
+    def escrever(self, configurações, temperaturas, frações_solvente, betasrr, yields_calc, xsL, xsH, n_it):
+        """ Acrescenta pontos ao arquivo (gravados quando completam um grupo de linhas).
+
+        Inputs:
+            configurações (int ou array)  : identificador da configuração de cada ponto (ex: índice do petróleo, da
+                                            temperatura ou do conjunto de parâmetros), ou um único para todos
+            temperaturas (float ou array) : temperatura (K) de cada ponto, ou uma única para todos
+            frações_solvente (array)      : fração mássica de solvente de cada ponto
+            betasrr (array)               : betas de Rachford-Rice
+            yields_calc (array)           : yields fracionais de asfaltenos
+            xsL (array)                   : composições da fase leve, uma linha por ponto
+            xsH (array)                   : composições da fase pesada, uma linha por ponto
+            n_it (array)                  : nº de iterações do cálculo de ELL de cada ponto
+        """
+
+        frações_solvente = np.ravel(np.asarray(frações_solvente, dtype=float))
+        n_pontos = frações_solvente.shape[0]
+        xsL = np.asarray(xsL, dtype=float).reshape(n_pontos, self.n_componentes)
+        xsH = np.asarray(xsH, dtype=float).reshape(n_pontos, self.n_componentes)
+        self._buffer.append((np.broadcast_to(np.asarray(configurações, dtype=np.int64), (n_pontos,)).ravel(),
+                             np.broadcast_to(np.asarray(temperaturas, dtype=float), (n_pontos,)).ravel(),
+                             frações_solvente, np.ravel(np.asarray(betasrr, dtype=float)),
+                             np.ravel(np.asarray(yields_calc, dtype=float)),
+                             np.ravel(np.asarray(n_it)).astype(np.int32), xsL, xsH))
+        self._n_pontos_buffer += n_pontos
+
+        if self._n_pontos_buffer >= self.linhas_por_grupo:
+            self._gravar_grupos(apenas_completos=True)
+
+    def fechar(self, concluído=True):
+        """ Grava os pontos restantes, fecha o arquivo e, se 'concluído', retira o sufixo '.parcial'.
+
+        Outputs:
+            diretório_final (string) : arquivo gravado
+        """
+
+        if self._escritor is None:
+            return self.diretório_arquivo
+        self._gravar_grupos(apenas_completos=False)
+        self._escritor.close()
+        self._escritor = None
+        if not concluído:
+            return self._diretório_parcial
+        os.replace(self._diretório_parcial, self.diretório_arquivo)
+        return self.diretório_arquivo
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo_exceção, exceção, rastreamento):
+        self.fechar(concluído=tipo_exceção is None)
+
+    def _gravar_grupos(self, apenas_completos):
+        """ Grava o buffer em grupos de 'linhas_por_grupo' linhas; com 'apenas_completos', os pontos que não
+            completam um grupo permanecem no buffer. """
+
+        if self._n_pontos_buffer == 0:
+            return
+        colunas = [np.concatenate(arrays) for arrays in zip(*self._buffer)]
+        n_pontos = self._n_pontos_buffer
+        if apenas_completos:
+            n_pontos -= n_pontos % self.linhas_por_grupo
+        restante = [coluna[n_pontos:] for coluna in colunas]
+        self._buffer = [tuple(restante)] if restante[0].shape[0] > 0 else []
+        self._n_pontos_buffer = restante[0].shape[0]
+
+        *escalares, xsL, xsH = (coluna[0:n_pontos] for coluna in colunas)
+        arrays = [self._pa.array(coluna) for coluna in escalares]
+        arrays += [self._pa.array(xs[:, j]) for xs in (xsL, xsH) for j in range(self.n_componentes)]
+        self._escritor.write_table(self._pa.Table.from_arrays(arrays, schema=self.esquema),
+                                   row_group_size=self.linhas_por_grupo)
+        self.n_pontos_escritos += n_pontos
+
+
+# Função
+def abrir_escritor_resultados_ELL(diretório_arquivo, nomes_componentes, **opções):
+    """ Abre um 'EscritorResultadosELL' ou, se o 'pyarrow' não estiver instalado, exibe um aviso e retorna None
+        (a exportação é opcional e não interrompe o cálculo).
+
+    Inputs:
+        diretório_arquivo (string) : ver 'EscritorResultadosELL'
+        nomes_componentes (list)   : ver 'EscritorResultadosELL'
+        opções (dict)              : demais argumentos de 'EscritorResultadosELL'
+
+    Outputs:
+        escritor (EscritorResultadosELL) : escritor aberto (None sem o 'pyarrow')
+    """
+
+    try:
+        return EscritorResultadosELL(diretório_arquivo, nomes_componentes, **opções)
+    except ImportError as erro:
+        print(f"\nATENCAO: {erro} Os resultados de ELL de cada ponto nao serao exportados.")
+        return None
+
+
+# Função
+def ler_resultados_ELL(diretório_arquivo, colunas=None, filtros=None):
+    """ Lê (parte de) um arquivo gravado por 'EscritorResultadosELL'.
+
+    Inputs:
+        diretório_arquivo (string) : arquivo .parquet
+        colunas (list)             : colunas a serem lidas (padrão: todas), ex: ["fracao_solvente", "yield"]
+        filtros (list)             : filtros de linhas do 'pyarrow.parquet.read_table' (opcional), ex:
+                                     [("configuracao", "==", 3)]; os grupos de linhas que não os satisfazem não
+                                     são lidos
+
+    Outputs:
+        resultados (DataFrame) : pontos lidos, uma linha por ponto
+    """
+
+    pq = importar_pyarrow()[1]
+
+    return pq.read_table(diretório_arquivo, columns=colunas, filters=filtros).to_pandas()
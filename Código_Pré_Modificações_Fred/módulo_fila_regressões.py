@@ -0,0 +1,257 @@
+# Importação de bibliotecas do python
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+# Importação de outros módulos deste projeto
+from módulo_regressão import regredir_parâmetros, monitorar_função_objetivo
+
+
+# Exceção
+class RegressãoCancelada(Exception):
+    """ Levantada dentro da função objetivo para interromper uma regressão cancelada. """
+
+
+# Função
+def executar_trabalho_regressão(identificador, argumentos_regressão, fila_eventos, evento_cancelamento,
+                                intervalo_progresso):
+    """ Executa uma regressão (em um processo de trabalho), publicando o progresso na fila de eventos e verificando
+        o pedido de cancelamento a cada avaliação da função objetivo.
+
+    Inputs:
+        identificador (int)         : identificador do trabalho
+        argumentos_regressão (tuple): (chute_inicial, argumentos_otimização, algoritmo_otimização,
+                                      limites_parâmetros), ver 'regredir_parâmetros'
+        fila_eventos (Queue)        : fila (do 'multiprocessing.Manager') onde os eventos de progresso são publicados
+        evento_cancelamento (Event) : evento (do 'multiprocessing.Manager') que sinaliza o cancelamento
+        intervalo_progresso (float) : intervalo mínimo entre dois eventos de progresso (s)
+
+    Outputs:
+        resultado (dict) : parâmetros estimados ('x'), DMA ('DMA'), nº de avaliações ('n_avaliações'), e o estado
+                           final ('concluído' ou 'cancelado'); em caso de cancelamento, 'x' e 'DMA' são os do melhor
+                           ponto avaliado até então
+    """
+
+    chute_inicial, argumentos_otimização, algoritmo_otimização, limites_parâmetros = argumentos_regressão
+    instante_último_evento = [-np.inf]
+
+    def publicar_evento(tipo, histórico):
+        melhores_parâmetros = histórico["melhores_parâmetros"]
+        fila_eventos.put({"trabalho": identificador, "tipo": tipo, "instante": time.time(),
+                          "n_avaliações": histórico["n_avaliações"], "melhor_DMA": float(histórico["melhor_DMA"]),
+                          "melhores_parâmetros": None if melhores_parâmetros is None else melhores_parâmetros.tolist()})
+
+    def ao_avaliar(parâmetros, DMA, histórico):
+        if evento_cancelamento.is_set():
+            raise RegressãoCancelada
+        if time.monotonic() - instante_último_evento[0] >= intervalo_progresso:
+            instante_último_evento[0] = time.monotonic()
+            publicar_evento("progresso", histórico)
+
+    função_monitorada, histórico = monitorar_função_objetivo(ao_avaliar=ao_avaliar)
+    publicar_evento("início", histórico)
+
+    try:
+        sol = regredir_parâmetros(chute_inicial, argumentos_otimização, algoritmo_otimização, limites_parâmetros,
+                                  função_objetivo=função_monitorada)
+    except RegressãoCancelada:
+        publicar_evento("cancelado", histórico)
+        melhores_parâmetros = histórico["melhores_parâmetros"]
+        return {"estado": "cancelado", "n_avaliações": histórico["n_avaliações"],
+                "x": None if melhores_parâmetros is None else melhores_parâmetros.tolist(),
+                "DMA": float(histórico["melhor_DMA"])}
+
+    publicar_evento("fim", histórico)
+    if isinstance(sol, int):  # algoritmo sem implementação (ver 'regredir_parâmetros')
+        return {"estado": "concluído", "n_avaliações": histórico["n_avaliações"], "x": None, "DMA": None}
+    return {"estado": "concluído", "n_avaliações": histórico["n_avaliações"], "x": np.ravel(sol.x).tolist(),
+            "DMA": float(sol.fun)}
+
+
+# Classe
+class FilaRegressões:
+    """ Fila de regressões assíncronas: os trabalhos submetidos são executados em processos de trabalho (no máximo
+        'n_processos' simultâneos), e o progresso de cada um (nº de avaliações, melhor DMA e respectivos parâmetros)
+        pode ser consultado por sondagem ('consultar', 'obter_eventos') ou acompanhado como um fluxo de eventos
+        ('acompanhar'). Os trabalhos podem ser cancelados a qualquer momento ('cancelar').
+
+    Exemplo de uso:
+        with FilaRegressões(n_processos=2) as fila:
+            identificador = fila.submeter(montar_regressão_a_partir_dos_arquivos(diretório_txt, diretório_xlsx))
+            for evento in fila.acompanhar(identificador):
+                print(evento["n_avaliações"], evento["melhor_DMA"])
+            resultado = fila.consultar(identificador)["resultado"]
+    """
+
+    def __init__(self, n_processos=None, intervalo_progresso=0.5):
+        """
+        Inputs:
+            n_processos (int)           : nº máximo de regressões simultâneas (padrão: nº de CPUs)
+            intervalo_progresso (float) : intervalo mínimo entre dois eventos de progresso de um trabalho (s)
+        """
+
+        self.intervalo_progresso = intervalo_progresso
+        self._gerenciador = multiprocessing.Manager()
+        self._fila_eventos = self._gerenciador.Queue()
+        self._executor = ProcessPoolExecutor(max_workers=n_processos)
+        self._trabalhos = {}
+        self._contador = itertools.count(1)
+        self._trava = threading.Condition()
+        self._encerrada = False
+
+        # Linha de execução que recebe os eventos publicados pelos processos de trabalho
+        self._linha_eventos = threading.Thread(target=self._receber_eventos, daemon=True)
+        self._linha_eventos.start()
+
+    def submeter(self, argumentos_regressão, rótulo=None):
+        """ Coloca uma regressão na fila.
+
+        Inputs:
+            argumentos_regressão (tuple) : (chute_inicial, argumentos_otimização, algoritmo_otimização,
+                                           limites_parâmetros), ex: saída de 'montar_regressão_a_partir_dos_arquivos'
+            rótulo (string)              : descrição opcional do trabalho (ex: nome da planilha)
+
+        Outputs:
+            identificador (int) : identificador do trabalho
+        """
+
+        identificador = next(self._contador)
+        evento_cancelamento = self._gerenciador.Event()
+        with self._trava:
+            self._trabalhos[identificador] = {"rótulo": rótulo, "estado": "na_fila", "eventos": [],
+                                              "n_avaliações": 0, "melhor_DMA": None, "melhores_parâmetros": None,
+                                              "resultado": None, "erro": None, "evento_final_recebido": False,
+                                              "evento_cancelamento": evento_cancelamento}
+            futuro = self._executor.submit(executar_trabalho_regressão, identificador, argumentos_regressão,
+                                           self._fila_eventos, evento_cancelamento, self.intervalo_progresso)
+            self._trabalhos[identificador]["futuro"] = futuro
+        futuro.add_done_callback(lambda futuro: self._finalizar(identificador, futuro))
+        return identificador
+
+    def consultar(self, identificador):
+        """ Retorna o estado atual de um trabalho ('na_fila', 'executando', 'concluído', 'cancelado' ou 'falhou'),
+            com o nº de avaliações, o melhor DMA, os melhores parâmetros e, ao fim, o resultado ou o erro. """
+
+        with self._trava:
+            trabalho = self._trabalhos[identificador]
+            return {chave: trabalho[chave] for chave in ("rótulo", "estado", "n_avaliações", "melhor_DMA",
+                                                          "melhores_parâmetros", "resultado", "erro")}
+
+    def listar(self):
+        """ Retorna o estado atual de todos os trabalhos, indexado pelo identificador. """
+
+        with self._trava:
+            identificadores = list(self._trabalhos)
+        return {identificador: self.consultar(identificador) for identificador in identificadores}
+
+    def obter_eventos(self, identificador, a_partir_de=0):
+        """ Retorna os eventos de um trabalho a partir do índice 'a_partir_de' (para sondagem incremental). """
+
+        with self._trava:
+            return list(self._trabalhos[identificador]["eventos"][a_partir_de:])
+
+    def acompanhar(self, identificador, tempo_limite=None):
+        """ Gerador que entrega os eventos de um trabalho à medida que chegam, até o seu término. Levanta
+            TimeoutError se nenhum evento novo chegar (nem o trabalho terminar) em 'tempo_limite' segundos
+            (None: sem limite). """
+
+        índice = 0
+        while True:
+            with self._trava:
+                trabalho = self._trabalhos[identificador]
+                if índice >= len(trabalho["eventos"]) and not self._terminou(trabalho):
+                    if not self._trava.wait_for(lambda: índice < len(trabalho["eventos"]) or self._terminou(trabalho),
+                                                tempo_limite):
+                        raise TimeoutError(f"Nenhum evento do trabalho {identificador} em {tempo_limite} s.")
+                novos_eventos = trabalho["eventos"][índice:]
+                terminou = self._terminou(trabalho)
+            índice += len(novos_eventos)
+            yield from novos_eventos
+            if terminou and not novos_eventos:
+                return
+
+    def cancelar(self, identificador):
+        """ Cancela um trabalho: se ainda estiver na fila, é descartado; se estiver em execução, é interrompido na
+            próxima avaliação da função objetivo (mantendo o melhor ponto avaliado até então). """
+
+        with self._trava:
+            trabalho = self._trabalhos[identificador]
+            if trabalho["futuro"].cancel():
+                return
+            trabalho["evento_cancelamento"].set()
+
+    def aguardar(self, identificador, tempo_limite=None):
+        """ Aguarda o término de um trabalho e retorna o seu estado final. """
+
+        with self._trava:
+            self._trava.wait_for(lambda: self._terminou(self._trabalhos[identificador]), tempo_limite)
+        return self.consultar(identificador)
+
+    def encerrar(self, cancelar_pendentes=False):
+        """ Encerra a fila, aguardando (ou cancelando) os trabalhos pendentes. """
+
+        if cancelar_pendentes:
+            with self._trava:
+                identificadores = list(self._trabalhos)
+            for identificador in identificadores:
+                self.cancelar(identificador)
+        self._executor.shutdown(wait=True)
+        self._encerrada = True
+        self._linha_eventos.join()
+        self._gerenciador.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.encerrar(cancelar_pendentes=exc[0] is not None)
+
+    @staticmethod
+    def _terminou(trabalho):
+        return trabalho["estado"] in ("concluído", "cancelado", "falhou")
+
+    def _receber_eventos(self):
+        # Transfere os eventos da fila do gerenciador para o registro de cada trabalho
+        while not (self._encerrada and self._fila_eventos.empty()):
+            try:
+                evento = self._fila_eventos.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                return
+            with self._trava:
+                trabalho = self._trabalhos[evento["trabalho"]]
+                trabalho["eventos"].append(evento)
+                trabalho["n_avaliações"] = evento["n_avaliações"]
+                if evento["melhores_parâmetros"] is not None:
+                    trabalho["melhor_DMA"] = evento["melhor_DMA"]
+                    trabalho["melhores_parâmetros"] = evento["melhores_parâmetros"]
+                if trabalho["estado"] == "na_fila":
+                    trabalho["estado"] = "executando"
+                if evento["tipo"] in ("fim", "cancelado"):
+                    trabalho["evento_final_recebido"] = True
+                    if trabalho["resultado"] is not None:
+                        trabalho["estado"] = trabalho["resultado"]["estado"]
+                self._trava.notify_all()
+
+    def _finalizar(self, identificador, futuro):
+        # Registra o resultado de um trabalho concluído, cancelado (na fila ou em execução) ou com falha
+        with self._trava:
+            trabalho = self._trabalhos[identificador]
+            if futuro.cancelled():
+                trabalho["estado"] = "cancelado"
+            elif futuro.exception() is not None:
+                trabalho["estado"] = "falhou"
+                trabalho["erro"] = repr(futuro.exception())
+            else:
+                # O estado final só é atribuído após o último evento do trabalho ter sido recebido, de modo que
+                # 'acompanhar' entregue todos os eventos
+                trabalho["resultado"] = futuro.result()
+                trabalho["n_avaliações"] = trabalho["resultado"]["n_avaliações"]
+                if trabalho["evento_final_recebido"]:
+                    trabalho["estado"] = trabalho["resultado"]["estado"]
+            self._trava.notify_all()
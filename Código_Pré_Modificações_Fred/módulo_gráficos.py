@@ -65,6 +65,7 @@ def plotar_yield_curves(ws_solvente, yields_exp, yields_calc, informações_auxi
         diretório_png = os.path.join(diretório_da_pasta_deste_modulo, "Resultados", "Predição", nome_arquivo_gráfico)
     else:
         diretório_png = os.path.join(diretório_da_pasta_deste_modulo, "Resultados", "Regressão", nome_arquivo_gráfico)
+    os.makedirs(os.path.dirname(diretório_png), exist_ok=True)
     plt.savefig(diretório_png, dpi=300, bbox_inches="tight")
 
     # Fechando o arquivo após salvá-lo
@@ -125,6 +126,7 @@ def plotar_distribuição_massa_molar(MMsagregados, xsagregados, alfa, MWavg, in
         diretório_png = os.path.join(diretório_da_pasta_deste_modulo, "Resultados", "Predição", nome_arquivo_gráfico)
     else:
         diretório_png = os.path.join(diretório_da_pasta_deste_modulo, "Resultados", "Regressão", nome_arquivo_gráfico)
+    os.makedirs(os.path.dirname(diretório_png), exist_ok=True)
     plt.savefig(diretório_png, dpi=300, bbox_inches="tight")
 
     # Fechando o arquivo após salvá-lo
@@ -0,0 +1,125 @@
+# Importação de bibliotecas do python
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+# Importação de outros módulos deste projeto
+from módulo_curva_solubilidade import calcular_curvas_solubilidade_lote
+
+
+# Função
+def amostrar_entradas_perturbadas(SARA, T, desvio_SARA, desvio_T, n_amostras, gerador):
+    """ Sorteia composições SARA e temperaturas perturbadas por erros de medição gaussianos.
+
+    Inputs:
+        SARA (array)              : composição SARA nominal do petróleo (base mássica, normalizada)
+        T (float)                 : temperatura nominal (K)
+        desvio_SARA (float/array) : desvio-padrão absoluto de cada fração SARA (fração mássica), escalar ou um por
+                                    fração
+        desvio_T (float)          : desvio-padrão da temperatura (K)
+        n_amostras (int)          : nº de amostras
+        gerador (Generator)       : gerador de números aleatórios do numpy
+
+    Outputs:
+        Uma tupla contendo os seguintes elementos:
+            SARAs (array) : composições SARA perturbadas e renormalizadas, uma linha por amostra
+            Ts (array)    : temperaturas perturbadas (K), uma por amostra
+    """
+
+    # Composições SARA: perturbação, truncamento em zero e renormalização
+    SARAs = np.asarray(SARA, dtype=float) + gerador.normal(0, 1, (n_amostras, 4))*desvio_SARA
+    SARAs = np.clip(SARAs, 0, None)
+    SARAs = SARAs/SARAs.sum(axis=1, keepdims=True)
+
+    # Temperaturas
+    Ts = float(T) + gerador.normal(0, 1, n_amostras)*desvio_T
+
+    return SARAs, Ts
+
+
+# Função
+def avaliar_bloco_monte_carlo(argumentos_bloco):
+    """ Sorteia e avalia um bloco de amostras de Monte Carlo (executado em um processo de trabalho).
+
+    Inputs:
+        argumentos_bloco (tuple) : (semente_bloco, n_amostras_bloco, dados_sistema, desvios, argumentos_modelo),
+                                   ver 'propagar_incertezas_monte_carlo'
+
+    Outputs:
+        Uma tupla contendo os seguintes elementos:
+            SARAs (array)  : composições SARA amostradas, uma linha por amostra
+            Ts (array)     : temperaturas amostradas (K)
+            yields (array) : yields fracionais calculados, dimensões (nº de amostras do bloco, nº de pontos)
+    """
+
+    # Desempacotando os argumentos
+    semente_bloco, n_amostras_bloco, dados_sistema, desvios, argumentos_modelo = argumentos_bloco
+    T, SARA, ws_simplificados, solvente = dados_sistema
+    desvio_SARA, desvio_T, desvio_yields = desvios
+    parâmetros_agregados, correlações_componentes, variáveis_distribuição_massa_molar = argumentos_modelo
+
+    # Amostragem das entradas perturbadas
+    gerador = np.random.default_rng(semente_bloco)
+    SARAs, Ts = amostrar_entradas_perturbadas(SARA, T, desvio_SARA, desvio_T, n_amostras_bloco, gerador)
+
+    # Curvas de solubilidade de todas as amostras do bloco com um único cálculo de ELL vetorizado
+    yields = calcular_curvas_solubilidade_lote(parâmetros_agregados, (Ts, SARAs, ws_simplificados), solvente,
+                                               correlações_componentes, variáveis_distribuição_massa_molar)[0]
+
+    # Erro de medição dos próprios yields (opcional)
+    if desvio_yields > 0:
+        yields = np.clip(yields + gerador.normal(0, 1, yields.shape)*desvio_yields, 0, None)
+
+    return SARAs, Ts, yields
+
+
+# Função
+def propagar_incertezas_monte_carlo(dados_sistema, desvios, argumentos_modelo, n_amostras=2000, tamanho_bloco=250,
+                                    n_processos=1, semente=0, percentis=(2.5, 50, 97.5)):
+    """ Propaga as incertezas de medição da composição SARA e da temperatura para a curva de solubilidade por
+        Monte Carlo, avaliando as amostras em blocos de cálculos de ELL vetorizados.
+
+    Inputs:
+        dados_sistema (tuple)     : (T, SARA, ws_simplificados, solvente) nominais
+        desvios (tuple)           : (desvio_SARA, desvio_T, desvio_yields), desvios-padrão absolutos das frações SARA,
+                                    da temperatura (K) e dos yields medidos (0 para desconsiderar)
+        argumentos_modelo (tuple) : (parâmetros_agregados, correlações_componentes,
+                                    variáveis_distribuição_massa_molar), ver 'calcular_curvas_solubilidade_lote'
+        n_amostras (int)          : nº total de amostras
+        tamanho_bloco (int)       : nº de amostras por bloco (cada bloco é uma tarefa de um processo)
+        n_processos (int)         : nº de processos de trabalho (1 para execução serial)
+        semente (int)             : semente do gerador de números aleatórios
+        percentis (tuple)         : percentis a serem reportados (%)
+
+    Outputs:
+        Uma tupla contendo os seguintes elementos:
+            percentis_yields (array) : percentis dos yields, dimensões (nº de percentis, nº de pontos)
+            yields (array)           : yields de todas as amostras, dimensões (nº de amostras, nº de pontos)
+            SARAs (array)            : composições SARA amostradas, uma linha por amostra
+            Ts (array)               : temperaturas amostradas (K)
+
+    Observações:
+        Cada bloco recebe uma semente derivada de 'semente' (SeedSequence.spawn), de modo que os resultados dependem
+        apenas de 'semente', 'n_amostras' e 'tamanho_bloco', e não do nº de processos
+    """
+
+    # Divisão das amostras em blocos, cada um com sua própria semente
+    n_blocos = int(np.ceil(n_amostras/tamanho_bloco))
+    sementes_blocos = np.random.SeedSequence(semente).spawn(n_blocos)
+    n_amostras_blocos = [min(tamanho_bloco, n_amostras - i*tamanho_bloco) for i in range(n_blocos)]
+    argumentos_blocos = [(sementes_blocos[i], n_amostras_blocos[i], dados_sistema, desvios, argumentos_modelo)
+                         for i in range(n_blocos)]
+
+    # Avaliação dos blocos (em série ou em paralelo, preservando a ordem dos blocos)
+    if n_processos == 1:
+        resultados_blocos = list(map(avaliar_bloco_monte_carlo, argumentos_blocos))
+    else:
+        with ProcessPoolExecutor(max_workers=n_processos) as executor:
+            resultados_blocos = list(executor.map(avaliar_bloco_monte_carlo, argumentos_blocos))
+
+    # Junção dos blocos e cálculo dos percentis
+    SARAs = np.concatenate([resultado[0] for resultado in resultados_blocos])
+    Ts = np.concatenate([resultado[1] for resultado in resultados_blocos])
+    yields = np.concatenate([resultado[2] for resultado in resultados_blocos])
+    percentis_yields = np.percentile(yields, percentis, axis=0)
+
+    return percentis_yields, yields, SARAs, Ts
@@ -0,0 +1,166 @@
+# Importação de bibliotecas do python
+import numpy as np
+import scipy as scp
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+# Importação de outros módulos deste projeto
+from módulo_regressão import regredir_parâmetros, desempacotar_parâmetros
+from módulo_curva_solubilidade import gerar_distribuição_agregados_normalizada
+from módulo_regressão_incremental import F_obj_incremental
+from módulo_memória_compartilhada import RegistroMemóriaCompartilhada, restaurar_compartilhados, \
+    publicar_resultado_processo
+
+
+# Função
+def refazer_regressão(argumentos_reajuste):
+    """ Refaz a regressão com um subconjunto (ou reamostragem) dos pontos experimentais (executado em um processo de
+        trabalho).
+
+    Inputs:
+        argumentos_reajuste (tuple) : (índices, chute_inicial, argumentos_otimização, algoritmo_otimização,
+                                      limites_parâmetros, soluções_ELL, identificador_registro), com 'índices' os
+                                      pontos experimentais utilizados, os arrays de 'argumentos_otimização'
+                                      possivelmente em memória compartilhada, 'soluções_ELL' as soluções de ELL
+                                      publicadas por uma regressão anterior (ou None) e 'identificador_registro' o
+                                      do 'RegistroMemóriaCompartilhada' do trabalho (None em execução serial)
+
+    Outputs:
+        Uma tupla contendo os seguintes elementos:
+            parâmetros (array)   : parâmetros estimados
+            DMA (float)          : valor da função objetivo no ótimo
+            n_avaliações (int)   : nº de avaliações da função objetivo
+            soluções_ELL (array) : composições (xsL, xsH) de todos os pontos experimentais, dimensões (2, nº de
+                                   pontos, nº de componentes), com as soluções bifásicas desta regressão nos pontos
+                                   utilizados e as de 'soluções_ELL' nos demais (NaN onde não há); em memória
+                                   compartilhada ('ArrayCompartilhado', ver 'publicar_resultado_processo') se houver
+                                   'identificador_registro'
+
+    Observações:
+        O ELL de cada ponto parte das 'soluções_ELL' (ver 'F_obj_incremental'), e não do chute padrão
+    """
+
+    # Desempacotando os argumentos
+    (índices, chute_inicial, argumentos_otimização, algoritmo_otimização, limites_parâmetros, soluções_ELL,
+     identificador_registro) = argumentos_reajuste
+    argumentos_otimização, soluções_ELL = restaurar_compartilhados((argumentos_otimização, soluções_ELL))
+    dados_experimentais, propriedades_componentes, variáveis_distribuição_massa_molar, configuração_regressão = \
+        argumentos_otimização
+    T, SARA, ws_simplificados, yields_exp = dados_experimentais
+
+    # Dados experimentais do subconjunto
+    dados_experimentais_subconjunto = (T, SARA, ws_simplificados[índices], yields_exp[índices])
+    argumentos_subconjunto = (dados_experimentais_subconjunto, propriedades_componentes,
+                              variáveis_distribuição_massa_molar, configuração_regressão)
+
+    # Chutes iniciais de ELL dos pontos do subconjunto (sem reaproveitamento de yields: 'parâmetros' em NaN)
+    if soluções_ELL is None:
+        tipo_regressão, parâmetros_agregados = configuração_regressão[0:2]
+        with np.errstate(all="ignore"):
+            n_componentes = 4 + gerar_distribuição_agregados_normalizada(
+                desempacotar_parâmetros(chute_inicial, tipo_regressão, parâmetros_agregados),
+                variáveis_distribuição_massa_molar)[0].shape[0]
+        soluções_ELL = np.full((2, yields_exp.shape[0], n_componentes), np.nan)
+    cache = {"parâmetros": np.full(np.size(chute_inicial), np.nan), "yields": np.full(índices.shape[0], np.nan),
+             "xsL": soluções_ELL[0, índices], "xsH": soluções_ELL[1, índices]}
+
+    # Regressão partindo do ótimo obtido com todos os pontos
+    sol = regredir_parâmetros(chute_inicial, argumentos_subconjunto + (cache,), algoritmo_otimização,
+                              limites_parâmetros, função_objetivo=F_obj_incremental)
+
+    # Soluções de ELL para as regressões seguintes
+    soluções_ELL = soluções_ELL.copy()
+    soluções_ELL[0, índices], soluções_ELL[1, índices] = cache["xsL"], cache["xsH"]
+    if identificador_registro is not None:
+        soluções_ELL = publicar_resultado_processo(soluções_ELL, identificador_registro)
+
+    return sol.x, sol.fun, sol.nfev, soluções_ELL
+
+
+# Função
+def estimar_intervalos_confiança(parâmetros_ótimos, argumentos_otimização, algoritmo_otimização, limites_parâmetros,
+                                 n_bootstrap=200, nível_confiança=0.95, n_processos=1, semente=0):
+    """ Estima intervalos de confiança e correlações dos parâmetros regredidos por bootstrap e por leave-one-out
+        (jackknife), refazendo as regressões em paralelo a partir do ótimo obtido com todos os pontos.
+
+    Inputs:
+        parâmetros_ótimos (array)     : parâmetros estimados com todos os pontos experimentais
+        argumentos_otimização (tuple) : *args da função 'F_obj' (com todos os pontos experimentais)
+        algoritmo_otimização (int)    : algoritmo numérico de regressão dos parâmetros
+        limites_parâmetros (list)     : limites dos parâmetros
+        n_bootstrap (int)             : nº de reamostragens bootstrap
+        nível_confiança (float)       : nível de confiança dos intervalos
+        n_processos (int)             : nº de processos de trabalho (1 para execução serial)
+        semente (int)                 : semente do gerador de números aleatórios das reamostragens
+
+    Outputs:
+        Uma tupla contendo os seguintes elementos:
+            ic_bootstrap (array)             : intervalos de confiança por percentis do bootstrap, uma linha
+                                               (inferior, superior) por parâmetro
+            ic_leave_one_out (array)         : intervalos de confiança normais com o erro-padrão jackknife, uma
+                                               linha (inferior, superior) por parâmetro
+            correlações (array)              : matriz de correlação dos parâmetros (bootstrap)
+            parâmetros_bootstrap (array)     : parâmetros de cada reamostragem, uma linha por reamostragem
+            parâmetros_leave_one_out (array) : parâmetros de cada subconjunto leave-one-out, uma linha por ponto
+                                               retirado
+
+    Observações:
+        Cada regressão parte o ELL das soluções publicadas pela última regressão concluída (ver 'refazer_regressão');
+        os parâmetros partem sempre de 'parâmetros_ótimos', de modo que o resultado de cada regressão não depende da
+        ordem de conclusão das demais. Em paralelo, no máximo 2*n_processos regressões ficam em andamento, para que
+        as regressões seguintes recebam soluções recentes.
+    """
+
+    # Reamostragens bootstrap (com reposição) e subconjuntos leave-one-out
+    n_dados_exp = argumentos_otimização[0][3].shape[0]
+    gerador = np.random.default_rng(semente)
+    índices_bootstrap = [gerador.integers(0, n_dados_exp, n_dados_exp) for _ in range(n_bootstrap)]
+    índices_leave_one_out = [np.delete(np.arange(n_dados_exp), i) for i in range(n_dados_exp)]
+
+    índices_reajustes = índices_bootstrap + índices_leave_one_out
+    resultados = [None]*len(índices_reajustes)
+
+    # Regressões (em série ou em paralelo, preservando a ordem; em paralelo, os dados são publicados uma única vez
+    # em memória compartilhada e cada tarefa leva apenas as suas referências, inclusive às soluções de ELL
+    # publicadas pelos processos de trabalho e adotadas pelo registro)
+    if n_processos == 1:
+        soluções_ELL = None
+        for i, índices in enumerate(índices_reajustes):
+            resultados[i] = refazer_regressão((índices, parâmetros_ótimos, argumentos_otimização, algoritmo_otimização,
+                                               limites_parâmetros, soluções_ELL, None))
+            soluções_ELL = resultados[i][3]
+    else:
+        with RegistroMemóriaCompartilhada() as registro, ProcessPoolExecutor(max_workers=n_processos) as executor:
+            argumentos_compartilhados = registro.compartilhar(argumentos_otimização)
+            soluções_ELL, em_andamento, próximo = None, {}, 0
+            while próximo < len(índices_reajustes) or em_andamento:
+                while próximo < len(índices_reajustes) and len(em_andamento) < 2*n_processos:
+                    futuro = executor.submit(refazer_regressão, (
+                        índices_reajustes[próximo], parâmetros_ótimos, argumentos_compartilhados,
+                        algoritmo_otimização, limites_parâmetros, soluções_ELL, registro.identificador))
+                    em_andamento[futuro] = próximo
+                    próximo += 1
+                concluídos = wait(em_andamento, return_when=FIRST_COMPLETED)[0]
+                for futuro in concluídos:
+                    resultados[em_andamento.pop(futuro)] = futuro.result()
+                    registro.adotar(futuro.result()[3])
+                    soluções_ELL = futuro.result()[3]
+    parâmetros_reajustes = np.array([resultado[0] for resultado in resultados])
+    parâmetros_bootstrap = parâmetros_reajustes[0:n_bootstrap]
+    parâmetros_leave_one_out = parâmetros_reajustes[n_bootstrap:]
+
+    # Intervalos de confiança por percentis do bootstrap
+    alfa_bilateral = (1 - nível_confiança)/2
+    ic_bootstrap = np.percentile(parâmetros_bootstrap, [100*alfa_bilateral, 100*(1 - alfa_bilateral)], axis=0).T
+
+    # Intervalos de confiança com o erro-padrão jackknife (leave-one-out)
+    média_leave_one_out = parâmetros_leave_one_out.mean(axis=0)
+    erro_padrão_jackknife = np.sqrt((n_dados_exp - 1)/n_dados_exp
+                                    * ((parâmetros_leave_one_out - média_leave_one_out)**2).sum(axis=0))
+    z = scp.stats.norm.ppf(1 - alfa_bilateral)
+    ic_leave_one_out = np.column_stack((parâmetros_ótimos - z*erro_padrão_jackknife,
+                                        parâmetros_ótimos + z*erro_padrão_jackknife))
+
+    # Correlações entre os parâmetros
+    correlações = np.atleast_2d(np.corrcoef(parâmetros_bootstrap, rowvar=False))
+
+    return ic_bootstrap, ic_leave_one_out, correlações, parâmetros_bootstrap, parâmetros_leave_one_out
@@ -52,6 +52,26 @@ def ler_variáveis_entrada_código(diretório):
             algoritmo_otimização (int)               : algoritmo numérico de regressão dos parâmetros
             nome_planilha (string)                   : título da planilha que contém os dados experimentais a serem
                                                        preditos ou regredidos
+
+            método_discretização_agregados (string)  : forma de discretização da FDP_Gamma em agregados de asfaltenos
+                                                       (opcional, padrão: 'uniforme')
+            intervalos_confiança_parâmetros (string) : cálculo de intervalos de confiança dos parâmetros regredidos
+                                                       (opcional, padrão: 'nenhum')
+            modo_regressão (string)                  : forma de avaliação da função objetivo na regressão
+                                                       (opcional, padrão: 'direto')
+            chute_inicial_automático (bool)          : True para estimar os chutes iniciais pela tabela de curvas do
+                                                       modelo (opcional, padrão: False, 'nao' no arquivo)
+            planilhas_regressão_conjunta (tuple)     : planilhas da regressão conjunta, além de 'nome_planilha'
+                                                       (opcional, padrão: nenhuma)
+            parâmetros_compartilhados (tuple)        : parâmetros estimados comuns a todas as planilhas da regressão
+                                                       conjunta (opcional, padrão: c_delta_agregados,
+                                                       Alinha_delta_agregados e d_delta_agregados)
+            tempo_máximo_regressão (float)           : orçamento de tempo da regressão com 'modo_regressão' =
+                                                       'orcamento' (s; opcional, padrão: None, sem limite, 'nenhum'
+                                                       no arquivo)
+            n_avaliações_máximo_regressão (int)      : orçamento de nº de avaliações da função objetivo da regressão
+                                                       com 'modo_regressão' = 'orcamento' (opcional, padrão: None,
+                                                       sem limite, 'nenhum' no arquivo)
             
     Observações:
         Maiores informações sobre as variáveis supracitadas estão no arquivo 'variáveis_entrada_código.txt'
@@ -62,7 +82,14 @@ def ler_variáveis_entrada_código(diretório):
         linhas = arquivo.readlines()
 
     # Armazenamento apenas das linhas que contém os valores das variáveis a serem lidas pelo programa principal
-    linhas_úteis = linhas[-23:-1]
+    # Obs: são as linhas não vazias entre o título 'Valores:' (e seu sublinhado) e a borda final da tabela
+    índice_valores = [linha.strip() for linha in linhas].index("Valores:")
+    linhas_úteis = []
+    for linha in linhas[índice_valores + 2:]:
+        if linha.startswith("+"):
+            break
+        if linha.strip():
+            linhas_úteis.append(linha)
 
     # Removendo o nome da varíavel da linha
     linhas_úteis_valores = [linha.split(":", 1)[1] if ":" in linha else linha for linha in linhas_úteis]
@@ -94,6 +121,21 @@ def ler_variáveis_entrada_código(diretório):
     algoritmo_otimização = int(linhas_úteis_limpas[20])
     nome_planilha = linhas_úteis_limpas[21]
 
+    # Variáveis opcionais (ausentes em arquivos antigos, como os de gabaritos, recebem valores padrão)
+    linhas_opcionais = linhas_úteis_limpas[22:]
+    método_discretização_agregados = linhas_opcionais[0] if len(linhas_opcionais) > 0 else "uniforme"
+    intervalos_confiança_parâmetros = linhas_opcionais[1] if len(linhas_opcionais) > 1 else "nenhum"
+    modo_regressão = linhas_opcionais[2] if len(linhas_opcionais) > 2 else "direto"
+    chute_inicial_automático = linhas_opcionais[3] == "sim" if len(linhas_opcionais) > 3 else False
+    planilhas_regressão_conjunta = tuple(nome.strip() for nome in linhas_opcionais[4].split(",") if nome.strip()) \
+        if len(linhas_opcionais) > 4 else ()
+    parâmetros_compartilhados = tuple(nome.strip() for nome in linhas_opcionais[5].split(",") if nome.strip()) \
+        if len(linhas_opcionais) > 5 else ("c_delta_agregados", "Alinha_delta_agregados", "d_delta_agregados")
+    tempo_máximo_regressão = float(linhas_opcionais[6]) \
+        if len(linhas_opcionais) > 6 and linhas_opcionais[6] != "nenhum" else None
+    n_avaliações_máximo_regressão = int(linhas_opcionais[7]) \
+        if len(linhas_opcionais) > 7 and linhas_opcionais[7] != "nenhum" else None
+
     return (
         n_agregados, MWmin, MWmax, alfa, MWavg, tipo_cálculo_MM_agregados, método_integração_FDP_Gamma, 
         correlação_densidade_saturados, correlação_delta_saturados,
@@ -102,7 +144,10 @@ def ler_variáveis_entrada_código(diretório):
         correlação_densidade_agregados, correlação_delta_agregados, 
         Alinha_delta_agregados, c_delta_agregados, d_delta_agregados,
         tipo_cálculo_programa, tipo_regressão, algoritmo_otimização,
-        nome_planilha
+        nome_planilha,
+        método_discretização_agregados, intervalos_confiança_parâmetros, modo_regressão, chute_inicial_automático,
+        planilhas_regressão_conjunta, parâmetros_compartilhados,
+        tempo_máximo_regressão, n_avaliações_máximo_regressão
         )
 
 
@@ -147,6 +192,43 @@ def ler_dados_experimentais(diretório, nome_planilha):
     return SARA, T, solvente, ws_simplificados, yields_exp
 
 
+# Função
+def ler_configuração_padrão(diretório_do_txt):
+    """ Lê, do arquivo 'variáveis_entrada_código.txt', a configuração do modelo (parâmetros dos agregados,
+        correlações e discretização) usada quando ela não é informada (ex: pedidos do serviço de predição).
+
+    Inputs:
+        diretório_do_txt (string) : diretório do arquivo 'variáveis_entrada_código.txt'
+
+    Outputs:
+        Uma tupla contendo os seguintes elementos:
+            parâmetros_agregados (tuple)               : (MWavg, alfa, c_delta_agregados, Alinha_delta_agregados,
+                                                         d_delta_agregados)
+            correlações_componentes (tuple)            : correlações de S, A, R e dos agregados
+            variáveis_distribuição_massa_molar (tuple) : ver 'calcular_curva_solubilidade'
+    """
+
+    (n_agregados, MWmin, MWmax, alfa, MWavg, tipo_cálculo_MM_agregados, método_integração_FDP_Gamma,
+     correlação_densidade_saturados, correlação_delta_saturados,
+     correlação_densidade_aromáticos, correlação_delta_aromáticos,
+     correlação_densidade_resinas, correlação_delta_resinas,
+     correlação_densidade_agregados, correlação_delta_agregados,
+     Alinha_delta_agregados, c_delta_agregados, d_delta_agregados,
+     _, _, _, _, método_discretização_agregados, *_) = ler_variáveis_entrada_código(diretório_do_txt)
+
+    parâmetros_agregados = (MWavg, alfa, c_delta_agregados, Alinha_delta_agregados, d_delta_agregados)
+    correlações_componentes = (correlação_densidade_saturados, correlação_delta_saturados,
+                               correlação_densidade_aromáticos, correlação_delta_aromáticos,
+                               correlação_densidade_resinas, correlação_delta_resinas,
+                               correlação_densidade_agregados, correlação_delta_agregados)
+    if método_discretização_agregados == "adaptativo":
+        método_discretização_agregados = "uniforme"  # a busca adaptativa depende dos dados de cada sistema
+    variáveis_distribuição_massa_molar = (n_agregados, MWmin, MWmax, tipo_cálculo_MM_agregados,
+                                          método_integração_FDP_Gamma, método_discretização_agregados)
+
+    return parâmetros_agregados, correlações_componentes, variáveis_distribuição_massa_molar
+
+
 # ******************************************************************************************************************** #
 #  ATENÇÃO: O CÓDIGO A SEGUIR SERÁ EXECUTADO APENAS QUANDO ESTE MÓDULO FOR RODADO COMO SCRIPT PRINCIPAL.               #
 #           O CÓDIGO A SEGUIR SERVE PARA CONFERIR SE AS FUNÇÕES DESTE MÓDULO FUNCIONAM CORRETAMENTE.                   #
@@ -164,7 +246,10 @@ if __name__ == "__main__":
                          "correlação_densidade_resinas", "correlação_delta_resinas",
                          "correlação_densidade_agregados", "correlação_delta_agregados",
                          "Alinha_delta_agregados", "c_delta_agregados", "d_delta_agregados",
-                         "tipo_cálculo_programa", "tipo_regressão", "algoritmo_otimização", "nome_planilha"]
+                         "tipo_cálculo_programa", "tipo_regressão", "algoritmo_otimização", "nome_planilha",
+                         "método_discretização_agregados", "intervalos_confiança_parâmetros", "modo_regressão",
+                         "chute_inicial_automático", "planilhas_regressão_conjunta", "parâmetros_compartilhados",
+                         "tempo_máximo_regressão", "n_avaliações_máximo_regressão"]
     print("\n|---------------------------------------------------------------------------------------------------------"
           "---------------------------------------------------|")
     print("TESTE DA FUNCAO 'ler_variáveis_entrada_codigo'")
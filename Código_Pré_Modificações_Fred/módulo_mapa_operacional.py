@@ -0,0 +1,127 @@
+# Importação de bibliotecas do python
+import os
+import numpy as np
+
+# Importação de outros módulos deste projeto
+from módulo_curva_solubilidade import calcular_curvas_solubilidade_lote, gerar_distribuição_agregados_normalizada
+
+
+# Função
+def calcular_onsets(frações_solvente, yields, limiar_yield=1e-4):
+    """ Calcula a fração de solvente do início da precipitação (onset) em cada temperatura, por interpolação linear
+        entre os pontos da malha em que o yield cruza 'limiar_yield'.
+
+    Inputs:
+        frações_solvente (array) : frações mássicas de solvente da malha (crescentes)
+        yields (array)           : yields fracionais, dimensões (nº de temperaturas, nº de frações de solvente)
+        limiar_yield (float)     : yield fracional a partir do qual se considera haver precipitação
+
+    Outputs:
+        onsets (array) : frações de solvente do onset, uma por temperatura (NaN se não houver precipitação na malha;
+                         a primeira fração da malha se já houver precipitação nela)
+    """
+
+    onsets = np.full(yields.shape[0], np.nan)
+    for k, yields_temperatura in enumerate(yields):
+        acima = np.flatnonzero(yields_temperatura > limiar_yield)
+        if acima.size == 0:
+            continue
+        j = acima[0]
+        if j == 0:
+            onsets[k] = frações_solvente[0]
+        else:
+            y0, y1 = yields_temperatura[j - 1], yields_temperatura[j]
+            onsets[k] = frações_solvente[j - 1] + (limiar_yield - y0)/(y1 - y0)*(frações_solvente[j]
+                                                                                 - frações_solvente[j - 1])
+    return onsets
+
+
+# Função
+def gerar_mapa_yields(parâmetros_agregados, SARA, solvente, correlações_componentes,
+                      variáveis_distribuição_massa_molar, frações_solvente, temperaturas, diretório_mapa=None,
+                      limiar_yield=1e-4, escritor_resultados=None):
+    """ Gera o mapa de yields de asfaltenos sobre uma malha de frações de solvente x temperaturas para um petróleo.
+        As propriedades dependentes da temperatura (solvente, correlações de S, A e R e o termo A = 0.579 - 0.00075*T
+        dos agregados) são recalculadas em cada temperatura. A malha é calculada em duas passagens de ELL
+        vetorizado: as temperaturas de índice par com os chutes padrão e as de índice ímpar com os chutes iniciais
+        tomados das soluções nas temperaturas vizinhas.
+
+    Inputs:
+        parâmetros_agregados (tuple)               : (MWavg, alfa, c_delta_agregados, Alinha_delta_agregados,
+                                                     d_delta_agregados), ex: parâmetros regredidos
+        SARA (array)                               : composição SARA normalizada do petróleo
+        solvente (string)                          : nome do solvente ("n-heptano" ou "n-pentano")
+        correlações_componentes (tuple)            : ver 'calcular_curvas_solubilidade_lote'
+        variáveis_distribuição_massa_molar (tuple) : ver 'calcular_curva_solubilidade'
+        frações_solvente (array)                   : frações mássicas de solvente da malha (crescentes, em (0, 1))
+        temperaturas (array)                       : temperaturas da malha (K)
+        diretório_mapa (string)                    : arquivo .npz onde o mapa é salvo (opcional)
+        limiar_yield (float)                       : yield fracional que define o onset, ver 'calcular_onsets'
+        escritor_resultados (object)               : 'EscritorResultadosELL' que recebe os resultados de ELL de
+                                                     cada ponto à medida que cada passagem é calculada, com o
+                                                     índice da temperatura como configuração (opcional)
+
+    Outputs:
+        Uma tupla contendo os seguintes elementos:
+            yields (array) : yields fracionais, dimensões (nº de temperaturas, nº de frações de solvente)
+            betas (array)  : betas de Rachford-Rice, mesmas dimensões
+            onsets (array) : frações de solvente do onset, uma por temperatura
+            n_it (array)   : nº de iterações do cálculo de ELL, mesmas dimensões de 'yields'
+
+    Observações:
+        Um ponto só recebe o chute das temperaturas vizinhas se lá houver duas fases (yield > 'limiar_yield'); caso
+        contrário, usa o chute padrão (fase pesada pura em asfaltenos), para não conduzir o cálculo à solução trivial.
+        O arquivo salvo (np.savez_compressed) contém 'frações_solvente', 'temperaturas', 'yields' e 'betas' (float32),
+        'onsets', 'parâmetros_agregados' e 'SARA'.
+    """
+
+    frações_solvente = np.asarray(frações_solvente, dtype=float)
+    temperaturas = np.asarray(temperaturas, dtype=float)
+    SARA = np.asarray(SARA, dtype=float)
+    ws_simplificados = np.column_stack((frações_solvente, 1 - frações_solvente))
+    n_temperaturas, n_frações = temperaturas.shape[0], frações_solvente.shape[0]
+
+    # Distribuição de massa molar (independe da temperatura): calculada uma única vez
+    distribuição_agregados = gerar_distribuição_agregados_normalizada(parâmetros_agregados,
+                                                                      variáveis_distribuição_massa_molar)
+
+    # 1ª passagem: temperaturas de índice par, todas em um único cálculo vetorizado com os chutes padrão
+    # 2ª passagem: temperaturas de índice ímpar, em um único cálculo vetorizado com os chutes tomados das soluções
+    #              bifásicas das temperaturas vizinhas (média das duas, quando ambas são bifásicas)
+    yields = np.zeros((n_temperaturas, n_frações))
+    betas = np.zeros((n_temperaturas, n_frações))
+    n_it = np.zeros((n_temperaturas, n_frações), dtype=int)
+    xsL = np.full((n_temperaturas, n_frações, 4 + distribuição_agregados[0].shape[0]), np.nan)
+    xsH = np.full(xsL.shape, np.nan)
+    for índices in (np.arange(0, n_temperaturas, 2), np.arange(1, n_temperaturas, 2)):
+        if índices.size == 0:
+            continue
+        chutes_iniciais = None
+        if índices[0] == 1:
+            vizinhos = np.stack((índices - 1, np.minimum(índices + 1, 2*((n_temperaturas - 1)//2))))
+            bifásicos = (yields[vizinhos] > limiar_yield)[..., np.newaxis]
+            with np.errstate(invalid="ignore"):
+                chutes_iniciais = tuple(
+                    np.where(bifásicos, xs[vizinhos], 0).sum(axis=0)/bifásicos.sum(axis=0) for xs in (xsL, xsH))
+        (yields[índices], betas[índices], xsL[índices], xsH[índices], n_it[índices]) = \
+            calcular_curvas_solubilidade_lote(
+                parâmetros_agregados, (temperaturas[índices], np.tile(SARA, (índices.size, 1)), ws_simplificados),
+                solvente, correlações_componentes, variáveis_distribuição_massa_molar, distribuição_agregados,
+                chutes_iniciais)
+        if escritor_resultados is not None:
+            n_pontos_passagem = índices.size*n_frações
+            escritor_resultados.escrever(
+                np.repeat(índices, n_frações), np.repeat(temperaturas[índices], n_frações),
+                np.tile(frações_solvente, índices.size), betas[índices], yields[índices],
+                xsL[índices].reshape(n_pontos_passagem, -1), xsH[índices].reshape(n_pontos_passagem, -1), n_it[índices])
+
+    onsets = calcular_onsets(frações_solvente, yields, limiar_yield)
+
+    # Arquivo compacto com o mapa
+    if diretório_mapa is not None:
+        os.makedirs(os.path.dirname(diretório_mapa) or ".", exist_ok=True)
+        np.savez_compressed(diretório_mapa, frações_solvente=frações_solvente, temperaturas=temperaturas,
+                            yields=yields.astype(np.float32), betas=betas.astype(np.float32), onsets=onsets,
+                            parâmetros_agregados=np.asarray(parâmetros_agregados, dtype=float), SARA=SARA)
+
+    return yields, betas, onsets, n_it
@@ -0,0 +1,286 @@
+# Importação de bibliotecas do python
+import uuid
+from collections import namedtuple
+from multiprocessing import shared_memory
+import numpy as np
+
+# Referência (picklável) a um array publicado em memória compartilhada: é o que é enviado aos processos de trabalho
+# no lugar do array ('registro' identifica o 'RegistroMemóriaCompartilhada' que o publicou)
+ArrayCompartilhado = namedtuple("ArrayCompartilhado", ["nome_bloco", "forma", "tipo", "registro"])
+
+# Blocos de memória compartilhada abertos neste processo, por registro (identificador do registro -> {nome ->
+# SharedMemory}); apenas os blocos do último registro recebido são mantidos abertos (ver 'abrir_array_compartilhado')
+_blocos_abertos = {}
+
+
+# Função
+def abrir_bloco_processo_trabalho(nome_bloco=None, tamanho=0):
+    """ Abre (ou, sem 'nome_bloco', cria) um bloco de memória compartilhada em um processo de trabalho, sem que o
+        bloco seja removido quando o processo terminar (a remoção é responsabilidade do
+        'RegistroMemóriaCompartilhada' do processo principal).
+
+    Inputs:
+        nome_bloco (string) : nome do bloco existente (None para criar um novo)
+        tamanho (int)       : tamanho do bloco a ser criado (bytes)
+
+    Outputs:
+        bloco (SharedMemory) : bloco aberto
+
+    Observações:
+        A partir do Python 3.13, o bloco é aberto sem registro no 'resource_tracker'. Nas versões anteriores, o
+        registro não pode ser desfeito aqui: os processos de trabalho usam o 'resource_tracker' do processo
+        principal (em que o bloco já está registrado), e desfazê-lo apagaria o registro do processo principal.
+    """
+
+    try:  # Python >= 3.13
+        return shared_memory.SharedMemory(name=nome_bloco, create=nome_bloco is None, size=tamanho, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=nome_bloco, create=nome_bloco is None, size=tamanho)
+
+
+# Função
+def copiar_para_bloco(array, bloco, identificador_registro):
+    """ Copia um array para o início de um bloco de memória compartilhada e retorna a sua referência. """
+
+    np.ndarray(array.shape, dtype=array.dtype, buffer=bloco.buf)[...] = array
+    return ArrayCompartilhado(bloco.name, array.shape, array.dtype.str, identificador_registro)
+
+
+# Classe
+class RegistroMemóriaCompartilhada:
+    """ Registro, no processo principal, dos arrays publicados em memória compartilhada durante um trabalho paralelo
+        (ex: os dados experimentais e as propriedades dos componentes enviados a cada avaliação da função objetivo).
+        Cada array é copiado uma única vez para um bloco de memória compartilhada, e as tarefas passam a levar
+        apenas a sua referência ('ArrayCompartilhado'); nos processos de trabalho, 'restaurar_compartilhados' troca
+        as referências por vistas somente-leitura dos blocos, sem cópia.
+
+    Exemplo de uso:
+        with RegistroMemóriaCompartilhada() as registro:
+            argumentos_compartilhados = registro.compartilhar(argumentos_otimização)
+            resultados = list(executor.map(função_trabalho, [(x, argumentos_compartilhados) for x in pontos]))
+        # e, em 'função_trabalho': argumentos_otimização = restaurar_compartilhados(argumentos_compartilhados)
+
+    Observações:
+        Os arrays publicados são guardados pelo identificador do objeto: publicar de novo o mesmo array (ex: os
+        mesmos *args a cada cálculo de gradiente) retorna a referência já existente, de modo que os arrays não devem
+        ser modificados enquanto o registro estiver aberto. Arrays menores que 'tamanho_mínimo' (bytes) e de tipo
+        'object' não são publicados (são enviados normalmente). Os blocos são removidos em 'fechar'; nos processos
+        de trabalho, os mapeamentos dos blocos de um registro são fechados quando chega a primeira tarefa de outro
+        registro (ver 'abrir_array_compartilhado'), de modo que conjuntos de processos de longa duração (ex:
+        'FilaRegressões' e o serviço de predição) não acumulam os blocos dos trabalhos já encerrados. Os blocos
+        criados pelos processos de trabalho ('publicar_resultado_processo') passam a ser do registro quando
+        adotados ('adotar') e são removidos junto com os demais.
+    """
+
+    def __init__(self, tamanho_mínimo=0):
+        """
+        Inputs:
+            tamanho_mínimo (int) : tamanho mínimo (bytes) de um array para que seja publicado (padrão: todos)
+        """
+
+        self.tamanho_mínimo = tamanho_mínimo
+        self.identificador = uuid.uuid4().hex
+        self._blocos = {}
+        self._publicados = {}
+
+    def publicar(self, array):
+        """ Publica um array (uma única vez) e retorna a sua referência.
+
+        Inputs:
+            array (array) : array numérico a ser publicado
+
+        Outputs:
+            referência (ArrayCompartilhado) : referência do array publicado
+        """
+
+        if id(array) in self._publicados:
+            return self._publicados[id(array)][1]
+        contíguo = np.ascontiguousarray(array)
+        bloco = shared_memory.SharedMemory(create=True, size=max(contíguo.nbytes, 1))
+        self._blocos[bloco.name] = bloco
+        referência = copiar_para_bloco(contíguo, bloco, self.identificador)
+        self._publicados[id(array)] = (array, referência)  # o array é guardado para que o seu 'id' não seja reusado
+
+        return referência
+
+    def adotar(self, referência):
+        """ Assume a remoção do bloco de um array publicado por um processo de trabalho (ver
+            'publicar_resultado_processo') e retorna uma vista somente-leitura desse array neste processo.
+
+        Inputs:
+            referência (ArrayCompartilhado) : referência retornada pelo processo de trabalho
+
+        Outputs:
+            array (array) : vista somente-leitura do array
+        """
+
+        if referência.nome_bloco not in self._blocos:
+            self._blocos[referência.nome_bloco] = shared_memory.SharedMemory(name=referência.nome_bloco)
+        array = np.ndarray(referência.forma, dtype=np.dtype(referência.tipo),
+                           buffer=self._blocos[referência.nome_bloco].buf)
+        array.flags.writeable = False
+
+        return array
+
+    def compartilhar(self, objeto):
+        """ Troca os arrays de uma estrutura de tuplas, listas e dicionários (ex: os *args da função 'F_obj') pelas
+            suas referências em memória compartilhada.
+
+        Inputs:
+            objeto (object) : estrutura a ser enviada aos processos de trabalho
+
+        Outputs:
+            objeto_compartilhado (object) : mesma estrutura, com os arrays publicados trocados pelas referências
+        """
+
+        if isinstance(objeto, np.ndarray):
+            if objeto.dtype.hasobject or objeto.nbytes < self.tamanho_mínimo:
+                return objeto
+            return self.publicar(objeto)
+        if isinstance(objeto, ArrayCompartilhado):
+            return objeto
+        if isinstance(objeto, (tuple, list)):
+            return type(objeto)(self.compartilhar(elemento) for elemento in objeto)
+        if isinstance(objeto, dict):
+            return {chave: self.compartilhar(valor) for chave, valor in objeto.items()}
+        return objeto
+
+    def fechar(self):
+        """ Fecha e remove todos os blocos do registro (e os mapeamentos abertos deles neste processo). """
+
+        self._publicados.clear()
+        liberar_blocos_abertos(self.identificador)
+        for bloco in self._blocos.values():
+            try:
+                bloco.close()
+            except BufferError:  # ainda há vistas do bloco neste processo; a memória é liberada quando forem coletadas
+                pass
+            try:
+                bloco.unlink()
+            except FileNotFoundError:
+                pass
+        self._blocos.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo_exceção, exceção, rastreamento):
+        self.fechar()
+
+
+# Função
+def abrir_array_compartilhado(referência):
+    """ Retorna uma vista somente-leitura de um array publicado em memória compartilhada (usada nos processos de
+        trabalho). O bloco é aberto uma única vez por processo.
+
+    Inputs:
+        referência (ArrayCompartilhado) : referência do array
+
+    Outputs:
+        array (array) : vista somente-leitura do array, sem cópia
+
+    Observações:
+        Ao receber a primeira referência de um novo registro, os blocos dos demais registros são fechados neste
+        processo: um processo de trabalho executa uma tarefa por vez, e os registros anteriores pertencem, em geral,
+        a trabalhos já encerrados (cujos blocos já foram removidos pelo processo principal, mas continuariam
+        ocupando memória enquanto mapeados). Trabalhos simultâneos no mesmo conjunto de processos continuam
+        corretos, apenas reabrindo os seus blocos ao se alternarem.
+    """
+
+    blocos_registro = obter_blocos_registro(referência.registro)
+    if referência.nome_bloco not in blocos_registro:
+        blocos_registro[referência.nome_bloco] = abrir_bloco_processo_trabalho(referência.nome_bloco)
+    array = np.ndarray(referência.forma, dtype=np.dtype(referência.tipo),
+                       buffer=blocos_registro[referência.nome_bloco].buf)
+    array.flags.writeable = False
+
+    return array
+
+
+# Função
+def obter_blocos_registro(identificador_registro):
+    """ Retorna os blocos de um registro abertos neste processo (nome -> SharedMemory), fechando antes os blocos dos
+        demais registros se este for um registro novo (ver 'abrir_array_compartilhado').
+
+    Inputs:
+        identificador_registro (string) : identificador do 'RegistroMemóriaCompartilhada'
+
+    Outputs:
+        blocos_registro (dict) : blocos do registro abertos neste processo
+    """
+
+    if identificador_registro not in _blocos_abertos:
+        for identificador in list(_blocos_abertos):
+            liberar_blocos_abertos(identificador)
+        _blocos_abertos[identificador_registro] = {}
+
+    return _blocos_abertos[identificador_registro]
+
+
+# Função
+def restaurar_compartilhados(objeto):
+    """ Troca as referências 'ArrayCompartilhado' de uma estrutura de tuplas, listas e dicionários pelas vistas
+        somente-leitura dos arrays (operação inversa de 'RegistroMemóriaCompartilhada.compartilhar').
+
+    Inputs:
+        objeto (object) : estrutura recebida pelo processo de trabalho
+
+    Outputs:
+        objeto_restaurado (object) : mesma estrutura, com arrays no lugar das referências
+    """
+
+    if isinstance(objeto, ArrayCompartilhado):
+        return abrir_array_compartilhado(objeto)
+    if isinstance(objeto, (tuple, list)):
+        return type(objeto)(restaurar_compartilhados(elemento) for elemento in objeto)
+    if isinstance(objeto, dict):
+        return {chave: restaurar_compartilhados(valor) for chave, valor in objeto.items()}
+    return objeto
+
+
+# Função
+def publicar_resultado_processo(array, identificador_registro):
+    """ Publica, a partir de um processo de trabalho, um resultado reutilizável (ex: as soluções de ELL de uma
+        regressão, usadas como chutes iniciais pelas regressões seguintes) em um novo bloco de memória compartilhada.
+        A referência retornada deve ser enviada ao processo principal, que a adota
+        ('RegistroMemóriaCompartilhada.adotar') para que o bloco seja removido ao fim do trabalho, e pode ser
+        repassada aos demais processos de trabalho.
+
+    Inputs:
+        array (array)                   : array numérico a ser publicado
+        identificador_registro (string) : identificador do 'RegistroMemóriaCompartilhada' do trabalho (o bloco é
+                                          mapeado neste processo junto com os blocos desse registro, ver
+                                          'abrir_array_compartilhado')
+
+    Outputs:
+        referência (ArrayCompartilhado) : referência do array publicado
+    """
+
+    contíguo = np.ascontiguousarray(array)
+    bloco = abrir_bloco_processo_trabalho(tamanho=max(contíguo.nbytes, 1))
+    obter_blocos_registro(identificador_registro)[bloco.name] = bloco
+
+    return copiar_para_bloco(contíguo, bloco, identificador_registro)
+
+
+# Função
+def liberar_blocos_abertos(identificador_registro):
+    """ Fecha, neste processo, os mapeamentos dos blocos de um registro abertos por 'abrir_array_compartilhado'.
+
+    Inputs:
+        identificador_registro (string) : identificador do 'RegistroMemóriaCompartilhada'
+
+    Observações:
+        Blocos com vistas ainda em uso neste processo não podem ser fechados e permanecem registrados, para nova
+        tentativa na próxima liberação.
+    """
+
+    blocos_registro = _blocos_abertos.pop(identificador_registro, {})
+    blocos_em_uso = {}
+    for nome_bloco, bloco in blocos_registro.items():
+        try:
+            bloco.close()
+        except BufferError:
+            blocos_em_uso[nome_bloco] = bloco
+    if blocos_em_uso:
+        _blocos_abertos[identificador_registro] = blocos_em_uso
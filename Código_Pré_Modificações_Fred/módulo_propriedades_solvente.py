@@ -1,3 +1,8 @@
+# Solventes com propriedades implementadas em 'calcular_propriedades_solvente' (outros nomes recebem, sem aviso, as
+# propriedades do n-heptano; as entradas externas devem ser validadas com esta lista)
+SOLVENTES_DISPONÍVEIS = ("n-heptano", "n-pentano")
+
+
 # Função 
 def calcular_propriedades_solvente(T, solvente):
     """ Calcula as propriedades do solvente na temperatura de interesse.
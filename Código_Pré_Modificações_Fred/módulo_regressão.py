@@ -0,0 +1,441 @@
+# Importação de bibliotecas do python
+import time
+import numpy as np
+import scipy as scp
+
+# Importação de outros módulos deste projeto
+from módulo_leitura_dados import ler_variáveis_entrada_código, ler_dados_experimentais
+from módulo_composições import normalizar_composição
+from módulo_equilíbrio_líquido_líquido import contagem_cálculos_ELL
+from módulo_curva_solubilidade import calcular_curva_solubilidade, calcular_propriedades_solvente_SAR, \
+    determinar_n_agregados_mínimo
+
+
+# Função
+def obter_número_parâmetros(tipo_regressão):
+    """ Retorna o nº de parâmetros estimados em cada tipo de regressão.
+
+    Inputs:
+        tipo_regressão (int) : define quais parâmetros serão regredidos
+                               (1) MWavg
+                               (2) MWavg, alfa
+                               (3) MWavg, alfa, c_delta_agregados
+                               (4) MWavg, alfa, c_delta_agregados, Alinha_delta_agregados
+                               (5) MWavg, alfa, c_delta_agregados, Alinha_delta_agregados, d_delta_agregados
+
+    Outputs:
+        n_parâmetros (int) : nº de parâmetros estimados
+
+    Observações:
+        Em caso de erro, usa-se tipo_regressão == 3 como padrão
+    """
+
+    match tipo_regressão:
+        case 1 | 2 | 3 | 4 | 5: n_parâmetros = tipo_regressão
+        case _: n_parâmetros = 3
+
+    return n_parâmetros
+
+
+# Função
+def desempacotar_parâmetros(parâmetros, tipo_regressão, parâmetros_agregados):
+    """ Substitui, nos parâmetros dos agregados, os valores dos parâmetros estimados.
+
+    Inputs:
+        parâmetros (array)           : valores dos parâmetros estimados (ordem: MWavg, alfa, c_delta_agregados,
+                                       Alinha_delta_agregados, d_delta_agregados)
+        tipo_regressão (int)         : define quais parâmetros serão regredidos
+        parâmetros_agregados (tuple) : (MWavg, alfa, c_delta_agregados, Alinha_delta_agregados, d_delta_agregados)
+                                       lidos no arquivo 'variáveis_entrada_código.txt'; os que não são estimados
+                                       mantêm estes valores
+
+    Outputs:
+        parâmetros_agregados_atualizados (tuple) : (MWavg, alfa, c_delta_agregados, Alinha_delta_agregados,
+                                                   d_delta_agregados)
+    """
+
+    n_parâmetros = obter_número_parâmetros(tipo_regressão)
+    parâmetros_agregados_atualizados = (tuple(np.ravel(parâmetros)[0:n_parâmetros])
+                                        + tuple(parâmetros_agregados[n_parâmetros:]))
+
+    return parâmetros_agregados_atualizados
+
+
+# Função
+def montar_chute_inicial(tipo_regressão, parâmetros_agregados):
+    """ Monta o array de chutes iniciais dos parâmetros a serem estimados.
+
+    Inputs:
+        tipo_regressão (int)         : define quais parâmetros serão regredidos
+        parâmetros_agregados (tuple) : (MWavg, alfa, c_delta_agregados, Alinha_delta_agregados, d_delta_agregados)
+
+    Outputs:
+        chute_inicial (array) : chutes iniciais dos parâmetros a serem estimados
+    """
+
+    n_parâmetros = obter_número_parâmetros(tipo_regressão)
+    chute_inicial = np.array(parâmetros_agregados[0:n_parâmetros], dtype=float)
+
+    return chute_inicial
+
+
+# Função
+def obter_limites_parâmetros(tipo_regressão, MWmin):
+    """ Retorna os limites nos valores dos parâmetros a serem estimados.
+
+    Inputs:
+        tipo_regressão (int) : define quais parâmetros serão regredidos
+        MWmin (float)        : massa molar do monômero (g/mol)
+
+    Outputs:
+        limites_parâmetros (list) : lista de tuplas (mínimo, máximo), uma por parâmetro estimado
+
+    Observações:
+        Limites de Alinha_delta_agregados, c_delta_agregados e d_delta_agregados com base nas pg. 85-87 da tese de
+        Diana Maria Barrera (2012)
+    """
+
+    # MWavg, alfa, c_delta_agregados, Alinha_delta_agregados, d_delta_agregados
+    limites_todos_parâmetros = [(1.2 * MWmin, 1e4), (1.15, 60), (0.634, 0.672), (0, 0.03), (0.0494, 0.0496)]
+    limites_parâmetros = limites_todos_parâmetros[0:obter_número_parâmetros(tipo_regressão)]
+
+    return limites_parâmetros
+
+
+# Função
+def calcular_resíduos_yields(parâmetros, *args):
+    """ Resíduos da regressão: diferenças entre os yields calculados e experimentais em cada ponto experimental.
+
+    Inputs:
+        parâmetros (array) : valores dos parâmetros a serem estimados
+        args (tuple)       : (dados_experimentais, propriedades_componentes, variáveis_distribuição_massa_molar,
+                              configuração_regressão[, tolerância_ELL[, n_it_máx_ELL]]), ver 'F_obj'
+
+    Outputs:
+        resíduos (array) : yields calculados menos yields experimentais (fracionais), um por ponto experimental
+    """
+
+    # Desempacotando os *args
+    dados_experimentais, propriedades_componentes, variáveis_distribuição_massa_molar, configuração_regressão = \
+        args[0:4]
+    tolerância_ELL = args[4] if len(args) > 4 else 1e-12
+    n_it_máx_ELL = args[5] if len(args) > 5 else 150
+    T, SARA, ws_simplificados, yields_exp = dados_experimentais
+    tipo_regressão, parâmetros_agregados, correlações_agregados = configuração_regressão
+
+    # Desempacotando os parâmetros a serem estimados
+    # Obs: os parâmetros não estimados mantêm os valores lidos no arquivo 'variáveis_entrada_código.txt'
+    parâmetros_agregados = desempacotar_parâmetros(parâmetros, tipo_regressão, parâmetros_agregados)
+
+    # Cálculo de equilíbrio líquido-líquido e dos yields de cada ponto experimental
+    yields_calc = calcular_curva_solubilidade(parâmetros_agregados, (T, SARA, ws_simplificados),
+                                              propriedades_componentes, variáveis_distribuição_massa_molar,
+                                              correlações_agregados, tolerância_ELL, n_it_máx_ELL)[0]
+
+    return yields_calc - yields_exp
+
+
+# Função
+def F_obj(parâmetros, *args):
+    """ Função objetivo da regressão: média dos desvios absolutos entre os yields calculados e experimentais.
+
+    Inputs:
+        parâmetros (array) : valores dos parâmetros a serem estimados
+        args (tuple)       : (dados_experimentais, propriedades_componentes, variáveis_distribuição_massa_molar,
+                              configuração_regressão), com
+                              dados_experimentais = (T, SARA, ws_simplificados, yields_exp),
+                              propriedades_componentes = (MMs, rhos, deltas, Vs),
+                              variáveis_distribuição_massa_molar: ver 'calcular_curva_solubilidade',
+                              configuração_regressão = (tipo_regressão, parâmetros_agregados, correlações_agregados),
+                              seguidos opcionalmente da tolerância (padrão: 1e-12) e do nº máximo de iterações
+                              (padrão: 150) do cálculo de ELL
+
+    Outputs:
+        DMA (float) : média dos desvios absolutos fracionais nos yields
+    """
+
+    # Expressão matemática a ser minimizada
+    # Obs: diferenças entre os yields calculados e experimentais
+    yields_diferenças = np.abs(calcular_resíduos_yields(parâmetros, *args))
+    n_dados_exp = yields_diferenças.shape[0]
+
+    return (1/n_dados_exp)*yields_diferenças.sum()
+
+
+# Função
+def otimizar_nelder_mead(função_objetivo, chute_inicial, argumentos_otimização, limites_parâmetros, gradiente,
+                         opções, ao_iterar):
+    """ Nelder-Mead sem limites (os limites e o gradiente são ignorados). Os argumentos de todas as funções
+        'otimizar_*' são os de 'regredir_parâmetros'. """
+
+    return scp.optimize.minimize(função_objetivo, chute_inicial, method="Nelder-Mead", args=argumentos_otimização,
+                                 options=opções, callback=ao_iterar)
+
+
+# Função
+def otimizar_l_bfgs_b(função_objetivo, chute_inicial, argumentos_otimização, limites_parâmetros, gradiente, opções,
+                      ao_iterar):
+    """ L-BFGS-B com limites e, opcionalmente, o gradiente fornecido. """
+
+    return scp.optimize.minimize(função_objetivo, chute_inicial, method="L-BFGS-B", bounds=limites_parâmetros,
+                                 jac=gradiente, args=argumentos_otimização, options=opções, callback=ao_iterar)
+
+
+# Função
+def otimizar_powell(função_objetivo, chute_inicial, argumentos_otimização, limites_parâmetros, gradiente, opções,
+                    ao_iterar):
+    """ Powell com limites (o gradiente é ignorado). """
+
+    return scp.optimize.minimize(função_objetivo, chute_inicial, method="Powell", bounds=limites_parâmetros,
+                                 args=argumentos_otimização, options=opções, callback=ao_iterar)
+
+
+# Função
+def otimizar_brent(função_objetivo, chute_inicial, argumentos_otimização, limites_parâmetros, gradiente, opções,
+                   ao_iterar):
+    """ Método de Brent limitado ('scipy.optimize.minimize_scalar'), apenas para regressões de um único parâmetro
+        (ex: tipo_regressão 1). O chute inicial e o gradiente são ignorados (a busca é feita em todo o intervalo
+        dos limites) e 'ao_iterar' é chamada após cada avaliação. O 'x' do resultado é um array de 1 elemento. """
+
+    if np.size(chute_inicial) != 1:
+        raise ValueError(f"O metodo de Brent estima um unico parametro ({np.size(chute_inicial)} fornecidos).")
+
+    def função_escalar(parâmetro, *args):
+        parâmetros = np.array([parâmetro], dtype=float)
+        DMA = função_objetivo(parâmetros, *args)
+        if ao_iterar is not None:
+            ao_iterar(parâmetros)
+        return DMA
+
+    sol = scp.optimize.minimize_scalar(função_escalar, bounds=tuple(limites_parâmetros[0]), method="bounded",
+                                       args=argumentos_otimização, options=opções)
+    sol.x = np.atleast_1d(sol.x)
+    return sol
+
+
+# Função
+def otimizar_cobyqa(função_objetivo, chute_inicial, argumentos_otimização, limites_parâmetros, gradiente, opções,
+                    ao_iterar):
+    """ COBYQA (otimização sem derivadas por modelos quadráticos em região de confiança) com limites; o chute
+        inicial é trazido para dentro dos limites, que o COBYQA respeita em todas as avaliações. As variáveis são
+        escaladas pelos limites ('scale'), dado que os parâmetros têm ordens de grandeza muito diferentes, e o raio
+        inicial da região de confiança é de 10% do intervalo de cada parâmetro (com todo o intervalo, as primeiras
+        avaliações chegam a distribuições de massa molar degeneradas). """
+
+    limites = np.array(limites_parâmetros, dtype=float)
+    chute_inicial = np.clip(np.asarray(chute_inicial, dtype=float), limites[:, 0], limites[:, 1])
+    opções = {"scale": True, "initial_tr_radius": 0.1, **(opções or {})}
+    return scp.optimize.minimize(função_objetivo, chute_inicial, method="COBYQA", bounds=limites_parâmetros,
+                                 args=argumentos_otimização, options=opções, callback=ao_iterar)
+
+
+# Algoritmos de otimização disponíveis em 'regredir_parâmetros': código de 'algoritmo_otimização' -> (nome, função
+# com a assinatura das funções 'otimizar_*'); (2) Brute-force ainda falta ser implementado
+ALGORITMOS_OTIMIZAÇÃO = {1: ("Nelder-Mead", otimizar_nelder_mead), 3: ("L-BFGS-B", otimizar_l_bfgs_b),
+                         4: ("Powell", otimizar_powell), 5: ("Brent", otimizar_brent), 6: ("COBYQA", otimizar_cobyqa)}
+
+
+# Função
+def registrar_algoritmo_otimização(código, nome, função):
+    """ Registra (ou substitui) um algoritmo de otimização usado por 'regredir_parâmetros'.
+
+    Inputs:
+        código (int)      : código do algoritmo em 'algoritmo_otimização'
+        nome (string)     : nome do algoritmo
+        função (function) : função função(função_objetivo, chute_inicial, argumentos_otimização, limites_parâmetros,
+                            gradiente, opções, ao_iterar) que retorna um OptimizeResult com ao menos 'x' e 'fun',
+                            ver 'otimizar_nelder_mead'
+    """
+
+    ALGORITMOS_OTIMIZAÇÃO[código] = (nome, função)
+
+
+# Função
+def regredir_parâmetros(chute_inicial, argumentos_otimização, algoritmo_otimização, limites_parâmetros,
+                        função_objetivo=F_obj, gradiente=None, opções=None, ao_iterar=None):
+    """ Minimiza a função objetivo 'F_obj' com o algoritmo escolhido.
+
+    Inputs:
+        chute_inicial (array)         : chutes iniciais dos parâmetros a serem estimados
+        argumentos_otimização (tuple) : *args da função 'F_obj'
+        algoritmo_otimização (int)    : (1) Nelder-Mead, (2) Brute-force, (3) L-BFGS-B, (4) Powell, (5) Brent (apenas
+                                        um parâmetro), (6) COBYQA, ou outro código de 'ALGORITMOS_OTIMIZAÇÃO'
+        limites_parâmetros (list)     : limites dos parâmetros (utilizados pelas opções 3 a 6)
+        função_objetivo (function)    : função a ser minimizada (padrão: 'F_obj'; ver 'monitorar_função_objetivo')
+        gradiente (function)          : gradiente da função objetivo usado pela opção 3 (padrão: diferenças finitas
+                                        seriais do scipy; ver 'criar_gradiente_paralelo')
+        opções (dict)                 : opções do algoritmo passadas ao 'scipy.optimize.minimize' (ex:
+                                        'initial_simplex' do Nelder-Mead ou 'direc' do Powell)
+        ao_iterar (function)          : função opcional chamada ao final de cada iteração do algoritmo como
+                                        ao_iterar(parâmetros) ('callback' do 'scipy.optimize.minimize')
+
+    Outputs:
+        sol (OptimizeResult) : resultado da otimização, acrescido da contabilização do custo: 'algoritmo' (nome),
+                               'n_avaliações' (avaliações da função objetivo, incluindo as do 'gradiente'),
+                               'n_cálculos_ELL' (sistemas de ELL calculados) e 'tempo' (s)
+
+    Observações:
+        As avaliações feitas por um 'gradiente' paralelo (ver 'criar_gradiente_paralelo') ocorrem nos processos de
+        trabalho: elas entram em 'n_avaliações' e os seus cálculos de ELL (não contabilizados neste processo) são
+        estimados pela média de cálculos de ELL por avaliação do processo principal.
+    """
+
+    if algoritmo_otimização not in ALGORITMOS_OTIMIZAÇÃO:  # Caso Erro (ou Brute-force, ainda não implementado)
+        print("Problema na escolha da variável algoritmo_otimização.")
+        return 0
+    nome_algoritmo, otimizar = ALGORITMOS_OTIMIZAÇÃO[algoritmo_otimização]
+
+    n_avaliações = [0]
+
+    def função_contabilizada(parâmetros, *args):
+        n_avaliações[0] += 1
+        return função_objetivo(parâmetros, *args)
+
+    estado_gradiente = getattr(gradiente, "estado", {"n_avaliações": 0, "paralelo": False})
+    n_avaliações_gradiente_início = estado_gradiente["n_avaliações"]
+    n_cálculos_ELL_início = contagem_cálculos_ELL["n"]
+    instante_início = time.monotonic()
+
+    sol = otimizar(função_contabilizada, chute_inicial, argumentos_otimização, limites_parâmetros, gradiente, opções,
+                   ao_iterar)
+
+    n_avaliações_gradiente = estado_gradiente["n_avaliações"] - n_avaliações_gradiente_início
+    n_cálculos_ELL = contagem_cálculos_ELL["n"] - n_cálculos_ELL_início
+    if estado_gradiente["paralelo"] and n_avaliações[0] > 0:
+        n_cálculos_ELL += round(n_avaliações_gradiente*n_cálculos_ELL/n_avaliações[0])
+    sol.algoritmo = nome_algoritmo
+    sol.n_avaliações = n_avaliações[0] + n_avaliações_gradiente
+    sol.n_cálculos_ELL = n_cálculos_ELL
+    sol.tempo = time.monotonic() - instante_início
+
+    return sol
+
+
+# Função
+def comparar_algoritmos_otimização(chute_inicial, argumentos_otimização, limites_parâmetros, algoritmos=None,
+                                   gradiente=None):
+    """ Executa a mesma regressão com vários algoritmos de otimização e compara o resultado e o custo de cada um.
+
+    Inputs:
+        chute_inicial (array)         : chutes iniciais dos parâmetros a serem estimados
+        argumentos_otimização (tuple) : *args da função 'F_obj'
+        limites_parâmetros (list)     : limites dos parâmetros
+        algoritmos (list)             : códigos dos algoritmos (padrão: todos os de 'ALGORITMOS_OTIMIZAÇÃO'; o de
+                                        Brent é omitido com mais de um parâmetro)
+        gradiente (function)          : gradiente usado pelo L-BFGS-B, ver 'regredir_parâmetros'
+
+    Outputs:
+        comparação (list) : um dicionário por algoritmo, com as chaves 'algoritmo', 'DMA', 'parâmetros',
+                            'n_avaliações', 'n_cálculos_ELL' e 'tempo' (s)
+    """
+
+    if algoritmos is None:
+        algoritmos = [código for código, (_, função) in ALGORITMOS_OTIMIZAÇÃO.items()
+                      if função is not otimizar_brent or np.size(chute_inicial) == 1]
+
+    comparação = []
+    for código in algoritmos:
+        sol = regredir_parâmetros(chute_inicial, argumentos_otimização, código, limites_parâmetros,
+                                  gradiente=gradiente if código == 3 else None)
+        comparação.append({"algoritmo": sol.algoritmo, "DMA": sol.fun, "parâmetros": np.asarray(sol.x),
+                           "n_avaliações": sol.n_avaliações, "n_cálculos_ELL": sol.n_cálculos_ELL,
+                           "tempo": sol.tempo})
+
+    return comparação
+
+
+# Função
+def monitorar_função_objetivo(função_objetivo=F_obj, ao_avaliar=None):
+    """ Envolve a função objetivo, contabilizando as avaliações e guardando o melhor ponto já avaliado.
+
+    Inputs:
+        função_objetivo (function) : função objetivo a ser monitorada (padrão: 'F_obj')
+        ao_avaliar (function)      : função opcional chamada após cada avaliação como
+                                     ao_avaliar(parâmetros, DMA, histórico); pode levantar uma exceção para
+                                     interromper a otimização
+
+    Outputs:
+        Uma tupla contendo os seguintes elementos:
+            função_monitorada (function) : função com a mesma assinatura de 'função_objetivo'
+            histórico (dict)             : dicionário atualizado a cada avaliação, com as chaves 'n_avaliações',
+                                           'melhor_DMA' e 'melhores_parâmetros'
+    """
+
+    histórico = {"n_avaliações": 0, "melhor_DMA": np.inf, "melhores_parâmetros": None}
+
+    def função_monitorada(parâmetros, *args):
+        DMA = função_objetivo(parâmetros, *args)
+        histórico["n_avaliações"] += 1
+        if DMA < histórico["melhor_DMA"]:
+            histórico["melhor_DMA"] = DMA
+            histórico["melhores_parâmetros"] = np.array(parâmetros, dtype=float, copy=True)
+        if ao_avaliar is not None:
+            ao_avaliar(parâmetros, DMA, histórico)
+        return DMA
+
+    return função_monitorada, histórico
+
+
+# Função
+def montar_regressão_a_partir_dos_arquivos(diretório_do_txt, diretório_do_xlsx, nome_planilha=None,
+                                           tipo_regressão=None, algoritmo_otimização=None):
+    """ Monta os argumentos de uma regressão (como nas 'PARTES 1 a 4' do 'MAIN.py') a partir dos arquivos de
+        entrada, sem executá-la.
+
+    Inputs:
+        diretório_do_txt (string)  : diretório do arquivo 'variáveis_entrada_código.txt'
+        diretório_do_xlsx (string) : diretório do arquivo 'dados_experimentais.xlsx'
+        nome_planilha (string)     : planilha a ser regredida (padrão: a do arquivo txt)
+        tipo_regressão (int)       : parâmetros a serem regredidos (padrão: o do arquivo txt)
+        algoritmo_otimização (int) : algoritmo de otimização (padrão: o do arquivo txt)
+
+    Outputs:
+        Uma tupla contendo os seguintes elementos:
+            chute_inicial (array)         : chutes iniciais dos parâmetros a serem estimados
+            argumentos_otimização (tuple) : *args da função 'F_obj'
+            algoritmo_otimização (int)    : algoritmo de otimização
+            limites_parâmetros (list)     : limites dos parâmetros
+    """
+
+    # Dados de entrada do código
+    (n_agregados, MWmin, MWmax, alfa, MWavg, tipo_cálculo_MM_agregados, método_integração_FDP_Gamma,
+     correlação_densidade_saturados, correlação_delta_saturados,
+     correlação_densidade_aromáticos, correlação_delta_aromáticos,
+     correlação_densidade_resinas, correlação_delta_resinas,
+     correlação_densidade_agregados, correlação_delta_agregados,
+     Alinha_delta_agregados, c_delta_agregados, d_delta_agregados,
+     _, tipo_regressão_txt, algoritmo_otimização_txt, nome_planilha_txt,
+     método_discretização_agregados, *_) = ler_variáveis_entrada_código(diretório_do_txt)
+    nome_planilha = nome_planilha or nome_planilha_txt
+    tipo_regressão = tipo_regressão or tipo_regressão_txt
+    algoritmo_otimização = algoritmo_otimização or algoritmo_otimização_txt
+
+    # Informações experimentais do sistema
+    SARA, T, solvente, ws_simplificados, yields_exp = ler_dados_experimentais(diretório_do_xlsx, nome_planilha)
+    SARA = normalizar_composição(SARA)
+
+    # Propriedades do solvente, saturados, aromáticos e resinas
+    correlações_SAR = (correlação_densidade_saturados, correlação_delta_saturados,
+                       correlação_densidade_aromáticos, correlação_delta_aromáticos,
+                       correlação_densidade_resinas, correlação_delta_resinas)
+    propriedades_componentes = calcular_propriedades_solvente_SAR(T, solvente, correlações_SAR)
+
+    # Discretização dos agregados (a opção 'adaptativo' é resolvida com os parâmetros lidos, como no 'MAIN.py')
+    parâmetros_agregados = (MWavg, alfa, c_delta_agregados, Alinha_delta_agregados, d_delta_agregados)
+    correlações_agregados = (correlação_densidade_agregados, correlação_delta_agregados)
+    if método_discretização_agregados == 'adaptativo':
+        n_agregados, método_discretização_agregados, _ = determinar_n_agregados_mínimo(
+            parâmetros_agregados, (T, SARA, ws_simplificados), propriedades_componentes,
+            (n_agregados, MWmin, MWmax, tipo_cálculo_MM_agregados, método_integração_FDP_Gamma, 'uniforme'),
+            correlações_agregados)
+    variáveis_distribuição_massa_molar = (n_agregados, MWmin, MWmax, tipo_cálculo_MM_agregados,
+                                          método_integração_FDP_Gamma, método_discretização_agregados)
+
+    # Argumentos da regressão
+    chute_inicial = montar_chute_inicial(tipo_regressão, parâmetros_agregados)
+    configuração_regressão = (tipo_regressão, parâmetros_agregados, correlações_agregados)
+    argumentos_otimização = ((T, SARA, ws_simplificados, yields_exp.astype(float)), propriedades_componentes,
+                             variáveis_distribuição_massa_molar, configuração_regressão)
+    limites_parâmetros = obter_limites_parâmetros(tipo_regressão, MWmin)
+
+    return chute_inicial, argumentos_otimização, algoritmo_otimização, limites_parâmetros
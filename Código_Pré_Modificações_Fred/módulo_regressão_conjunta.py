@@ -0,0 +1,186 @@
+# Importação de bibliotecas do python
+import numpy as np
+import scipy as scp
+
+# Importação de outros módulos deste projeto
+from módulo_regressão import calcular_resíduos_yields, obter_número_parâmetros
+from módulo_memória_compartilhada import RegistroMemóriaCompartilhada, restaurar_compartilhados
+
+# Nomes dos parâmetros dos agregados, na ordem em que são estimados (ver 'obter_número_parâmetros')
+NOMES_PARÂMETROS = ("MWavg", "alfa", "c_delta_agregados", "Alinha_delta_agregados", "d_delta_agregados")
+
+
+# Função
+def montar_estrutura_parâmetros(tipo_regressão, n_petróleos, parâmetros_compartilhados):
+    """ Monta a correspondência entre o vetor de parâmetros da regressão conjunta e os parâmetros de cada petróleo.
+        O vetor conjunto contém os parâmetros individuais do 1º petróleo, os do 2º, ..., e por último os
+        compartilhados.
+
+    Inputs:
+        tipo_regressão (int)              : define quais parâmetros são estimados, ver 'obter_número_parâmetros'
+        n_petróleos (int)                 : nº de petróleos
+        parâmetros_compartilhados (tuple) : nomes (ver 'NOMES_PARÂMETROS') dos parâmetros comuns a todos os
+                                            petróleos; os demais parâmetros estimados são individuais
+
+    Outputs:
+        índices (array) : posição, no vetor conjunto, de cada parâmetro estimado de cada petróleo, dimensões
+                          (nº de petróleos, nº de parâmetros estimados)
+    """
+
+    n_parâmetros = obter_número_parâmetros(tipo_regressão)
+    compartilhados = [j for j in range(n_parâmetros) if NOMES_PARÂMETROS[j] in parâmetros_compartilhados]
+    individuais = [j for j in range(n_parâmetros) if j not in compartilhados]
+
+    índices = np.empty((n_petróleos, n_parâmetros), dtype=int)
+    for k in range(n_petróleos):
+        índices[k, individuais] = k*len(individuais) + np.arange(len(individuais))
+        índices[k, compartilhados] = n_petróleos*len(individuais) + np.arange(len(compartilhados))
+
+    return índices
+
+
+# Função
+def calcular_resíduos_petróleo(argumentos_petróleo):
+    """ Calcula os resíduos dos yields de um petróleo (executado em um processo de trabalho).
+
+    Inputs:
+        argumentos_petróleo (tuple) : (parâmetros, argumentos_otimização) do petróleo, ver 'calcular_resíduos_yields'
+                                      (os arrays de 'argumentos_otimização' podem estar em memória compartilhada)
+
+    Outputs:
+        resíduos (array) : yields calculados menos experimentais; 1 (yield 100% errado) onde o cálculo falhar, como
+                           em 'regredir_parâmetros_mínimos_quadrados'
+    """
+
+    parâmetros, argumentos_otimização = argumentos_petróleo
+    argumentos_otimização = restaurar_compartilhados(argumentos_otimização)
+    n_dados_exp = np.shape(argumentos_otimização[0][3])[0]
+    try:
+        resíduos = np.asarray(calcular_resíduos_yields(parâmetros, *argumentos_otimização), dtype=float)
+    except (ValueError, ArithmeticError):
+        resíduos = np.ones(n_dados_exp)
+
+    return np.where(np.isfinite(resíduos), resíduos, 1.0)
+
+
+# Função
+def regredir_parâmetros_conjunta(chutes_iniciais, argumentos_petróleos, limites_parâmetros, tipo_regressão,
+                                 parâmetros_compartilhados=NOMES_PARÂMETROS[2:], executor=None,
+                                 passo_relativo=1e-6):
+    """ Regressão conjunta de vários petróleos por mínimos quadrados dos resíduos dos yields, com parâmetros
+        individuais (de cada petróleo) e compartilhados (comuns a todos), com o método de região de confiança
+        refletiva ('trf') do 'scipy.optimize.least_squares'.
+
+    Inputs:
+        chutes_iniciais (array)           : chutes iniciais dos parâmetros estimados de cada petróleo, dimensões
+                                            (nº de petróleos, nº de parâmetros estimados); os compartilhados partem
+                                            da média entre os petróleos
+        argumentos_petróleos (list)       : *args da função 'F_obj' de cada petróleo (mesmo 'tipo_regressão')
+        limites_parâmetros (list)         : limites dos parâmetros estimados, ver 'obter_limites_parâmetros'
+        tipo_regressão (int)              : define quais parâmetros são estimados
+        parâmetros_compartilhados (tuple) : nomes dos parâmetros comuns a todos os petróleos (padrão: os parâmetros
+                                            do parâmetro de solubilidade dos agregados, c_delta_agregados,
+                                            Alinha_delta_agregados e d_delta_agregados)
+        executor (Executor)               : ProcessPoolExecutor com os processos de trabalho (None para execução
+                                            serial)
+        passo_relativo (float)            : passo relativo das diferenças finitas da jacobiana
+
+    Outputs:
+        sol (OptimizeResult) : resultado da otimização, com 'x' o vetor conjunto de parâmetros, 'parâmetros_petróleos'
+                               os parâmetros estimados de cada petróleo (dimensões como 'chutes_iniciais'), 'DMAs' o
+                               DMA de cada petróleo, 'fun' o DMA de todos os pontos, 'resíduos' o vetor de resíduos,
+                               'nfev' o nº de cálculos de curvas de solubilidade (incluindo os das diferenças
+                               finitas) e 'padrão_jacobiana' o padrão de esparsidade da jacobiana
+
+    Observações:
+        Os resíduos de cada petróleo dependem apenas dos seus parâmetros individuais e dos compartilhados, de modo
+        que a jacobiana é esparsa em blocos. Nas diferenças finitas, um mesmo parâmetro individual é perturbado em
+        todos os petróleos simultaneamente (cada petróleo só "enxerga" a sua perturbação): a jacobiana custa
+        (nº de parâmetros individuais + nº de compartilhados) cálculos de cada petróleo, independentemente do nº de
+        petróleos, e todos esses cálculos (e os dos resíduos) são feitos de uma só vez nos processos de 'executor'.
+        A jacobiana é passada ao 'least_squares' como matriz esparsa, de modo que a álgebra linear da região de
+        confiança ('lsmr') também escale com o nº de elementos não nulos. Com 'executor', os dados de cada petróleo
+        são publicados uma única vez em memória compartilhada, e as tarefas levam apenas as suas referências.
+    """
+
+    n_petróleos = len(argumentos_petróleos)
+    índices = montar_estrutura_parâmetros(tipo_regressão, n_petróleos, parâmetros_compartilhados)
+    n_parâmetros_conjuntos = índices.max() + 1
+    mapear = executor.map if executor is not None else map
+
+    # Linhas (pontos experimentais) de cada petróleo no vetor de resíduos e padrão de esparsidade da jacobiana
+    n_dados_petróleos = [np.shape(argumentos[0][3])[0] for argumentos in argumentos_petróleos]
+    linhas = np.split(np.arange(sum(n_dados_petróleos)), np.cumsum(n_dados_petróleos)[:-1])
+    padrão_jacobiana = scp.sparse.lil_matrix((sum(n_dados_petróleos), n_parâmetros_conjuntos), dtype=int)
+    for k in range(n_petróleos):
+        padrão_jacobiana[linhas[k][:, None], índices[k][None, :]] = 1
+    padrão_jacobiana = padrão_jacobiana.tocsr()
+
+    # Chute inicial e limites do vetor conjunto
+    chutes_iniciais = np.atleast_2d(np.asarray(chutes_iniciais, dtype=float))
+    limites = np.array(limites_parâmetros, dtype=float)
+    parâmetros_iniciais, limites_inferiores, limites_superiores = (np.empty(n_parâmetros_conjuntos)
+                                                                   for _ in range(3))
+    for j in range(índices.shape[1]):
+        for posição in np.unique(índices[:, j]):
+            parâmetros_iniciais[posição] = chutes_iniciais[índices[:, j] == posição, j].mean()
+            limites_inferiores[posição], limites_superiores[posição] = limites[j]
+    parâmetros_iniciais = np.clip(parâmetros_iniciais, limites_inferiores, limites_superiores)
+
+    # Resíduos de todos os petróleos em vários vetores conjuntos, com todos os cálculos em uma única rodada
+    registro = RegistroMemóriaCompartilhada()
+    argumentos_tarefas = [registro.compartilhar(argumentos) if executor is not None else argumentos
+                          for argumentos in argumentos_petróleos]
+    avaliações = {}
+    n_avaliações = [0]
+
+    def calcular_resíduos_conjuntos(lista_parâmetros):
+        tarefas = [(parâmetros[índices[k]], argumentos_tarefas[k])
+                   for parâmetros in lista_parâmetros for k in range(n_petróleos)]
+        resíduos_petróleos = list(mapear(calcular_resíduos_petróleo, tarefas))
+        n_avaliações[0] += len(tarefas)
+        return [np.concatenate(resíduos_petróleos[i*n_petróleos:(i + 1)*n_petróleos])
+                for i in range(len(lista_parâmetros))]
+
+    def função_resíduos(parâmetros):
+        chave = np.asarray(parâmetros, dtype=float).tobytes()
+        if chave not in avaliações:
+            avaliações[chave] = calcular_resíduos_conjuntos([np.asarray(parâmetros, dtype=float)])[0]
+        return avaliações[chave]
+
+    # Jacobiana por diferenças finitas progressivas (regressivas no limite superior), agrupando as colunas de um
+    # mesmo parâmetro individual de todos os petróleos
+    grupos = [np.unique(índices[:, j]) for j in range(índices.shape[1])]
+
+    def jacobiana_resíduos(parâmetros):
+        parâmetros = np.asarray(parâmetros, dtype=float)
+        resíduos = função_resíduos(parâmetros)
+        passos = passo_relativo*np.maximum(np.abs(parâmetros), 1)
+        passos = np.where(parâmetros + passos > limites_superiores, -passos, passos)
+        parâmetros_perturbados = []
+        for colunas in grupos:
+            perturbação = np.zeros(n_parâmetros_conjuntos)
+            perturbação[colunas] = passos[colunas]
+            parâmetros_perturbados.append(parâmetros + perturbação)
+        resíduos_perturbados = calcular_resíduos_conjuntos(parâmetros_perturbados)
+
+        jacobiana = scp.sparse.lil_matrix(padrão_jacobiana.shape)
+        for j in range(len(grupos)):
+            diferenças = resíduos_perturbados[j] - resíduos
+            for k in range(n_petróleos):
+                coluna = índices[k, j]
+                jacobiana[linhas[k], coluna] = (diferenças[linhas[k]]/passos[coluna])[:, None]
+        return jacobiana.tocsr()
+
+    # Otimização
+    with registro:
+        sol = scp.optimize.least_squares(função_resíduos, parâmetros_iniciais, jac=jacobiana_resíduos,
+                                         bounds=(limites_inferiores, limites_superiores), method="trf",
+                                         x_scale="jac")
+        resíduos = função_resíduos(sol.x)
+    return scp.optimize.OptimizeResult(x=sol.x, parâmetros_petróleos=sol.x[índices],
+                                       DMAs=np.array([np.abs(resíduos[linhas_petróleo]).mean()
+                                                      for linhas_petróleo in linhas]),
+                                       fun=np.abs(resíduos).mean(), resíduos=resíduos, cost=sol.cost,
+                                       nfev=n_avaliações[0], nit=sol.njev, success=sol.success, status=sol.status,
+                                       message=sol.message, padrão_jacobiana=padrão_jacobiana)
@@ -0,0 +1,254 @@
+# Importação de bibliotecas do python
+import os
+import numpy as np
+import scipy as scp
+
+# Importação de outros módulos deste projeto
+from módulo_regressão import desempacotar_parâmetros, regredir_parâmetros, monitorar_função_objetivo
+from módulo_regressão_multifidelidade import montar_opções_refinamento
+from módulo_checkpoint_regressão import salvar_checkpoint_regressão, calcular_assinatura_argumentos
+from módulo_curva_solubilidade import gerar_distribuição_agregados_normalizada, montar_sistemas_lote
+from módulo_equilíbrio_líquido_líquido import calcular_composições_ELL_lote, calcular_yields_asfaltenos_lote
+
+
+# Função
+def calcular_pontos_experimentais(parâmetros, argumentos_otimização, índices_pontos, chutes_iniciais=None):
+    """ Calcula o ELL (vetorizado) e os yields de um subconjunto dos pontos experimentais de uma regressão.
+
+    Inputs:
+        parâmetros (array)            : valores dos parâmetros estimados
+        argumentos_otimização (tuple) : *args da função 'F_obj'
+        índices_pontos (array)        : índices dos pontos experimentais a serem calculados
+        chutes_iniciais (tuple)       : (xsL, xsH) iniciais, uma linha por ponto calculado (opcional; ver
+                                        'calcular_composições_ELL_lote')
+
+    Outputs:
+        Uma tupla contendo os seguintes elementos, uma linha por ponto calculado:
+            yields_calc (array) : yields fracionais de asfaltenos (NaN se o cálculo falhar)
+            betasrr (array)     : betas de Rachford-Rice
+            xsL (array)         : composições da fase leve (base molar)
+            xsH (array)         : composições da fase pesada (base molar)
+    """
+
+    dados_experimentais, propriedades_componentes, variáveis_distribuição_massa_molar, configuração_regressão = \
+        argumentos_otimização[0:4]
+    T, SARA, ws_simplificados = dados_experimentais[0:3]
+    tipo_regressão, parâmetros_agregados, correlações_agregados = configuração_regressão
+    parâmetros_agregados = desempacotar_parâmetros(parâmetros, tipo_regressão, parâmetros_agregados)
+
+    with np.errstate(all="ignore"):
+        distribuição_agregados = gerar_distribuição_agregados_normalizada(parâmetros_agregados,
+                                                                          variáveis_distribuição_massa_molar)
+        xs_completo, MMs, deltas, Vs = montar_sistemas_lote(
+            parâmetros_agregados, (np.array([T]), SARA[np.newaxis, :], ws_simplificados[índices_pontos]),
+            tuple(np.asarray(propriedades)[np.newaxis, 0:4] for propriedades in propriedades_componentes),
+            correlações_agregados, distribuição_agregados)
+        n_componentes = xs_completo.shape[1]
+        if not (np.isfinite(xs_completo).all() and np.isfinite(deltas).all() and np.isfinite(Vs).all()):
+            return tuple(np.full(dimensões, np.nan) for dimensões in (
+                índices_pontos.size, índices_pontos.size, (índices_pontos.size, n_componentes),
+                (índices_pontos.size, n_componentes)))
+        betasrr, xsL, xsH, _ = calcular_composições_ELL_lote(T, xs_completo, deltas, Vs, distribuição_agregados[2],
+                                                             chutes_iniciais)
+        yields_calc = calcular_yields_asfaltenos_lote(betasrr, xsL, xsH, MMs)
+
+    return yields_calc, betasrr, xsL, xsH
+
+
+# Função
+def F_obj_incremental(parâmetros, *args):
+    """ Função objetivo 'F_obj' da regressão incremental: reaproveita os yields salvos dos pontos inalterados quando
+        os parâmetros são os do ótimo salvo, e parte o cálculo de ELL de cada ponto da última solução bifásica desse
+        ponto (em vez do chute padrão).
+
+    Inputs:
+        parâmetros (array) : valores dos parâmetros a serem estimados
+        args (tuple)       : *args da função 'F_obj' (sem a tolerância de ELL), seguidos do dicionário 'cache', com
+                             as chaves 'parâmetros' (ótimo salvo), 'yields' (yields dos pontos no ótimo salvo, NaN
+                             nos pontos novos ou alterados), 'xsL' e 'xsH' (chutes iniciais de cada ponto, NaN onde
+                             não há), atualizadas a cada avaliação
+
+    Outputs:
+        DMA (float) : média dos desvios absolutos fracionais nos yields (infinito se o cálculo falhar)
+    """
+
+    argumentos_otimização, cache = args[0:4], args[4]
+    yields_exp = argumentos_otimização[0][3]
+
+    # Pontos a calcular: todos, exceto os inalterados quando os parâmetros são os do ótimo salvo
+    if np.array_equal(np.ravel(parâmetros), cache["parâmetros"]):
+        yields_calc = cache["yields"].copy()
+    else:
+        yields_calc = np.full(yields_exp.shape[0], np.nan)
+    índices_pontos = np.flatnonzero(np.isnan(yields_calc))
+
+    if índices_pontos.size > 0:
+        yields_calc[índices_pontos], betasrr, xsL, xsH = calcular_pontos_experimentais(
+            parâmetros, argumentos_otimização, índices_pontos, (cache["xsL"][índices_pontos],
+                                                                cache["xsH"][índices_pontos]))
+
+        # Chutes das próximas avaliações: apenas soluções bifásicas (para não conduzir à solução trivial)
+        bifásicos = (betasrr > 0) & np.isfinite(xsL).all(axis=1) & np.isfinite(xsH).all(axis=1)
+        cache["xsL"][índices_pontos[bifásicos]] = xsL[bifásicos]
+        cache["xsH"][índices_pontos[bifásicos]] = xsH[bifásicos]
+
+    DMA = np.abs(yields_calc - yields_exp).mean()
+
+    return DMA if np.isfinite(DMA) else np.inf
+
+
+# Função
+def identificar_pontos_alterados(ws_simplificados, yields_exp, ws_salvos, yields_salvos):
+    """ Associa cada ponto experimental atual a um ponto salvo com a mesma fração de solvente e o mesmo yield
+        experimental (independentemente da posição da linha na planilha).
+
+    Inputs:
+        ws_simplificados (array) : frações [Solvente, Petróleo] atuais, uma linha por ponto
+        yields_exp (array)       : yields experimentais atuais
+        ws_salvos (array)        : frações [Solvente, Petróleo] salvas
+        yields_salvos (array)    : yields experimentais salvos
+
+    Outputs:
+        índices_salvos (array) : índice do ponto salvo correspondente a cada ponto atual (-1 nos pontos novos ou
+                                 alterados)
+    """
+
+    pontos_salvos = {}
+    for j, chave in enumerate(zip(map(float, ws_salvos[:, 0]), map(float, yields_salvos))):
+        pontos_salvos.setdefault(chave, []).append(j)
+
+    índices_salvos = np.full(yields_exp.shape[0], -1)
+    for i, chave in enumerate(zip(map(float, ws_simplificados[:, 0]), map(float, yields_exp))):
+        if pontos_salvos.get(chave):
+            índices_salvos[i] = pontos_salvos[chave].pop(0)
+
+    return índices_salvos
+
+
+# Função
+def carregar_estado_regressão_incremental(diretório_estado, identificação):
+    """ Carrega o estado salvo pela última regressão incremental, caso exista e corresponda à mesma configuração.
+
+    Inputs:
+        diretório_estado (string) : diretório do arquivo de estado (.npz)
+        identificação (dict)      : configuração da regressão atual (chaves 'tipo_regressão', 'algoritmo_otimização',
+                                    'parâmetros_agregados', 'variáveis_distribuição_massa_molar' e
+                                    'correlações_agregados')
+
+    Outputs:
+        estado (dict) : estado salvo (ver 'regredir_parâmetros_incremental'); None se não houver estado compatível
+    """
+
+    if not os.path.isfile(diretório_estado):
+        return None
+
+    with np.load(diretório_estado) as arquivo_estado:
+        for chave, valor in identificação.items():
+            if chave not in arquivo_estado or np.shape(arquivo_estado[chave]) != np.shape(valor) \
+                    or not np.array_equal(arquivo_estado[chave], valor):
+                print(f"ATENCAO: o estado '{diretório_estado}' corresponde a outra configuracao "
+                      f"('{chave}' diferente) e sera ignorado.")
+                return None
+        return {chave: arquivo_estado[chave] for chave in arquivo_estado.files}
+
+
+# Função
+def regredir_parâmetros_incremental(chute_inicial, argumentos_otimização, algoritmo_otimização, limites_parâmetros,
+                                    diretório_estado, passo_refinamento=0.02):
+    """ Regressão incremental: quando pontos são acrescentados (ou alterados) na planilha, a regressão parte do
+        ótimo e das soluções de ELL salvos pela regressão anterior, com passos iniciais locais, e só recalcula no
+        ótimo salvo os pontos novos ou alterados. Sem estado salvo compatível, é feita uma regressão completa a partir
+        de 'chute_inicial'; sem pontos novos ou alterados, o ótimo salvo é retornado sem nova regressão. Ao final, o
+        estado é salvo para a próxima regressão.
+
+    Inputs:
+        chute_inicial (array)         : chutes iniciais dos parâmetros (usados apenas sem estado salvo)
+        argumentos_otimização (tuple) : *args da função 'F_obj'
+        algoritmo_otimização (int)    : algoritmo de otimização, ver 'regredir_parâmetros'
+        limites_parâmetros (list)     : limites dos parâmetros
+        diretório_estado (string)     : diretório do arquivo de estado (.npz)
+        passo_refinamento (float)     : passo inicial relativo (simplex do Nelder-Mead ou direções do Powell) da
+                                        regressão retomada, ver 'montar_opções_refinamento'
+
+    Outputs:
+        sol (OptimizeResult) : resultado da otimização, com os atributos adicionais 'retomada' (True se partiu do
+                               estado salvo) e 'n_pontos_recalculados' (nº de pontos novos ou alterados)
+
+    Observações:
+        O arquivo de estado contém a configuração da regressão, os pontos experimentais (T, SARA, frações de solvente e
+        yields), a assinatura das propriedades dos componentes, o ótimo e o DMA, os yields de cada ponto no ótimo e as
+        composições de ELL dos pontos bifásicos (chutes iniciais). O estado final do otimizador não é reaproveitado: o
+        simplex final do Nelder-Mead é degenerado (já atende aos critérios de parada), e o conjunto final de direções do
+        Powell, quase paralelas ao longo do vale do DMA, prendeu a regressão retomada em um ótimo local (Yanes_P2, um
+        ponto acrescentado: DMA 0.443%, contra 0.417% com direções novas).
+        Uma mudança de T, da composição SARA ou das propriedades do solvente e das frações SAR
+        ('propriedades_componentes', comparadas pela assinatura salva) torna todos os pontos alterados.
+    """
+
+    dados_experimentais, propriedades_componentes, variáveis_distribuição_massa_molar, configuração_regressão = \
+        argumentos_otimização
+    T, SARA, ws_simplificados, yields_exp = (np.asarray(dado, dtype=float) for dado in dados_experimentais)
+    tipo_regressão, parâmetros_agregados, correlações_agregados = configuração_regressão
+    n_pontos = yields_exp.shape[0]
+    identificação = {"tipo_regressão": tipo_regressão, "algoritmo_otimização": algoritmo_otimização,
+                     "parâmetros_agregados": np.asarray(parâmetros_agregados, dtype=float),
+                     "variáveis_distribuição_massa_molar": np.asarray(variáveis_distribuição_massa_molar, dtype=str),
+                     "correlações_agregados": np.asarray(correlações_agregados, dtype=str)}
+    assinatura_propriedades = calcular_assinatura_argumentos(propriedades_componentes)
+
+    # Estado salvo: ótimo e soluções de ELL dos pontos inalterados
+    estado = carregar_estado_regressão_incremental(diretório_estado, identificação)
+    parâmetros_iniciais = np.ravel(chute_inicial).astype(float)
+    índices_salvos = np.full(n_pontos, -1)
+    opções = None
+    if estado is not None:
+        parâmetros_iniciais = estado["parâmetros"]
+        if algoritmo_otimização in (3, 4):  # algoritmos com limites nos parâmetros
+            parâmetros_iniciais = np.clip(parâmetros_iniciais, *np.array(limites_parâmetros, dtype=float).T)
+        if np.array_equal(estado["T"], T) and np.array_equal(estado["SARA"], SARA) \
+                and str(estado.get("assinatura_propriedades", "")) == assinatura_propriedades:
+            índices_salvos = identificar_pontos_alterados(ws_simplificados, yields_exp, estado["ws_simplificados"],
+                                                          estado["yields_exp"])
+        opções = montar_opções_refinamento(parâmetros_iniciais, algoritmo_otimização, passo_refinamento)
+
+    # Sem pontos novos, alterados ou removidos: o ótimo salvo continua válido
+    inalterados = índices_salvos >= 0
+    if inalterados.all() and n_pontos == estado["yields_exp"].shape[0] \
+            and np.array_equal(parâmetros_iniciais, estado["parâmetros"]):
+        return scp.optimize.OptimizeResult(x=parâmetros_iniciais, fun=float(estado["DMA"]), nfev=0, success=True,
+                                           message="Sem pontos novos ou alterados: otimo salvo mantido.",
+                                           retomada=True, n_pontos_recalculados=0)
+
+    # Cache da função objetivo: yields dos pontos inalterados no ótimo salvo e chutes iniciais de ELL
+    # Obs: nº de agregados da distribuição efetivamente gerada, e não o 'n_agregados' informado
+    with np.errstate(all="ignore"):
+        n_componentes = 4 + gerar_distribuição_agregados_normalizada(
+            desempacotar_parâmetros(parâmetros_iniciais, tipo_regressão, parâmetros_agregados),
+            variáveis_distribuição_massa_molar)[0].shape[0]
+    cache = {"parâmetros": parâmetros_iniciais, "yields": np.full(n_pontos, np.nan),
+             "xsL": np.full((n_pontos, n_componentes), np.nan), "xsH": np.full((n_pontos, n_componentes), np.nan)}
+    if inalterados.any():
+        if np.array_equal(parâmetros_iniciais, estado["parâmetros"]):
+            cache["yields"][inalterados] = estado["yields_calc"][índices_salvos[inalterados]]
+        cache["xsL"][inalterados] = estado["xsL"][índices_salvos[inalterados]]
+        cache["xsH"][inalterados] = estado["xsH"][índices_salvos[inalterados]]
+
+    # Otimização
+    função_objetivo, histórico = monitorar_função_objetivo(F_obj_incremental)
+    sol = regredir_parâmetros(parâmetros_iniciais, argumentos_otimização + (cache,), algoritmo_otimização,
+                              limites_parâmetros, função_objetivo=função_objetivo, opções=opções)
+    sol.nfev = histórico["n_avaliações"]
+    sol.retomada = estado is not None
+    sol.n_pontos_recalculados = int(n_pontos - inalterados.sum())
+
+    # Estado para a próxima regressão (ELL de todos os pontos no ótimo; chutes apenas dos pontos bifásicos)
+    yields_calc, betasrr, xsL, xsH = calcular_pontos_experimentais(sol.x, argumentos_otimização, np.arange(n_pontos),
+                                                                   (cache["xsL"], cache["xsH"]))
+    xsL[~(betasrr > 0)] = xsH[~(betasrr > 0)] = np.nan
+    salvar_checkpoint_regressão(diretório_estado, {
+        **identificação, "T": T, "SARA": SARA, "assinatura_propriedades": assinatura_propriedades,
+        "ws_simplificados": ws_simplificados, "yields_exp": yields_exp,
+        "parâmetros": np.ravel(sol.x).astype(float), "DMA": sol.fun, "yields_calc": yields_calc, "xsL": xsL,
+        "xsH": xsH})
+
+    return sol
@@ -0,0 +1,157 @@
+# Importação de bibliotecas do python
+import time
+import numpy as np
+import scipy as scp
+
+# Importação de outros módulos deste projeto
+from módulo_regressão import F_obj, desempacotar_parâmetros, regredir_parâmetros, monitorar_função_objetivo
+from módulo_curva_solubilidade import gerar_distribuição_agregados_normalizada, montar_sistemas_lote
+from módulo_equilíbrio_líquido_líquido import calcular_composições_ELL_lote, calcular_yields_asfaltenos_lote
+
+
+# Função
+def F_obj_lote(parâmetros, *args):
+    """ Função objetivo 'F_obj' calculada com o cálculo de ELL vetorizado sobre todos os pontos experimentais (mais
+        barata que a versão ponto a ponto; usada nos níveis de menor fidelidade).
+
+    Inputs:
+        parâmetros (array) : valores dos parâmetros a serem estimados
+        args (tuple)       : *args da função 'F_obj', seguidos da tolerância do cálculo de ELL
+
+    Outputs:
+        DMA (float) : média dos desvios absolutos fracionais nos yields (infinito se o cálculo falhar)
+    """
+
+    # Desempacotando os *args
+    (dados_experimentais, propriedades_componentes, variáveis_distribuição_massa_molar, configuração_regressão,
+     tolerância_ELL) = args
+    T, SARA, ws_simplificados, yields_exp = dados_experimentais
+    tipo_regressão, parâmetros_agregados, correlações_agregados = configuração_regressão
+    parâmetros_agregados = desempacotar_parâmetros(parâmetros, tipo_regressão, parâmetros_agregados)
+
+    # Cálculo de ELL vetorizado e dos yields de cada ponto experimental
+    with np.errstate(all="ignore"):
+        distribuição_agregados = gerar_distribuição_agregados_normalizada(parâmetros_agregados,
+                                                                          variáveis_distribuição_massa_molar)
+        xs_completo, MMs, deltas, Vs = montar_sistemas_lote(
+            parâmetros_agregados, (np.array([T]), SARA[np.newaxis, :], ws_simplificados),
+            tuple(np.asarray(propriedades)[np.newaxis, 0:4] for propriedades in propriedades_componentes),
+            correlações_agregados, distribuição_agregados)
+        if not (np.isfinite(xs_completo).all() and np.isfinite(deltas).all() and np.isfinite(Vs).all()):
+            return np.inf
+        betasrr, xsL, xsH, _ = calcular_composições_ELL_lote(T, xs_completo, deltas, Vs, distribuição_agregados[2],
+                                                             tol=tolerância_ELL)
+        DMA = np.abs(calcular_yields_asfaltenos_lote(betasrr, xsL, xsH, MMs) - yields_exp).mean()
+
+    return DMA if np.isfinite(DMA) else np.inf
+
+
+# Função
+def montar_níveis_fidelidade(n_agregados):
+    """ Monta os níveis padrão da regressão multifidelidade: discretização grosseira (6 agregados) com tolerância de
+        ELL folgada e, em seguida, a discretização e a tolerância da regressão direta.
+
+    Inputs:
+        n_agregados (int) : nº de agregados do nível final (ex: lido do arquivo 'variáveis_entrada_código.txt')
+
+    Outputs:
+        níveis (list) : lista de tuplas (n_agregados, tolerância_ELL), da menor para a maior fidelidade
+
+    Observações:
+        Níveis intermediários (ex: [(6, 1e-6), (15, 1e-9), (30, 1e-12)]) podem ser informados diretamente em
+        'regredir_parâmetros_multifidelidade'; com os dados de Yanes (2018) eles não reduziram o custo total, pois o
+        nº de avaliações do último nível depende pouco da proximidade do ponto de partida.
+        Com a discretização 'quadratura_gauss', o nº de agregados de cada nível é o nº de nós da quadratura.
+    """
+
+    if n_agregados <= 6:
+        return [(n_agregados, 1e-12)]
+    return [(6, 1e-6), (n_agregados, 1e-12)]
+
+
+# Função
+def montar_opções_refinamento(parâmetros, algoritmo_otimização, passo_refinamento):
+    """ Monta as opções do algoritmo de otimização de um nível de refinamento, de modo que a busca parta do ótimo do
+        nível anterior com passos da ordem do deslocamento esperado do ótimo (e não com os passos padrão, da ordem
+        dos próprios parâmetros).
+
+    Inputs:
+        parâmetros (array)         : ótimo do nível anterior
+        algoritmo_otimização (int) : algoritmo de otimização, ver 'regredir_parâmetros'
+        passo_refinamento (float)  : passo inicial relativo (fração de cada parâmetro)
+
+    Outputs:
+        opções (dict) : 'initial_simplex' (Nelder-Mead) ou 'direc' (Powell); None para os demais algoritmos
+    """
+
+    passos = np.diag(passo_refinamento*np.maximum(np.abs(parâmetros), 1e-3))
+    if algoritmo_otimização == 1:
+        return {"initial_simplex": np.vstack((parâmetros, parâmetros + passos))}
+    if algoritmo_otimização == 4:
+        return {"direc": passos}
+    return None
+
+
+# Função
+def regredir_parâmetros_multifidelidade(chute_inicial, argumentos_otimização, algoritmo_otimização,
+                                        limites_parâmetros, níveis=None, passo_refinamento=0.02):
+    """ Regressão multifidelidade: a regressão é feita primeiro com poucos agregados e tolerância de ELL folgada
+        (modelo barato) e o ótimo é refinado em níveis de fidelidade crescente, cada um partindo do ótimo do nível
+        anterior.
+
+    Inputs:
+        chute_inicial (array)         : chutes iniciais dos parâmetros a serem estimados (nível inicial)
+        argumentos_otimização (tuple) : *args da função 'F_obj' (o nº de agregados de
+                                        'variáveis_distribuição_massa_molar' é substituído pelo de cada nível)
+        algoritmo_otimização (int)    : algoritmo de otimização, ver 'regredir_parâmetros'
+        limites_parâmetros (list)     : limites dos parâmetros
+        níveis (list)                 : tuplas (n_agregados, tolerância_ELL), da menor para a maior fidelidade
+                                        (padrão: 'montar_níveis_fidelidade' com o nº de agregados dos
+                                        'argumentos_otimização'); os níveis anteriores ao último usam
+                                        'F_obj_lote', e o último usa 'F_obj' (como na regressão direta)
+        passo_refinamento (float)     : passo inicial relativo dos níveis de refinamento, ver
+                                        'montar_opções_refinamento'
+
+    Outputs:
+        sol (OptimizeResult) : resultado do último nível, com 'nfev' o nº total de avaliações da função objetivo e
+                               'níveis' uma lista de dicionários (um por nível) com as chaves 'n_agregados',
+                               'tolerância_ELL', 'x', 'DMA', 'nfev', 'tempo' (s) e 'deslocamento' (máxima variação
+                               relativa dos parâmetros em relação ao ótimo do nível anterior)
+
+    Observações:
+        A discretização 'adaptativo' escolhe o próprio nº de agregados e não é aceita: ela deve ser resolvida antes
+        (ver 'determinar_n_agregados_mínimo', como na 'PARTE 2' do 'MAIN.py')
+    """
+
+    dados_experimentais, propriedades_componentes, variáveis_distribuição_massa_molar, configuração_regressão = \
+        argumentos_otimização
+    if variáveis_distribuição_massa_molar[5] == "adaptativo":
+        raise ValueError("\nATENCAO: a discretizacao 'adaptativo' escolhe o proprio nº de agregados e nao pode ser "
+                         "usada nos niveis da regressao multifidelidade; informe uma discretizacao fixa "
+                         "('uniforme', 'equiprobabilidade' ou 'quadratura_gauss').")
+    if níveis is None:
+        níveis = montar_níveis_fidelidade(variáveis_distribuição_massa_molar[0])
+
+    parâmetros = np.ravel(chute_inicial).astype(float)
+    resultados_níveis, n_avaliações = [], 0
+    for i_nível, (n_agregados, tolerância_ELL) in enumerate(níveis):
+        argumentos_nível = (dados_experimentais, propriedades_componentes,
+                            (n_agregados,) + tuple(variáveis_distribuição_massa_molar[1:]), configuração_regressão,
+                            tolerância_ELL)
+        função_objetivo, histórico = monitorar_função_objetivo(F_obj if i_nível == len(níveis) - 1 else F_obj_lote)
+        instante_início = time.perf_counter()
+        opções = montar_opções_refinamento(parâmetros, algoritmo_otimização, passo_refinamento) \
+            if resultados_níveis else None
+        sol = regredir_parâmetros(parâmetros, argumentos_nível, algoritmo_otimização, limites_parâmetros,
+                                  função_objetivo=função_objetivo, opções=opções)
+        deslocamento = np.max(np.abs(sol.x - parâmetros)/np.maximum(np.abs(parâmetros), 1e-12)) \
+            if resultados_níveis else np.nan
+        resultados_níveis.append({"n_agregados": n_agregados, "tolerância_ELL": tolerância_ELL,
+                                  "x": np.array(sol.x, dtype=float), "DMA": float(sol.fun),
+                                  "nfev": histórico["n_avaliações"], "tempo": time.perf_counter() - instante_início,
+                                  "deslocamento": deslocamento})
+        n_avaliações += histórico["n_avaliações"]
+        parâmetros = np.array(sol.x, dtype=float)
+
+    return scp.optimize.OptimizeResult(x=sol.x, fun=sol.fun, nfev=n_avaliações, success=sol.success,
+                                       message=sol.message, níveis=resultados_níveis)
@@ -0,0 +1,128 @@
+# Importação de bibliotecas do python
+import numpy as np
+import scipy as scp
+
+# Importação de outros módulos deste projeto
+from módulo_regressão import calcular_resíduos_yields
+
+
+# Função
+def calcular_jacobiana_diferenças_finitas(função_resíduos, parâmetros, resíduos, limites_superiores,
+                                          passo_relativo=1e-6):
+    """ Calcula a jacobiana dos resíduos por diferenças finitas progressivas (regressivas nos parâmetros que estão
+        no limite superior).
+
+    Inputs:
+        função_resíduos (function)  : função que retorna o vetor de resíduos para um vetor de parâmetros
+        parâmetros (array)          : ponto de cálculo
+        resíduos (array)            : resíduos no ponto de cálculo
+        limites_superiores (array)  : limites superiores dos parâmetros
+        passo_relativo (float)      : passo relativo das diferenças finitas
+
+    Outputs:
+        jacobiana (array) : derivadas dos resíduos, dimensões (nº de resíduos, nº de parâmetros)
+    """
+
+    jacobiana = np.empty((resíduos.shape[0], parâmetros.shape[0]))
+    for j in range(parâmetros.shape[0]):
+        passo = passo_relativo*max(abs(parâmetros[j]), 1)
+        if parâmetros[j] + passo > limites_superiores[j]:
+            passo = -passo
+        parâmetros_perturbados = parâmetros.copy()
+        parâmetros_perturbados[j] += passo
+        jacobiana[:, j] = (função_resíduos(parâmetros_perturbados) - resíduos)/passo
+    return jacobiana
+
+
+# Função
+def regredir_parâmetros_mínimos_quadrados(chute_inicial, argumentos_otimização, limites_parâmetros,
+                                          intervalo_recálculo_jacobiana=5, passo_relativo=1e-6,
+                                          n_reinícios_máximo=10):
+    """ Regressão por mínimos quadrados dos resíduos dos yields (yields_calc - yields_exp) com o método de região
+        de confiança refletiva ('trf') do 'scipy.optimize.least_squares', respeitando os limites dos parâmetros.
+
+    Inputs:
+        chute_inicial (array)               : chutes iniciais dos parâmetros a serem estimados
+        argumentos_otimização (tuple)       : *args da função 'F_obj'
+        limites_parâmetros (list)           : limites dos parâmetros, ver 'obter_limites_parâmetros'
+        intervalo_recálculo_jacobiana (int) : a jacobiana é recalculada por diferenças finitas a cada
+                                              'intervalo_recálculo_jacobiana' iterações, sendo atualizada pela
+                                              fórmula de Broyden nas demais
+        passo_relativo (float)              : passo relativo das diferenças finitas
+        n_reinícios_máximo (int)            : nº máximo de reinícios com a jacobiana recalculada (ver abaixo)
+
+    Outputs:
+        sol (OptimizeResult) : resultado da otimização, com 'fun' o DMA (como em 'F_obj') no ótimo, 'resíduos' o vetor
+                               de resíduos, 'nfev' o nº total de cálculos da curva de solubilidade (incluindo os das
+                               diferenças finitas) e 'n_jacobianas_diferenças_finitas' o nº de jacobianas calculadas
+                               por diferenças finitas
+
+    Observações:
+        A cada iteração o 'least_squares' precisa da jacobiana; calculá-la por diferenças finitas custaria nº de
+        parâmetros cálculos da curva de solubilidade. A atualização de Broyden corrige a jacobiana anterior com o
+        último passo aceito, J += ((r - r_anterior - J*dx) dx^T)/(dx^T dx), sem nenhum cálculo adicional.
+    """
+
+    limites = np.array(limites_parâmetros, dtype=float)
+    limites_inferiores, limites_superiores = limites[:, 0], limites[:, 1]
+    yields_exp = np.asarray(argumentos_otimização[0][3], dtype=float)
+
+    # Resíduos, guardando as avaliações já feitas (o 'least_squares' chama a jacobiana no ponto recém-avaliado)
+    # Obs: se o cálculo falhar (ex: distribuição de massa molar degenerada em parâmetros extremos), os resíduos
+    #      recebem o valor 1 (yield 100% errado), de modo que o passo seja rejeitado pela região de confiança
+    avaliações = {}
+    n_avaliações = [0]
+
+    def função_resíduos(parâmetros):
+        chave = np.asarray(parâmetros, dtype=float).tobytes()
+        if chave not in avaliações:
+            n_avaliações[0] += 1
+            try:
+                resíduos = np.asarray(calcular_resíduos_yields(parâmetros, *argumentos_otimização), dtype=float)
+            except (ValueError, ArithmeticError):
+                resíduos = np.ones(yields_exp.shape[0])
+            avaliações[chave] = np.where(np.isfinite(resíduos), resíduos, 1.0)
+        return avaliações[chave]
+
+    # Jacobiana: diferenças finitas periódicas e atualizações de Broyden entre elas
+    estado_jacobiana = {"jacobiana": None, "parâmetros": None, "resíduos": None, "n_chamadas": 0,
+                        "n_diferenças_finitas": 0, "atualizada_por_broyden": False}
+
+    def jacobiana_resíduos(parâmetros):
+        parâmetros = np.asarray(parâmetros, dtype=float)
+        resíduos = função_resíduos(parâmetros)
+        if estado_jacobiana["n_chamadas"] % intervalo_recálculo_jacobiana == 0:
+            jacobiana = calcular_jacobiana_diferenças_finitas(função_resíduos, parâmetros, resíduos,
+                                                               limites_superiores, passo_relativo)
+            estado_jacobiana["n_diferenças_finitas"] += 1
+            estado_jacobiana["atualizada_por_broyden"] = False
+        else:
+            jacobiana = estado_jacobiana["jacobiana"].copy()
+            dx = parâmetros - estado_jacobiana["parâmetros"]
+            if dx @ dx > 0:
+                jacobiana += np.outer(resíduos - estado_jacobiana["resíduos"] - jacobiana @ dx, dx)/(dx @ dx)
+            estado_jacobiana["atualizada_por_broyden"] = True
+        estado_jacobiana.update(jacobiana=jacobiana, parâmetros=parâmetros, resíduos=resíduos)
+        estado_jacobiana["n_chamadas"] += 1
+        return jacobiana
+
+    # Otimização (o chute inicial precisa estar dentro dos limites)
+    # Obs: se o 'least_squares' parar com uma jacobiana atualizada por Broyden (que pode estar imprecisa e gerar
+    #      passos rejeitados até o critério 'xtol'), a otimização é reiniciada do ponto atingido com uma jacobiana
+    #      recalculada por diferenças finitas
+    parâmetros = np.clip(np.ravel(chute_inicial).astype(float), limites_inferiores, limites_superiores)
+    n_iterações = 0
+    for _ in range(n_reinícios_máximo + 1):
+        estado_jacobiana["n_chamadas"] = 0
+        sol = scp.optimize.least_squares(função_resíduos, parâmetros, jac=jacobiana_resíduos,
+                                         bounds=(limites_inferiores, limites_superiores), method="trf",
+                                         x_scale="jac")
+        n_iterações += sol.njev
+        parâmetros = sol.x
+        if not estado_jacobiana["atualizada_por_broyden"]:
+            break
+
+    return scp.optimize.OptimizeResult(x=sol.x, fun=np.abs(sol.fun).sum()/yields_exp.shape[0], resíduos=sol.fun,
+                                       cost=sol.cost, nfev=n_avaliações[0], nit=n_iterações,
+                                       n_jacobianas_diferenças_finitas=estado_jacobiana["n_diferenças_finitas"],
+                                       success=sol.success, status=sol.status, message=sol.message)
@@ -0,0 +1,100 @@
+# Importação de bibliotecas do python
+import time
+import numpy as np
+import scipy as scp
+
+# Importação de outros módulos deste projeto
+from módulo_regressão import F_obj, regredir_parâmetros, monitorar_função_objetivo
+
+
+# Exceção
+class OrçamentoEsgotado(Exception):
+    """ Levantada dentro da função objetivo para interromper uma regressão cujo orçamento acabou. """
+
+
+# Função
+def criar_controle_orçamento(tempo_máximo=None, n_avaliações_máximo=None):
+    """ Cria a função chamada após cada avaliação da função objetivo que interrompe a regressão quando o orçamento de
+        tempo ou de avaliações acaba.
+
+    Inputs:
+        tempo_máximo (float)      : tempo máximo da regressão (s), contado a partir da criação do controle (None:
+                                    sem limite)
+        n_avaliações_máximo (int) : nº máximo de avaliações da função objetivo (None: sem limite)
+
+    Outputs:
+        Uma tupla contendo os seguintes elementos:
+            ao_avaliar (function) : função ao_avaliar(parâmetros, DMA, histórico), ver 'monitorar_função_objetivo'
+            controle (dict)       : estado do controle, com as chaves 'instante_início', 'tempo_médio_avaliação' (s)
+                                    e 'motivo' (None enquanto houver orçamento; 'tempo' ou 'avaliações' depois)
+
+    Observações:
+        O orçamento de tempo é considerado esgotado quando não cabe mais uma avaliação de duração média, de modo que
+        a regressão termina dentro do prazo (a menos de flutuações na duração das avaliações).
+    """
+
+    controle = {"instante_início": time.monotonic(), "tempo_médio_avaliação": 0.0, "motivo": None}
+
+    def ao_avaliar(parâmetros, DMA, histórico):
+        tempo_decorrido = time.monotonic() - controle["instante_início"]
+        controle["tempo_médio_avaliação"] = tempo_decorrido/histórico["n_avaliações"]
+        if n_avaliações_máximo is not None and histórico["n_avaliações"] >= n_avaliações_máximo:
+            controle["motivo"] = "avaliações"
+        elif tempo_máximo is not None and tempo_decorrido + controle["tempo_médio_avaliação"] > tempo_máximo:
+            controle["motivo"] = "tempo"
+        if controle["motivo"] is not None:
+            raise OrçamentoEsgotado
+
+    return ao_avaliar, controle
+
+
+# Função
+def regredir_parâmetros_com_orçamento(chute_inicial, argumentos_otimização, algoritmo_otimização,
+                                      limites_parâmetros, tempo_máximo=None, n_avaliações_máximo=None,
+                                      gradiente=None):
+    """ Regressão com orçamento de tempo e/ou de avaliações da função objetivo ('anytime'): o melhor ponto avaliado
+        é sempre guardado e, se o orçamento acabar antes da convergência do algoritmo, a regressão é interrompida e
+        esse ponto é retornado.
+
+    Inputs:
+        chute_inicial (array)         : chutes iniciais dos parâmetros a serem estimados
+        argumentos_otimização (tuple) : *args da função 'F_obj'
+        algoritmo_otimização (int)    : algoritmo de otimização, ver 'regredir_parâmetros'
+        limites_parâmetros (list)     : limites dos parâmetros
+        tempo_máximo (float)          : tempo máximo da regressão (s) (None: sem limite)
+        n_avaliações_máximo (int)     : nº máximo de avaliações da função objetivo (None: sem limite)
+        gradiente (function)          : gradiente usado pelo L-BFGS-B, ver 'regredir_parâmetros'
+
+    Outputs:
+        sol (OptimizeResult) : resultado da otimização, com 'x' e 'fun' os do melhor ponto avaliado, 'estado'
+                               ('concluído', 'tempo_esgotado' ou 'avaliações_esgotadas'), 'success' (True apenas se
+                               o algoritmo convergiu), 'nfev' o nº de avaliações e 'tempo' o tempo da regressão (s)
+
+    Observações:
+        Ao menos uma avaliação (a do chute inicial) é sempre feita. Com o L-BFGS-B e um 'gradiente' paralelo, as
+        avaliações das diferenças finitas (feitas nos processos de trabalho) não passam pela função objetivo
+        monitorada: elas não entram no nº de avaliações, e o tempo é verificado na avaliação seguinte.
+    """
+
+    ao_avaliar, controle = criar_controle_orçamento(tempo_máximo, n_avaliações_máximo)
+    função_objetivo, histórico = monitorar_função_objetivo(F_obj, ao_avaliar)
+
+    try:
+        sol = regredir_parâmetros(chute_inicial, argumentos_otimização, algoritmo_otimização, limites_parâmetros,
+                                  função_objetivo=função_objetivo, gradiente=gradiente)
+    except OrçamentoEsgotado:
+        estado = "tempo_esgotado" if controle["motivo"] == "tempo" else "avaliações_esgotadas"
+        mensagem = f"Orcamento de {'tempo' if controle['motivo'] == 'tempo' else 'avaliacoes'} esgotado; " \
+                   f"retornado o melhor ponto avaliado."
+        return scp.optimize.OptimizeResult(x=histórico["melhores_parâmetros"], fun=histórico["melhor_DMA"],
+                                           success=False, estado=estado, message=mensagem,
+                                           nfev=histórico["n_avaliações"],
+                                           tempo=time.monotonic() - controle["instante_início"])
+
+    # O algoritmo convergiu dentro do orçamento (o melhor ponto avaliado é mantido, se for melhor que o final)
+    x, DMA = np.array(sol.x, dtype=float), sol.fun
+    if histórico["melhor_DMA"] < DMA:
+        x, DMA = histórico["melhores_parâmetros"], histórico["melhor_DMA"]
+    return scp.optimize.OptimizeResult(x=x, fun=DMA, success=sol.success, estado="concluído", message=sol.message,
+                                       nfev=histórico["n_avaliações"],
+                                       tempo=time.monotonic() - controle["instante_início"])
@@ -0,0 +1,199 @@
+# Importação de bibliotecas do python
+import numpy as np
+import scipy as scp
+from concurrent.futures import ProcessPoolExecutor
+
+# Importação de outros módulos deste projeto
+from módulo_regressão import calcular_resíduos_yields, regredir_parâmetros, ALGORITMOS_OTIMIZAÇÃO
+
+
+# Função
+def avaliar_yields_amostra(argumentos_amostra):
+    """ Calcula os yields do modelo completo (ELL) em um ponto do espaço de parâmetros (executado em um processo de
+        trabalho).
+
+    Inputs:
+        argumentos_amostra (tuple) : (parâmetros, argumentos_otimização)
+
+    Outputs:
+        yields_calc (array) : yields calculados em cada ponto experimental (NaN se o cálculo falhar)
+    """
+
+    parâmetros, argumentos_otimização = argumentos_amostra
+    yields_exp = np.asarray(argumentos_otimização[0][3], dtype=float)
+    try:
+        return np.asarray(calcular_resíduos_yields(parâmetros, *argumentos_otimização), dtype=float) + yields_exp
+    except (ValueError, ArithmeticError):
+        return np.full(yields_exp.shape, np.nan)
+
+
+# Função
+def ajustar_modelo_substituto(us_amostras, yields_amostras):
+    """ Ajusta um interpolador RBF (thin-plate spline) dos yields em cada ponto experimental em função dos
+        parâmetros normalizados, descartando as amostras cujo cálculo falhou.
+
+    Inputs:
+        us_amostras (array)     : parâmetros normalizados em [0, 1] das amostras, uma linha por amostra
+        yields_amostras (array) : yields calculados com o modelo completo, uma linha por amostra
+
+    Outputs:
+        modelo_substituto (RBFInterpolator) : interpolador vetorial (um yield por ponto experimental)
+    """
+
+    válidas = np.isfinite(yields_amostras).all(axis=1)
+    us_válidas, índices_únicos = np.unique(us_amostras[válidas], axis=0, return_index=True)
+    return scp.interpolate.RBFInterpolator(us_válidas, yields_amostras[válidas][índices_únicos],
+                                           kernel="thin_plate_spline", degree=1)
+
+
+# Função
+def regredir_parâmetros_modelo_substituto(chute_inicial, argumentos_otimização, algoritmo_otimização,
+                                          limites_parâmetros, n_amostras_iniciais=None, tolerância_DMA=1e-4,
+                                          tolerância_u=1e-3,
+                                          n_iterações_máximo=30, n_partidas=3, n_processos=1, semente=0,
+                                          executor=None):
+    """ Regressão acelerada por modelo substituto: o modelo completo (ELL) é amostrado sobre os limites dos
+        parâmetros, um interpolador RBF dos yields de cada ponto experimental é ajustado, a função objetivo é
+        minimizada sobre o interpolador e o candidato é verificado com o modelo completo; o candidato e pontos
+        próximos a ele são acrescentados às amostras até que o DMA previsto pelo substituto e o do modelo completo
+        concordem dentro de 'tolerância_DMA' no candidato, que o candidato se estabilize e que nenhum ponto já avaliado
+        seja melhor do que ele.
+
+    Inputs:
+        chute_inicial (array)         : chutes iniciais dos parâmetros a serem estimados (incluído nas amostras)
+        argumentos_otimização (tuple) : *args da função 'F_obj'
+        algoritmo_otimização (int)    : algoritmo usado na minimização sobre o substituto, ver 'regredir_parâmetros'
+        limites_parâmetros (list)     : limites dos parâmetros (definem o domínio amostrado)
+        n_amostras_iniciais (int)     : nº de amostras do planejamento inicial (hipercubo latino); padrão:
+                                        10 x nº de parâmetros
+        tolerância_DMA (float)        : diferença máxima entre os DMAs do substituto e do modelo completo no
+                                        candidato para aceitá-lo
+        tolerância_u (float)          : deslocamento máximo do candidato entre duas iterações, em parâmetros
+                                        normalizados pelos limites, para aceitá-lo
+        n_iterações_máximo (int)      : nº máximo de iterações de refinamento
+        n_partidas (int)              : nº de pontos de partida (as melhores amostras) da minimização sobre o
+                                        substituto
+        n_processos (int)             : nº de processos de trabalho na avaliação das amostras (1 para execução serial)
+        semente (int)                 : semente do gerador de números aleatórios das amostras
+        executor (Executor)           : ProcessPoolExecutor já existente (opcional; sem ele, com n_processos > 1, um
+                                        único conjunto de processos é criado para toda a regressão)
+
+    Outputs:
+        sol (OptimizeResult) : resultado da otimização, com 'x' e 'fun' o melhor ponto avaliado com o modelo completo
+                               e 'nfev' o nº de avaliações do modelo completo
+    """
+
+    # Validação do algoritmo antes do planejamento inicial (que custa n_amostras_iniciais cálculos do modelo completo)
+    if algoritmo_otimização not in ALGORITMOS_OTIMIZAÇÃO:
+        raise ValueError(f"\nATENCAO: o algoritmo_otimizacao = {algoritmo_otimização} nao esta implementado "
+                         f"(opcoes: {sorted(ALGORITMOS_OTIMIZAÇÃO)}).")
+
+    # Processos de trabalho: criados uma única vez, para todas as avaliações do modelo completo
+    if executor is None and n_processos != 1:
+        with ProcessPoolExecutor(max_workers=n_processos) as executor:
+            return regredir_parâmetros_modelo_substituto(
+                chute_inicial, argumentos_otimização, algoritmo_otimização, limites_parâmetros, n_amostras_iniciais,
+                tolerância_DMA, tolerância_u, n_iterações_máximo, n_partidas, n_processos, semente, executor)
+
+    # Normalização dos parâmetros pelos limites, u = (g(parâmetros) - g(inferior))/(g(superior) - g(inferior)), com
+    # g = log para os parâmetros positivos cujos limites abrangem mais de uma ordem de grandeza (ex: MWavg e alfa)
+    # e g = identidade para os demais
+    limites = np.array(limites_parâmetros, dtype=float)
+    escala_log = (limites[:, 0] > 0) & (limites[:, 1] > 10*limites[:, 0])
+    limites_transformados = np.where(escala_log[:, np.newaxis], np.log(np.where(escala_log[:, np.newaxis], limites, 1)),
+                                     limites)
+    inferiores, amplitudes = limites_transformados[:, 0], limites_transformados[:, 1] - limites_transformados[:, 0]
+    n_parâmetros = limites.shape[0]
+
+    def normalizar(parâmetros):
+        parâmetros = np.ravel(parâmetros).astype(float)
+        return np.clip((np.where(escala_log, np.log(np.abs(parâmetros)), parâmetros) - inferiores)/amplitudes, 0, 1)
+
+    def desnormalizar(u):
+        parâmetros_transformados = inferiores + u*amplitudes
+        return np.where(escala_log, np.exp(parâmetros_transformados), parâmetros_transformados)
+    yields_exp = np.asarray(argumentos_otimização[0][3], dtype=float)
+    gerador = np.random.default_rng(semente)
+
+    def calcular_DMAs(yields):
+        return np.abs(yields - yields_exp).mean(axis=-1)
+
+    def avaliar_modelo_completo(us):
+        argumentos_amostras = [(desnormalizar(u), argumentos_otimização) for u in us]
+        mapear = map if executor is None else executor.map
+        return np.array(list(mapear(avaliar_yields_amostra, argumentos_amostras)))
+
+    # Planejamento inicial: hipercubo latino sobre os limites, mais o chute inicial
+    if n_amostras_iniciais is None:
+        n_amostras_iniciais = 10*n_parâmetros
+    u_chute = normalizar(chute_inicial)
+    us_amostras = np.vstack((scp.stats.qmc.LatinHypercube(d=n_parâmetros, seed=gerador).random(n_amostras_iniciais),
+                             u_chute))
+    yields_amostras = avaliar_modelo_completo(us_amostras)
+
+    # Minimização sobre o substituto (os parâmetros são projetados nos limites, pois o interpolador não é confiável
+    # fora do domínio amostrado)
+    def F_obj_substituto(parâmetros, modelo_substituto):
+        return calcular_DMAs(modelo_substituto(normalizar(parâmetros)[np.newaxis, :])[0])
+
+    raio_refinamento = 0.1
+    u_candidato_anterior = np.full(n_parâmetros, np.inf)
+    convergiu = False
+    for n_iterações in range(1, n_iterações_máximo + 1):
+        modelo_substituto = ajustar_modelo_substituto(us_amostras, yields_amostras)
+
+        # Partidas a partir das melhores amostras já avaliadas com o modelo completo
+        DMAs_amostras = np.where(np.isfinite(yields_amostras).all(axis=1), calcular_DMAs(yields_amostras), np.inf)
+        candidatos = []
+        for i in np.argsort(DMAs_amostras)[0:n_partidas]:
+            sol_substituto = regredir_parâmetros(desnormalizar(us_amostras[i]), (modelo_substituto,),
+                                                 algoritmo_otimização, limites_parâmetros,
+                                                 função_objetivo=F_obj_substituto)
+            u_candidato = normalizar(sol_substituto.x)
+            candidatos.append((float(sol_substituto.fun), u_candidato))
+        u_candidato = min(candidatos, key=lambda candidato: candidato[0])[1]
+
+        # Verificação do candidato com o modelo completo e refinamento local ao seu redor: pontos aleatórios na região
+        # de refinamento e um passo de extrapolação ao longo do último deslocamento do candidato (que acompanha vales
+        # estreitos da função objetivo, como o de MWavg x alfa)
+        us_refinamento = np.clip(u_candidato + gerador.uniform(-raio_refinamento, raio_refinamento,
+                                                               (n_parâmetros, n_parâmetros)), 0, 1)
+        deslocamento_candidato = u_candidato - u_candidato_anterior
+        if np.all(np.isfinite(deslocamento_candidato)):
+            us_refinamento = np.vstack((us_refinamento, np.clip(u_candidato + 2*deslocamento_candidato, 0, 1)))
+        us_novas = np.vstack((u_candidato, us_refinamento))
+        yields_novas = avaliar_modelo_completo(us_novas)
+        us_amostras = np.vstack((us_amostras, us_novas))
+        yields_amostras = np.vstack((yields_amostras, yields_novas))
+
+        # Erros do substituto (ajustado antes destas avaliações) no candidato e nos pontos vizinhos
+        erros_DMA = np.abs(calcular_DMAs(modelo_substituto(us_novas)) - calcular_DMAs(yields_novas))
+        erros_DMA = np.where(np.isfinite(erros_DMA), erros_DMA, np.inf)
+        deslocamento = np.abs(deslocamento_candidato).max()
+        u_candidato_anterior = u_candidato
+
+        # Critério de aceitação: o substituto deve prever o DMA do modelo completo no candidato dentro da tolerância,
+        # o candidato deve ter se estabilizado em relação ao da iteração anterior e nenhum ponto já avaliado com o
+        # modelo completo pode ser melhor do que ele (além da tolerância)
+        DMAs_amostras = np.where(np.isfinite(yields_amostras).all(axis=1), calcular_DMAs(yields_amostras), np.inf)
+        candidato_é_o_melhor = calcular_DMAs(yields_novas[0]) <= DMAs_amostras.min() + tolerância_DMA
+        if erros_DMA[0] <= tolerância_DMA and deslocamento <= tolerância_u and candidato_é_o_melhor:
+            convergiu = True
+            break
+
+        # Raio da região de refinamento (como em uma região de confiança): aumenta se o substituto acertou também a
+        # vizinhança, de modo a explorar o vale da função objetivo, e diminui caso contrário
+        if erros_DMA.max() <= tolerância_DMA:
+            raio_refinamento = min(2*raio_refinamento, 0.25)
+        else:
+            raio_refinamento = max(raio_refinamento/2, 1e-3)
+
+    # Melhor ponto avaliado com o modelo completo
+    DMAs_amostras = np.where(np.isfinite(yields_amostras).all(axis=1), calcular_DMAs(yields_amostras), np.inf)
+    i_melhor = int(np.argmin(DMAs_amostras))
+    mensagem = "substituto e modelo completo concordam no candidato" if convergiu else \
+        "nº máximo de iterações de refinamento atingido"
+
+    return scp.optimize.OptimizeResult(x=desnormalizar(us_amostras[i_melhor]), fun=DMAs_amostras[i_melhor],
+                                       nfev=us_amostras.shape[0], nit=n_iterações, success=convergiu,
+                                       message=mensagem)
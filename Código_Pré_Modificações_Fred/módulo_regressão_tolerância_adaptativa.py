@@ -0,0 +1,130 @@
+# Importação de bibliotecas do python
+import collections
+import numpy as np
+import scipy as scp
+
+# Importação de outros módulos deste projeto
+from módulo_regressão import F_obj, regredir_parâmetros, monitorar_função_objetivo
+from módulo_regressão_multifidelidade import montar_opções_refinamento
+
+
+# Função
+def criar_controle_tolerância_ELL(n_parâmetros, tolerância_inicial=1e-4, tolerância_final=1e-12, fator_passo=1e-2,
+                                  n_it_máx_folgado=50, n_it_máx_final=150):
+    """ Cria a função objetivo com tolerância de ELL variável e a função chamada a cada iteração do otimizador, que
+        aperta a tolerância à medida que os passos do otimizador diminuem.
+
+    Inputs:
+        n_parâmetros (int)         : nº de parâmetros estimados
+        tolerância_inicial (float) : tolerância de ELL das primeiras iterações
+        tolerância_final (float)   : tolerância de ELL mínima (a da regressão direta)
+        fator_passo (float)        : tolerância = fator_passo*passo², com 'passo' a máxima distância relativa entre
+                                     os parâmetros da iteração atual e os da iteração anterior e das últimas
+                                     2*(nº de parâmetros + 1) avaliações
+        n_it_máx_folgado (int)     : nº máximo de iterações do ELL enquanto a tolerância é maior que a final
+        n_it_máx_final (int)       : nº máximo de iterações do ELL com a tolerância final
+
+    Outputs:
+        Uma tupla contendo os seguintes elementos:
+            função_objetivo (function) : F_obj(parâmetros, *args) calculada com a tolerância atual ('args' sem a
+                                         tolerância de ELL)
+            ao_iterar (function)       : função ao_iterar(parâmetros), ver 'regredir_parâmetros'
+            controle (dict)            : estado do controle, com as chaves 'tolerância_ELL', 'n_it_máx_ELL' e
+                                         'avaliações_por_tolerância' (nº de avaliações com cada tolerância)
+
+    Observações:
+        A tolerância nunca é afrouxada. O erro nos yields é da ordem de 1e-2*tolerância (Yanes_P2), enquanto a
+        variação do DMA em um passo relativo 'passo' perto do ótimo é da ordem de DMA*passo²; com fator_passo =
+        1e-2, o erro do ELL fica cerca de uma ordem de grandeza abaixo das variações do DMA que o otimizador
+        compara. As avaliações recentes acompanham o diâmetro do simplex do Nelder-Mead, cujo melhor vértice pode
+        ficar fixo durante várias iterações; as iterações recentes acompanham o deslocamento do Powell, cujas
+        últimas avaliações de cada iteração são as da última busca linear.
+    """
+
+    controle = {"tolerância_ELL": tolerância_inicial, "n_it_máx_ELL": n_it_máx_folgado,
+                "avaliações_por_tolerância": {}}
+    parâmetros_recentes = collections.deque(maxlen=2)
+    avaliações_recentes = collections.deque(maxlen=2*(n_parâmetros + 1))
+
+    def função_objetivo(parâmetros, *args):
+        tolerância_ELL = controle["tolerância_ELL"]
+        controle["avaliações_por_tolerância"][tolerância_ELL] = \
+            controle["avaliações_por_tolerância"].get(tolerância_ELL, 0) + 1
+        avaliações_recentes.append(np.array(parâmetros, dtype=float))
+        if not parâmetros_recentes:  # ponto de partida (1ª avaliação) como referência da 1ª iteração
+            parâmetros_recentes.append(avaliações_recentes[-1])
+        return F_obj(parâmetros, *args, tolerância_ELL, controle["n_it_máx_ELL"])
+
+    def ao_iterar(parâmetros):
+        parâmetros = np.array(parâmetros, dtype=float)
+        parâmetros_recentes.append(parâmetros)
+        referência = np.maximum(np.abs(parâmetros), 1e-3)
+        passo = max(np.max(np.abs(x - parâmetros)/referência)
+                    for x in list(parâmetros_recentes) + list(avaliações_recentes))
+        tolerância = float(np.clip(fator_passo*passo**2, tolerância_final, tolerância_inicial))
+        if tolerância < controle["tolerância_ELL"]:
+            # Arredondamento para uma potência de 10 (poucas tolerâncias distintas no histórico)
+            controle["tolerância_ELL"] = max(float(10.0**np.floor(np.log10(tolerância))), tolerância_final)
+            if controle["tolerância_ELL"] <= tolerância_final:
+                controle["n_it_máx_ELL"] = n_it_máx_final
+
+    return função_objetivo, ao_iterar, controle
+
+
+# Função
+def regredir_parâmetros_tolerância_adaptativa(chute_inicial, argumentos_otimização, algoritmo_otimização,
+                                              limites_parâmetros, tolerância_inicial=1e-4, passo_polimento=1e-4):
+    """ Regressão com tolerância de ELL adaptativa: o otimizador começa com uma tolerância de ELL folgada (cálculos
+        de ELL com menos iterações), apertada à medida que os seus passos diminuem (ver
+        'criar_controle_tolerância_ELL'). Se a otimização terminar antes de atingir a tolerância de 1e-12 da
+        regressão direta, o ótimo é polido por uma última otimização com a função objetivo 'F_obj', partindo do
+        ótimo com passos pequenos; caso contrário, apenas o DMA do ótimo é recalculado com 'F_obj'.
+
+    Inputs:
+        chute_inicial (array)         : chutes iniciais dos parâmetros a serem estimados
+        argumentos_otimização (tuple) : *args da função 'F_obj' (sem a tolerância de ELL)
+        algoritmo_otimização (int)    : algoritmo de otimização, ver 'regredir_parâmetros'
+        limites_parâmetros (list)     : limites dos parâmetros
+        tolerância_inicial (float)    : tolerância de ELL das primeiras iterações
+        passo_polimento (float)       : passo inicial relativo do polimento, ver 'montar_opções_refinamento'
+
+    Outputs:
+        sol (OptimizeResult) : resultado da otimização, com 'fun' o DMA calculado com 'F_obj', 'nfev' o nº total de
+                               avaliações da função objetivo, 'avaliações_por_tolerância' um dicionário
+                               {tolerância de ELL: nº de avaliações} e 'n_avaliações_polimento' o nº de avaliações
+                               do polimento (0 se não houve polimento)
+
+    Observações:
+        Com o L-BFGS-B (opção 3), a tolerância não é adaptada: o gradiente por diferenças finitas (passos relativos
+        da ordem de 1e-8) amplifica o erro do ELL em cerca de 1e8 vezes, e só a tolerância de 1e-12 o mantém
+        desprezível.
+    """
+
+    # Otimização com a tolerância de ELL adaptativa
+    if algoritmo_otimização == 3:
+        tolerância_inicial = 1e-12
+    função_objetivo, ao_iterar, controle = criar_controle_tolerância_ELL(np.size(chute_inicial), tolerância_inicial)
+    função_objetivo, histórico = monitorar_função_objetivo(função_objetivo)
+    sol = regredir_parâmetros(chute_inicial, argumentos_otimização, algoritmo_otimização, limites_parâmetros,
+                              função_objetivo=função_objetivo, ao_iterar=ao_iterar)
+    avaliações_por_tolerância = dict(controle["avaliações_por_tolerância"])
+
+    # Polimento com a tolerância de ELL completa, partindo do ótimo com passos pequenos
+    parâmetros = np.array(sol.x, dtype=float)
+    n_avaliações_polimento = 0
+    if min(avaliações_por_tolerância) > 1e-12:  # nenhuma avaliação com a tolerância completa
+        função_polimento, histórico_polimento = monitorar_função_objetivo(F_obj)
+        sol = regredir_parâmetros(parâmetros, argumentos_otimização, algoritmo_otimização, limites_parâmetros,
+                                  função_objetivo=função_polimento,
+                                  opções=montar_opções_refinamento(parâmetros, algoritmo_otimização, passo_polimento))
+        n_avaliações_polimento = histórico_polimento["n_avaliações"]
+        avaliações_por_tolerância[1e-12] = avaliações_por_tolerância.get(1e-12, 0) + n_avaliações_polimento
+        DMA = sol.fun
+    else:
+        # O melhor ponto pode ter sido avaliado com uma tolerância anterior, mais folgada
+        DMA = F_obj(parâmetros, *argumentos_otimização)
+
+    return scp.optimize.OptimizeResult(x=sol.x, fun=DMA, success=sol.success, message=sol.message,
+                                       nfev=histórico["n_avaliações"] + n_avaliações_polimento,
+                                       avaliações_por_tolerância=avaliações_por_tolerância,
+                                       n_avaliações_polimento=n_avaliações_polimento)
@@ -0,0 +1,304 @@
+# Importação de bibliotecas do python
+import os
+import functools
+import json
+import queue
+import threading
+import time
+import numpy as np
+from concurrent.futures import Future, ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Importação de outros módulos deste projeto
+from módulo_leitura_dados import ler_configuração_padrão
+from módulo_propriedades_solvente import SOLVENTES_DISPONÍVEIS
+from módulo_curva_solubilidade import calcular_curvas_solubilidade_lote, gerar_distribuição_agregados_normalizada
+
+# Nº máximo de distribuições de massa molar guardadas por cada processo de trabalho (as menos usadas recentemente
+# são descartadas, de modo que a memória de um serviço de longa duração é limitada)
+N_MÁXIMO_DISTRIBUIÇÕES_EM_CACHE = 256
+
+
+# Função
+def interpretar_pedido(pedido, configuração_padrão):
+    """ Converte um pedido JSON em dados de sistema e em uma chave de agrupamento.
+
+    Inputs:
+        pedido (dict)               : pedido com as chaves 'SARA', 'T', 'solvente' (opcional, padrão 'n-heptano';
+                                      ver 'SOLVENTES_DISPONÍVEIS'), 'fracoes_solvente' (cada uma entre 0 e 1,
+                                      exclusive) e 'parametros' (opcional; dicionário com quaisquer das chaves
+                                      'MWavg', 'alfa', 'c_delta_agregados', 'Alinha_delta_agregados',
+                                      'd_delta_agregados')
+        configuração_padrão (tuple) : ver 'ler_configuração_padrão'
+
+    Outputs:
+        Uma tupla contendo os seguintes elementos:
+            chave (tuple)  : (parâmetros_agregados, solvente, frações_solvente); pedidos com a mesma chave são
+                             calculados em um único cálculo de ELL vetorizado
+            T (float)      : temperatura (K)
+            SARA (array)   : composição SARA normalizada
+
+    Observações:
+        Levanta ValueError (respondido com o código 400 pelo serviço) para composição, temperatura, solvente ou
+        frações de solvente inválidos.
+    """
+
+    parâmetros_agregados, correlações_componentes, variáveis_distribuição_massa_molar = configuração_padrão
+
+    # Parâmetros dos agregados (os ausentes no pedido recebem os valores padrão)
+    nomes_parâmetros = ("MWavg", "alfa", "c_delta_agregados", "Alinha_delta_agregados", "d_delta_agregados")
+    parâmetros_pedido = pedido.get("parametros", {})
+    parâmetros_agregados = tuple(float(parâmetros_pedido.get(nome, valor_padrão))
+                                 for nome, valor_padrão in zip(nomes_parâmetros, parâmetros_agregados))
+
+    # Sistema
+    SARA = np.asarray(pedido["SARA"], dtype=float)
+    if SARA.shape != (4,) or (SARA < 0).any() or SARA.sum() <= 0:
+        raise ValueError("A composicao 'SARA' deve ter 4 fracoes nao negativas.")
+    SARA = SARA/SARA.sum()
+    T = float(pedido["T"])
+    if not np.isfinite(T) or T <= 0:
+        raise ValueError("A temperatura 'T' deve ser positiva (K).")
+    solvente = pedido.get("solvente", "n-heptano")
+    if solvente not in SOLVENTES_DISPONÍVEIS:
+        raise ValueError(f"Solvente '{solvente}' desconhecido (opcoes: {', '.join(SOLVENTES_DISPONÍVEIS)}).")
+    frações_solvente = tuple(float(fração) for fração in pedido["fracoes_solvente"])
+    if len(frações_solvente) == 0 or not all(0 < fração < 1 for fração in frações_solvente):
+        raise ValueError("As 'fracoes_solvente' devem ser uma lista nao vazia de valores entre 0 e 1 (exclusive).")
+
+    return (parâmetros_agregados, solvente, frações_solvente), T, SARA
+
+
+# Função
+def iniciar_processo_trabalho(configuração_padrão):
+    """ Inicializa um processo de trabalho: importa os módulos e executa um cálculo de aquecimento.
+
+    Inputs:
+        configuração_padrão (tuple) : ver 'ler_configuração_padrão'
+    """
+
+    pedido_aquecimento = {"SARA": [0.4, 0.3, 0.25, 0.05], "T": 298.15, "fracoes_solvente": [0.7, 0.9]}
+    chave, T, SARA = interpretar_pedido(pedido_aquecimento, configuração_padrão)
+    avaliar_lote_pedidos((chave, np.array([T]), SARA[None, :], configuração_padrão))
+
+
+# Função
+@functools.lru_cache(maxsize=N_MÁXIMO_DISTRIBUIÇÕES_EM_CACHE)
+def obter_distribuição_agregados(parâmetros_distribuição, variáveis_distribuição_massa_molar):
+    """ Distribuição de massa molar dos agregados, reaproveitada entre pedidos com os mesmos MWavg, alfa e
+        discretização (cache limitado às 'N_MÁXIMO_DISTRIBUIÇÕES_EM_CACHE' mais recentes de cada processo).
+
+    Inputs:
+        parâmetros_distribuição (tuple)            : (MWavg, alfa)
+        variáveis_distribuição_massa_molar (tuple) : ver 'calcular_curva_solubilidade'
+
+    Outputs:
+        distribuição (tuple) : ver 'gerar_distribuição_agregados_normalizada' (arrays compartilhados entre os
+                               pedidos, que não devem ser modificados)
+    """
+
+    return gerar_distribuição_agregados_normalizada(parâmetros_distribuição, variáveis_distribuição_massa_molar)
+
+
+# Função
+def avaliar_lote_pedidos(argumentos_lote):
+    """ Calcula as curvas de solubilidade de um lote de pedidos com a mesma chave (executado em um processo de
+        trabalho).
+
+    Inputs:
+        argumentos_lote (tuple) : (chave, Ts, SARAs, configuração_padrão), ver 'interpretar_pedido'
+
+    Outputs:
+        Uma tupla contendo os seguintes elementos (uma linha por pedido):
+            yields_calc (array), betasrr (array), xsL (array), xsH (array), n_it (array)
+    """
+
+    # Desempacotando os argumentos
+    (parâmetros_agregados, solvente, frações_solvente), Ts, SARAs, configuração_padrão = argumentos_lote
+    correlações_componentes, variáveis_distribuição_massa_molar = configuração_padrão[1:3]
+    frações_solvente = np.array(frações_solvente)
+    ws_simplificados = np.column_stack((frações_solvente, 1 - frações_solvente))
+
+    # Distribuição de massa molar (reaproveitada entre pedidos com os mesmos parâmetros)
+    distribuição = obter_distribuição_agregados(parâmetros_agregados[0:2], variáveis_distribuição_massa_molar)
+
+    return calcular_curvas_solubilidade_lote(parâmetros_agregados, (Ts, SARAs, ws_simplificados), solvente,
+                                             correlações_componentes, variáveis_distribuição_massa_molar,
+                                             distribuição)
+
+
+# Função
+def agrupar_e_despachar_pedidos(fila_pedidos, executor, configuração_padrão, janela_agrupamento, tamanho_máximo_lote):
+    """ Laço (executado em uma thread) que agrupa os pedidos que chegam dentro de uma janela de tempo e despacha um
+        cálculo vetorizado por chave para o conjunto de processos de trabalho.
+
+    Inputs:
+        fila_pedidos (Queue)        : fila de tuplas (chave, T, SARA, futuro); None encerra o laço
+        executor (Executor)         : conjunto de processos de trabalho
+        configuração_padrão (tuple) : ver 'ler_configuração_padrão'
+        janela_agrupamento (float)  : tempo máximo de espera por novos pedidos para um mesmo lote (s)
+        tamanho_máximo_lote (int)   : nº máximo de pedidos por lote
+    """
+
+    while True:
+        # Espera do primeiro pedido do lote e coleta dos seguintes dentro da janela
+        item = fila_pedidos.get()
+        if item is None:
+            break
+        itens = [item]
+        prazo = time.monotonic() + janela_agrupamento
+        while len(itens) < tamanho_máximo_lote:
+            tempo_restante = prazo - time.monotonic()
+            if tempo_restante <= 0:
+                break
+            try:
+                item = fila_pedidos.get(timeout=tempo_restante)
+            except queue.Empty:
+                break
+            if item is None:
+                fila_pedidos.put(None)  # reenfileira o sinal de encerramento para depois do lote atual
+                break
+            itens.append(item)
+
+        # Agrupamento por chave e despacho de um cálculo vetorizado por grupo
+        grupos = {}
+        for chave, T, SARA, futuro in itens:
+            grupos.setdefault(chave, []).append((T, SARA, futuro))
+        for chave, grupo in grupos.items():
+            Ts = np.array([T for T, _, _ in grupo])
+            SARAs = np.array([SARA for _, SARA, _ in grupo])
+            futuros = [futuro for _, _, futuro in grupo]
+            futuro_lote = executor.submit(avaliar_lote_pedidos, (chave, Ts, SARAs, configuração_padrão))
+            futuro_lote.add_done_callback(lambda futuro_lote, futuros=futuros: distribuir_resultados(futuro_lote,
+                                                                                                    futuros))
+
+
+# Função
+def distribuir_resultados(futuro_lote, futuros):
+    """ Distribui o resultado de um lote aos futuros de cada pedido.
+
+    Inputs:
+        futuro_lote (Future) : futuro do cálculo do lote
+        futuros (list)       : futuros dos pedidos, na ordem das linhas do lote
+    """
+
+    try:
+        yields_calc, betasrr, xsL, xsH, n_it = futuro_lote.result()
+    except Exception as erro:
+        for futuro in futuros:
+            futuro.set_exception(erro)
+        return
+    for i, futuro in enumerate(futuros):
+        futuro.set_result({"yields": yields_calc[i].tolist(), "betas": betasrr[i].tolist(),
+                           "xsL": xsL[i].tolist(), "xsH": xsH[i].tolist(), "n_iteracoes": n_it[i].tolist()})
+
+
+# Função
+def criar_servidor_predição(endereço="127.0.0.1", porta=8765, n_processos=None, janela_agrupamento=0.002,
+                            tamanho_máximo_lote=256, diretório_do_txt=None):
+    """ Cria o serviço local HTTP/JSON de predição de yields, com um conjunto de processos de trabalho já
+        aquecidos e agrupamento de pedidos simultâneos em cálculos de ELL vetorizados.
+
+    Inputs:
+        endereço (string)          : endereço do servidor
+        porta (int)                : porta do servidor (0 para uma porta livre qualquer)
+        n_processos (int)          : nº de processos de trabalho (padrão: nº de CPUs)
+        janela_agrupamento (float) : tempo máximo de espera por novos pedidos para um mesmo lote (s)
+        tamanho_máximo_lote (int)  : nº máximo de pedidos por lote
+        diretório_do_txt (string)  : diretório do arquivo com a configuração padrão (padrão:
+                                     'variáveis_entrada_código.txt' da pasta deste módulo)
+
+    Outputs:
+        servidor (ThreadingHTTPServer) : servidor pronto para 'serve_forever()'; 'server_close()' encerra também
+                                         a thread de agrupamento e os processos de trabalho
+
+    Observações:
+        POST /predicao recebe um pedido (ver 'interpretar_pedido') ou uma lista de pedidos e responde, para cada um,
+        'yields', 'betas', 'xsL', 'xsH' e 'n_iteracoes' (uma entrada por fração de solvente).
+        GET /saude responde {"estado": "ok"}.
+    """
+
+    # Configuração padrão e processos de trabalho aquecidos
+    if diretório_do_txt is None:
+        diretório_do_txt = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'variáveis_entrada_código.txt')
+    configuração_padrão = ler_configuração_padrão(diretório_do_txt)
+    n_processos = n_processos or os.cpu_count()
+    executor = ProcessPoolExecutor(max_workers=n_processos, initializer=iniciar_processo_trabalho,
+                                   initargs=(configuração_padrão,))
+    for futuro in [executor.submit(time.sleep, 0) for _ in range(n_processos)]:
+        futuro.result()  # força a criação (e o aquecimento) de todos os processos
+
+    # Thread de agrupamento dos pedidos
+    fila_pedidos = queue.Queue()
+    thread_agrupamento = threading.Thread(target=agrupar_e_despachar_pedidos, daemon=True, args=(
+        fila_pedidos, executor, configuração_padrão, janela_agrupamento, tamanho_máximo_lote))
+    thread_agrupamento.start()
+
+    class ManipuladorPedidos(BaseHTTPRequestHandler):
+
+        def responder(self, código, conteúdo):
+            corpo = json.dumps(conteúdo).encode()
+            self.send_response(código)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def do_GET(self):
+            if self.path == "/saude":
+                self.responder(200, {"estado": "ok"})
+            else:
+                self.responder(404, {"erro": "rota desconhecida"})
+
+        def do_POST(self):
+            if self.path != "/predicao":
+                self.responder(404, {"erro": "rota desconhecida"})
+                return
+            try:
+                conteúdo = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                pedidos = conteúdo if isinstance(conteúdo, list) else [conteúdo]
+                futuros = []
+                for pedido in pedidos:
+                    chave, T, SARA = interpretar_pedido(pedido, configuração_padrão)
+                    futuro = Future()
+                    fila_pedidos.put((chave, T, SARA, futuro))
+                    futuros.append(futuro)
+                respostas = [futuro.result() for futuro in futuros]
+            except (KeyError, TypeError, ValueError) as erro:
+                self.responder(400, {"erro": f"pedido invalido: {erro}"})
+                return
+            except Exception as erro:
+                self.responder(500, {"erro": f"falha no calculo: {erro}"})
+                return
+            self.responder(200, respostas if isinstance(conteúdo, list) else respostas[0])
+
+        def log_message(self, formato, *args):
+            pass  # sem registro de cada pedido no terminal
+
+    class ServidorPredição(ThreadingHTTPServer):
+        daemon_threads = True
+
+        def server_close(self):
+            super().server_close()
+            fila_pedidos.put(None)
+            thread_agrupamento.join()
+            executor.shutdown()
+
+    return ServidorPredição((endereço, porta), ManipuladorPedidos)
+
+
+# ******************************************************************************************************************** #
+#  ATENÇÃO: O CÓDIGO A SEGUIR SERÁ EXECUTADO APENAS QUANDO ESTE MÓDULO FOR RODADO COMO SCRIPT PRINCIPAL.               #
+#           O CÓDIGO A SEGUIR INICIA O SERVIÇO LOCAL DE PREDIÇÃO (ENCERRAR COM CTRL+C).                                #
+# ******************************************************************************************************************** #
+if __name__ == "__main__":
+
+    servidor = criar_servidor_predição()
+    print(f"| SERVICO DE PREDICAO EM http://{servidor.server_address[0]}:{servidor.server_address[1]}/predicao")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+# ******************************************************************************************************************** #
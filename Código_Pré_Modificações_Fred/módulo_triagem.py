@@ -0,0 +1,254 @@
+# Importação de bibliotecas do python
+import os
+import time
+import collections
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+# Importação de outros módulos deste projeto
+from módulo_curva_solubilidade import calcular_curvas_solubilidade_lote, gerar_distribuição_agregados_normalizada
+from módulo_mapa_operacional import calcular_onsets
+from módulo_regressão_conjunta import NOMES_PARÂMETROS
+from módulo_propriedades_solvente import SOLVENTES_DISPONÍVEIS
+from módulo_exportação_resultados import importar_pyarrow
+
+# Diluições padrão da triagem (g de solvente/g de petróleo); 40:1 é a razão dos ensaios padronizados de asfaltenos
+RAZÕES_DILUIÇÃO_PADRÃO = (1, 2, 5, 10, 20, 40)
+
+
+# Função
+def ler_ensaios_em_blocos(diretório_ensaios, tamanho_bloco):
+    """ Lê os ensaios de um arquivo CSV ou Parquet em blocos de 'tamanho_bloco' linhas, sem carregar o arquivo
+        inteiro na memória.
+
+    Inputs:
+        diretório_ensaios (string) : arquivo .csv ou .parquet com uma linha por ensaio, ver 'preparar_bloco_ensaios'
+        tamanho_bloco (int)        : nº de ensaios por bloco
+
+    Outputs:
+        blocos (generator) : DataFrames com os ensaios de cada bloco
+    """
+
+    if diretório_ensaios.lower().endswith(".parquet"):
+        pq = importar_pyarrow()[1]
+        arquivo = pq.ParquetFile(diretório_ensaios)
+        for lote in arquivo.iter_batches(batch_size=tamanho_bloco):
+            yield lote.to_pandas()
+    else:
+        yield from pd.read_csv(diretório_ensaios, chunksize=tamanho_bloco)
+
+
+# Função
+def preparar_bloco_ensaios(ensaios, configuração_padrão, solvente_padrão="n-heptano", índice_inicial=0):
+    """ Converte um bloco de ensaios nos arrays usados pela triagem, com as composições SARA normalizadas de uma vez
+        para todo o bloco.
+
+    Inputs:
+        ensaios (DataFrame)         : colunas 'S', 'A', 'R', 'Asf' (composição SARA, base mássica, normalizada aqui)
+                                      e 'T' (K); opcionais: 'identificador', 'solvente' ("n-heptano" ou
+                                      "n-pentano") e os parâmetros dos agregados (ver 'NOMES_PARÂMETROS'), cujos
+                                      valores ausentes recebem os da configuração padrão
+        configuração_padrão (tuple) : ver 'ler_configuração_padrão'
+        solvente_padrão (string)    : solvente dos ensaios sem a coluna 'solvente'
+        índice_inicial (int)        : identificador do 1º ensaio do bloco, se não houver a coluna 'identificador'
+
+    Outputs:
+        ensaios_bloco (dict) : arrays 'identificadores', 'Ts', 'SARAs' (uma linha por ensaio), 'solventes',
+                               'parâmetros' (uma linha por ensaio) e 'válidos' (False para os ensaios com SARA, T
+                               ou solvente inválidos, que não são calculados)
+    """
+
+    n_ensaios = len(ensaios)
+    SARAs = ensaios[["S", "A", "R", "Asf"]].to_numpy(dtype=float)
+    Ts = ensaios["T"].to_numpy(dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        SARAs = SARAs/SARAs.sum(axis=1, keepdims=True)
+    válidos = np.isfinite(SARAs).all(axis=1) & (SARAs >= 0).all(axis=1) & np.isfinite(Ts) & (Ts > 0)
+
+    parâmetros = np.empty((n_ensaios, len(NOMES_PARÂMETROS)))
+    for j, (nome, valor_padrão) in enumerate(zip(NOMES_PARÂMETROS, configuração_padrão[0])):
+        parâmetros[:, j] = ensaios[nome].fillna(valor_padrão).to_numpy(dtype=float) if nome in ensaios \
+            else valor_padrão
+
+    identificadores = ensaios["identificador"].to_numpy() if "identificador" in ensaios \
+        else np.arange(índice_inicial, índice_inicial + n_ensaios)
+    solventes = ensaios["solvente"].fillna(solvente_padrão).to_numpy(dtype=str) if "solvente" in ensaios \
+        else np.full(n_ensaios, solvente_padrão)
+    válidos &= np.isin(solventes, SOLVENTES_DISPONÍVEIS)
+
+    return {"identificadores": identificadores, "Ts": Ts, "SARAs": SARAs, "solventes": solventes,
+            "parâmetros": parâmetros, "válidos": válidos}
+
+
+# Função
+def avaliar_bloco_triagem(argumentos_bloco):
+    """ Calcula as curvas de solubilidade de um bloco de ensaios sobre a malha de frações de solvente da triagem
+        (executado em um processo de trabalho).
+
+    Inputs:
+        argumentos_bloco (tuple) : (ensaios_bloco, configuração_padrão, frações_solvente, limiar_yield), ver
+                                   'preparar_bloco_ensaios' e 'triar_ensaios'
+
+    Outputs:
+        Uma tupla contendo os seguintes elementos (uma linha por ensaio; NaN nos ensaios inválidos):
+            yields (array)  : yields fracionais, dimensões (nº de ensaios, nº de frações de solvente)
+            onsets (array)  : frações de solvente do onset, ver 'calcular_onsets'
+            n_it (array)    : nº máximo de iterações do cálculo de ELL entre os pontos de cada ensaio
+            válidos (array) : 'válidos' de 'preparar_bloco_ensaios', com False também para os ensaios cuja
+                              distribuição de massa molar ou cujo ELL não resultou em yields finitos (ex: parâmetros
+                              dos agregados fora do domínio, como alfa negativo)
+
+    Observações:
+        Os ensaios com o mesmo solvente e os mesmos parâmetros dos agregados são calculados em um único cálculo de
+        ELL vetorizado (com as composições globais de todos eles montadas de uma vez em 'montar_sistemas_lote')
+    """
+
+    # Desempacotando os argumentos
+    ensaios_bloco, configuração_padrão, frações_solvente, limiar_yield = argumentos_bloco
+    correlações_componentes, variáveis_distribuição_massa_molar = configuração_padrão[1:3]
+    ws_simplificados = np.column_stack((frações_solvente, 1 - frações_solvente))
+    n_ensaios = ensaios_bloco["Ts"].shape[0]
+    yields = np.full((n_ensaios, frações_solvente.shape[0]), np.nan)
+    onsets = np.full(n_ensaios, np.nan)
+    n_it = np.zeros(n_ensaios, dtype=int)
+    válidos = ensaios_bloco["válidos"].copy()
+
+    # Agrupamento dos ensaios válidos por solvente e parâmetros dos agregados
+    grupos = collections.defaultdict(list)
+    for i in np.flatnonzero(válidos):
+        grupos[(ensaios_bloco["solventes"][i], tuple(ensaios_bloco["parâmetros"][i]))].append(i)
+
+    # Cálculo de ELL vetorizado de cada grupo (a distribuição de massa molar depende apenas de MWavg e alfa)
+    distribuições = {}
+    for (solvente, parâmetros_agregados), índices in grupos.items():
+        índices = np.array(índices)
+        if parâmetros_agregados[0:2] not in distribuições:
+            distribuições[parâmetros_agregados[0:2]] = gerar_distribuição_agregados_normalizada(
+                parâmetros_agregados, variáveis_distribuição_massa_molar)
+        yields_grupo, _, _, _, n_it_grupo = calcular_curvas_solubilidade_lote(
+            parâmetros_agregados, (ensaios_bloco["Ts"][índices], ensaios_bloco["SARAs"][índices], ws_simplificados),
+            solvente, correlações_componentes, variáveis_distribuição_massa_molar,
+            distribuições[parâmetros_agregados[0:2]])
+        finitos = np.isfinite(yields_grupo).all(axis=1)
+        válidos[índices] = finitos
+        índices, yields_grupo, n_it_grupo = índices[finitos], yields_grupo[finitos], n_it_grupo[finitos]
+        if índices.size == 0:
+            continue
+        yields[índices] = yields_grupo
+        onsets[índices] = calcular_onsets(frações_solvente, yields_grupo, limiar_yield)
+        n_it[índices] = n_it_grupo.max(axis=1)
+
+    return yields, onsets, n_it, válidos
+
+
+# Função
+def montar_malha_triagem(razões_diluição, frações_solvente_onset):
+    """ Junta as frações de solvente das diluições padrão à malha usada na interpolação do onset.
+
+    Inputs:
+        razões_diluição (tuple)        : diluições padrão (g de solvente/g de petróleo)
+        frações_solvente_onset (array) : frações mássicas de solvente da malha do onset (em (0, 1))
+
+    Outputs:
+        Uma tupla contendo os seguintes elementos:
+            frações_solvente (array)  : malha completa (crescente e sem repetições)
+            índices_diluições (array) : posição de cada diluição padrão na malha completa
+    """
+
+    frações_diluições = np.asarray(razões_diluição, dtype=float)/(1 + np.asarray(razões_diluição, dtype=float))
+    frações_solvente = np.unique(np.concatenate((np.asarray(frações_solvente_onset, dtype=float),
+                                                 frações_diluições)))
+
+    return frações_solvente, np.searchsorted(frações_solvente, frações_diluições)
+
+
+# Função
+def triar_ensaios(diretório_ensaios, diretório_saída, configuração_padrão, solvente_padrão="n-heptano",
+                  razões_diluição=RAZÕES_DILUIÇÃO_PADRÃO, frações_solvente_onset=np.linspace(0.30, 0.98, 35),
+                  limiar_yield=1e-4, tamanho_bloco=500, n_processos=None):
+    """ Triagem do risco de precipitação de asfaltenos de uma biblioteca de ensaios SARA: para cada ensaio, calcula a
+        fração de solvente do onset e os yields nas diluições padrão, com os parâmetros dos agregados informados no
+        arquivo de ensaios ou os da configuração padrão. Os ensaios são lidos, calculados e gravados em blocos, de
+        modo que a memória usada independe do tamanho da biblioteca.
+
+    Inputs:
+        diretório_ensaios (string)     : arquivo .csv ou .parquet com os ensaios, ver 'preparar_bloco_ensaios'
+        diretório_saída (string)       : arquivo .csv ou .parquet com os resultados, uma linha por ensaio, com as
+                                         colunas 'identificador', 'T', 'solvente', 'onset_fracao_solvente',
+                                         'onset_razao_diluicao', 'yield_<razão>_1' (uma por diluição padrão) e
+                                         'n_iteracoes_max'
+        configuração_padrão (tuple)    : ver 'ler_configuração_padrão'
+        solvente_padrão (string)       : solvente dos ensaios sem a coluna 'solvente'
+        razões_diluição (tuple)        : diluições padrão (g de solvente/g de petróleo)
+        frações_solvente_onset (array) : malha de frações mássicas de solvente em que o onset é interpolado
+        limiar_yield (float)           : yield fracional que define o onset, ver 'calcular_onsets'
+        tamanho_bloco (int)            : nº de ensaios por bloco (cada bloco é uma tarefa de um processo)
+        n_processos (int)              : nº de processos de trabalho (padrão: nº de CPUs; 1 para execução serial)
+
+    Outputs:
+        resumo (dict) : 'n_ensaios', 'n_ensaios_inválidos' (ensaios com dados inválidos ou sem yields finitos, ver
+                        'avaliar_bloco_triagem'), 'tempo' (s) e 'ensaios_por_minuto'
+
+    Observações:
+        No máximo 2*n_processos blocos ficam em andamento (lidos e ainda não gravados) ao mesmo tempo, e os
+        resultados são gravados na ordem dos ensaios. A resolução do onset é a da malha 'frações_solvente_onset'
+        (interpolação linear, como no mapa operacional).
+    """
+
+    instante_início = time.perf_counter()
+    frações_solvente, índices_diluições = montar_malha_triagem(razões_diluição, frações_solvente_onset)
+    n_processos = n_processos or os.cpu_count()
+    executor = ProcessPoolExecutor(max_workers=n_processos) if n_processos > 1 else None
+    os.makedirs(os.path.dirname(diretório_saída) or ".", exist_ok=True)
+    saída_parquet = diretório_saída.lower().endswith(".parquet")
+    escritor_parquet = None
+    n_ensaios, n_ensaios_inválidos = 0, 0
+
+    def gravar_bloco(ensaios_bloco, resultado_bloco):
+        nonlocal escritor_parquet, n_ensaios, n_ensaios_inválidos
+        yields, onsets, n_it, válidos = resultado_bloco
+        resultados = pd.DataFrame({"identificador": ensaios_bloco["identificadores"], "T": ensaios_bloco["Ts"],
+                                   "solvente": ensaios_bloco["solventes"], "onset_fracao_solvente": onsets,
+                                   "onset_razao_diluicao": onsets/(1 - onsets)})
+        for razão, j in zip(razões_diluição, índices_diluições):
+            resultados[f"yield_{razão:g}_1"] = yields[:, j]
+        resultados["n_iteracoes_max"] = n_it
+        if saída_parquet:
+            pa, pq = importar_pyarrow()
+            tabela = pa.Table.from_pandas(resultados, preserve_index=False)
+            if escritor_parquet is None:
+                escritor_parquet = pq.ParquetWriter(diretório_saída, tabela.schema)
+            escritor_parquet.write_table(tabela)
+        else:
+            resultados.to_csv(diretório_saída, mode="w" if n_ensaios == 0 else "a", header=n_ensaios == 0,
+                              index=False)
+        n_ensaios += len(resultados)
+        n_ensaios_inválidos += int((~válidos).sum())
+
+    # Leitura, cálculo (em paralelo) e gravação dos blocos, na ordem
+    em_andamento = collections.deque()
+    try:
+        for ensaios in ler_ensaios_em_blocos(diretório_ensaios, tamanho_bloco):
+            ensaios_bloco = preparar_bloco_ensaios(ensaios, configuração_padrão, solvente_padrão,
+                                                   n_ensaios + sum(len(e["Ts"]) for e, _ in em_andamento))
+            argumentos_bloco = (ensaios_bloco, configuração_padrão, frações_solvente, limiar_yield)
+            if executor is None:
+                gravar_bloco(ensaios_bloco, avaliar_bloco_triagem(argumentos_bloco))
+                continue
+            em_andamento.append((ensaios_bloco, executor.submit(avaliar_bloco_triagem, argumentos_bloco)))
+            if len(em_andamento) >= 2*n_processos:
+                ensaios_bloco, futuro = em_andamento.popleft()
+                gravar_bloco(ensaios_bloco, futuro.result())
+        while em_andamento:
+            ensaios_bloco, futuro = em_andamento.popleft()
+            gravar_bloco(ensaios_bloco, futuro.result())
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        if escritor_parquet is not None:
+            escritor_parquet.close()
+
+    tempo = time.perf_counter() - instante_início
+    return {"n_ensaios": n_ensaios, "n_ensaios_inválidos": n_ensaios_inválidos, "tempo": tempo,
+            "ensaios_por_minuto": 60*n_ensaios/tempo if tempo > 0 else np.inf}